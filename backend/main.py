@@ -1,28 +1,66 @@
+import asyncio
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 
-from src.domain.common.exceptions import ObjectNotFoundError, DomainError, AuthorizationError, RepositoryError
+from src.domain.common.exceptions import (
+    AuthorizationError,
+    DomainError,
+    RepositoryError,
+)
 from src.infrastructure.db.base import db_manager
+from src.infrastructure.llm.http import warm_up
 from src.infrastructure.settings import settings
+from src.presentation.api.dependencies import (
+    get_context_builder,
+    get_hasher,
+    get_llm,
+    get_llm_http_client,
+    get_llm_http_transport,
+    get_llm_router,
+)
 from src.presentation.api.exception_handlers import (
-    repository_error_handler,
     auth_error_handler,
     domain_error_handler,
+    repository_error_handler,
 )
 from src.presentation.api.rest.agents import router as agents_rest_router
 from src.presentation.api.rest.auth import router as auth_rest_router
 from src.presentation.api.rest.dialogs import router as dialogs_rest_router
+from src.presentation.api.rest.metrics import router as metrics_rest_router
 from src.presentation.api.rest.pipelines import router as pipelines_rest_router
 from src.presentation.api.rpc.pipelines import router as pipelines_rpc_router
 
 
 @asynccontextmanager
 async def startup(app_instance: FastAPI):
-    db_manager.init(settings.db_url)
+    db_manager.init(
+        settings.db_url,
+        replica_dsn=settings.db_replica_url,
+        echo=settings.db_echo,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_recycle=settings.db_pool_recycle,
+        pool_timeout=settings.db_pool_timeout,
+        pgbouncer=settings.db_pgbouncer,
+    )
     print("Database connected")
+    # Загрузка словаря tiktoken может скачивать файл — не в event loop и не на первом запросе
+    await asyncio.to_thread(get_context_builder)
+    if settings.openai_warmup_connections > 0 and settings.llm_backend == "openai":
+        base_urls = {settings.openai_base_url}
+        base_urls.update(config.base_url for configs in settings.llm_endpoints.values() for config in configs)
+        for base_url in base_urls:
+            opened = await warm_up(get_llm_http_client(), base_url, settings.openai_warmup_connections)
+            print(f"LLM connections to {base_url} warmed up: {opened}/{settings.openai_warmup_connections}")
     yield
     await db_manager.close()
+    get_hasher().shutdown()
+    await get_llm_http_client().aclose()
+    get_llm.cache_clear()
+    get_llm_router.cache_clear()
+    get_llm_http_client.cache_clear()
+    get_llm_http_transport.cache_clear()
     print("Database disconnected")
 
 
@@ -43,6 +81,7 @@ app.include_router(auth_rest_router, prefix="/api/v1")
 app.include_router(dialogs_rest_router, prefix="/api/v1")
 app.include_router(agents_rest_router, prefix="/api/v1")
 app.include_router(pipelines_rest_router, prefix="/api/v1")
+app.include_router(metrics_rest_router, prefix="/api/v1")
 
 
 @app.get("/ping", tags=["health"])
@@ -1,7 +1,10 @@
+from typing import Literal
 from uuid import UUID
 
 from pydantic import BaseModel
 
+from src.domain.agents.entities import ReasoningEffort
+
 
 class CreateAgentCommand(BaseModel):
     agent_id: UUID
@@ -9,6 +12,12 @@ class CreateAgentCommand(BaseModel):
     description: str
     prompt: str
     temperature: float = 0.7
+    cache_responses: bool = False
+    model: str | None = None
+    endpoint: str | None = None
+    max_tokens: int | None = None
+    stop: list[str] | None = None
+    reasoning_effort: ReasoningEffort | None = None
 
 
 class UpdateAgentPromptCommand(BaseModel):
@@ -17,6 +26,12 @@ class UpdateAgentPromptCommand(BaseModel):
     prompt: str
     description: str
     temperature: float
+    cache_responses: bool = False
+    model: str | None = None
+    endpoint: str | None = None
+    max_tokens: int | None = None
+    stop: list[str] | None = None
+    reasoning_effort: ReasoningEffort | None = None
 
 
 class PatchAgentPromptCommand(BaseModel):
@@ -25,3 +40,9 @@ class PatchAgentPromptCommand(BaseModel):
     prompt: str | None = None
     description: str | None = None
     temperature: float | None = None
+    cache_responses: bool | None = None
+    model: str | None = None
+    endpoint: str | None = None
+    max_tokens: int | None = None
+    stop: list[str] | None = None
+    reasoning_effort: ReasoningEffort | Literal[""] | None = None  # "" — сбросить
@@ -0,0 +1,108 @@
+from dataclasses import dataclass, replace
+from uuid import UUID
+
+from src.application.services import Tokenizer
+from src.domain.agents.entities import Agent
+from src.domain.messages.entities import AuthorType, Message
+from src.infrastructure.cache import TTLCache
+
+# Служебные токены на каждое сообщение в chat формате (роль, разделители)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+@dataclass(frozen=True, slots=True, kw_only=True)
+class AgentContext:
+    messages: list[Message]
+    prompt_tokens: int  # Системный промпт и сообщения вместе со служебными токенами
+    dropped: int = 0
+    truncated: int = 0
+
+
+class ContextBuilder:
+    """
+    Подгоняет контекст агента под бюджет токенов.
+
+    Последнее сообщение пользователя (вопрос текущего хода) остается всегда,
+    остальные берутся от новых к старым, пока хватает бюджета. Сообщение на
+    границе бюджета обрезается (остается его конец), если от него остается
+    хотя бы `min_truncated_tokens`. Входные сообщения не изменяются.
+
+    Число токенов сообщения берется из `metadata["tokens"]` (его записывает
+    `AgentRunner` в ответы агентов), для остальных — из кэша по id сообщения.
+    """
+
+    def __init__(
+        self,
+        tokenizer: Tokenizer,
+        *,
+        max_tokens: int | None,
+        min_truncated_tokens: int = 32,
+        prompt_cache_size: int = 1024,
+        prompt_cache_ttl: float = 60 * 60,
+        message_cache_size: int = 10000,
+    ) -> None:
+        self.tokenizer = tokenizer
+        self.max_tokens = max_tokens
+        self.min_truncated_tokens = min_truncated_tokens
+        # Токены системного промпта по агенту; запись действительна, пока промпт не изменился
+        self.prompt_tokens: TTLCache[UUID, tuple[str, int]] = TTLCache(
+            "agent_prompt_tokens", maxsize=prompt_cache_size, ttl=prompt_cache_ttl
+        )
+        # Текст сохраненного сообщения не меняется, поэтому запись не устаревает
+        self.message_tokens: TTLCache[UUID, int] = TTLCache(
+            "message_tokens", maxsize=message_cache_size, ttl=prompt_cache_ttl
+        )
+
+    def count_message(self, message: Message) -> int:
+        tokens = message.metadata.get("tokens")
+        if tokens is None:
+            tokens = self.message_tokens.get(message.id)
+        if tokens is None:
+            tokens = self.tokenizer.count(message.text)
+            self.message_tokens.set(message.id, tokens)
+        return tokens + MESSAGE_OVERHEAD_TOKENS
+
+    def count_prompt(self, agent: Agent) -> int:
+        cached = self.prompt_tokens.get(agent.id)
+        if cached is not None and cached[0] == agent.prompt:
+            return cached[1]
+        tokens = self.tokenizer.count(agent.prompt) + MESSAGE_OVERHEAD_TOKENS
+        self.prompt_tokens.set(agent.id, (agent.prompt, tokens))
+        return tokens
+
+    def build(self, agent: Agent, messages: list[Message]) -> AgentContext:
+        """Сообщения в исходном порядке без не поместившихся в бюджет."""
+        used = self.count_prompt(agent)
+        if self.max_tokens is None:
+            used += sum(self.count_message(message) for message in messages)
+            return AgentContext(messages=messages, prompt_tokens=used)
+
+        kept: dict[int, Message] = {}
+        truncated = 0
+        order = sorted(range(len(messages)), key=lambda i: messages[i].created_at, reverse=True)
+        question = next((i for i in order if messages[i].author_type == AuthorType.USER), None)
+        if question is not None:  # Вопрос пользователя — первым, даже если после него есть ответы агентов
+            order.remove(question)
+            order.insert(0, question)
+        for i in order:
+            message = messages[i]
+            tokens = self.count_message(message)
+            if used + tokens <= self.max_tokens:
+                kept[i] = message
+                used += tokens
+                continue
+            # Вопрос пользователя нужен всегда, даже обрезанным
+            available = self.max_tokens - used - MESSAGE_OVERHEAD_TOKENS
+            if available >= self.min_truncated_tokens or (i == question and available > 0):
+                text = self.tokenizer.truncate(message.text, available)
+                kept[i] = replace(message, text=text, metadata={**message.metadata, "tokens": available})
+                used += available + MESSAGE_OVERHEAD_TOKENS
+                truncated = 1
+            break
+
+        return AgentContext(
+            messages=[kept[i] for i in sorted(kept)],
+            prompt_tokens=used,
+            dropped=len(messages) - len(kept),
+            truncated=truncated,
+        )
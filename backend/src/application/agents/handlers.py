@@ -1,56 +1,92 @@
+from typing import Any, Awaitable, Callable, Collection
 from uuid import UUID
 
-from src.application.services import AgentLLMClient
+from src.application.services import AgentLLMClient, track_llm_usage
 from src.domain.agents.entities import Agent, AgentFilter
+from src.domain.common.exceptions import ValidationError
 from src.domain.common.unit_of_work import UnitOfWork
 from src.domain.messages.entities import Message
+from src.infrastructure.db.repositories.cached import invalidate_agent
 
 from .commands import (
     CreateAgentCommand,
     PatchAgentPromptCommand,
     UpdateAgentPromptCommand,
 )
+from .context import ContextBuilder
 from .queries import AgentsQuery
 
 
 class AgentCommandHandler:
-    def __init__(self, uow: UnitOfWork) -> None:
+    def __init__(self, uow: UnitOfWork, endpoints: Collection[str] | None = None) -> None:
         self.uow = uow
+        # Настроенные группы LLM endpoint'ов (None — не проверять поле `endpoint` агента)
+        self.endpoints = endpoints
 
     async def handle_create(self, cmd: CreateAgentCommand) -> Agent:
-        agent = Agent(
-            id=cmd.agent_id,
+        self._check_endpoint(cmd.endpoint)
+        agent = Agent.create(
+            agent_id=cmd.agent_id,
             name=cmd.name,
             description=cmd.description,
             prompt=cmd.prompt,
             temperature=cmd.temperature,
+            cache_responses=cmd.cache_responses,
+            model=cmd.model,
+            endpoint=cmd.endpoint,
+            max_tokens=cmd.max_tokens,
+            stop=cmd.stop,
+            reasoning_effort=cmd.reasoning_effort,
         )
         async with self.uow:
             await self.uow.agents.add(agent)
         return agent
 
     async def handle_update(self, cmd: UpdateAgentPromptCommand) -> Agent:
-        agent = Agent(
-            id=cmd.agent_id,
-            prompt=cmd.prompt,
-            description=cmd.description,
+        self._check_endpoint(cmd.endpoint)
+        agent = Agent.create(
+            agent_id=cmd.agent_id,
             name=cmd.name,
+            description=cmd.description,
+            prompt=cmd.prompt,
             temperature=cmd.temperature,
+            cache_responses=cmd.cache_responses,
+            model=cmd.model,
+            endpoint=cmd.endpoint,
+            max_tokens=cmd.max_tokens,
+            stop=cmd.stop,
+            reasoning_effort=cmd.reasoning_effort,
         )
         async with self.uow:
             updated_agent = await self.uow.agents.update(agent)
+        invalidate_agent(agent.id)
         return updated_agent
 
     async def handle_patch(self, cmd: PatchAgentPromptCommand) -> Agent:
+        self._check_endpoint(cmd.endpoint)
         agent = await self.uow.agents.get_by_id(cmd.agent_id)
         agent.patch(**cmd.model_dump())
         async with self.uow:
             updated_agent = await self.uow.agents.update(agent)
+        invalidate_agent(agent.id)
         return updated_agent
 
     async def handle_delete(self, agent_id: UUID) -> None:
         async with self.uow:
             await self.uow.agents.delete(agent_id)
+        invalidate_agent(agent_id)
+
+    def _check_endpoint(self, endpoint: str | None) -> None:
+        """
+        Raises:
+            ValidationError: если группы endpoint'ов с таким именем нет в настройках.
+        """
+        # Пустая строка в PATCH сбрасывает группу к группе по умолчанию
+        if self.endpoints is None or not endpoint or not endpoint.strip():
+            return
+        if endpoint.strip() not in self.endpoints:
+            available = ", ".join(sorted(self.endpoints))
+            raise ValidationError(f"Unknown LLM endpoint: {endpoint}. Available: {available}")
 
 
 class AgentQueryHandler:
@@ -76,10 +112,17 @@ class AgentQueryHandler:
 
 class AgentRunner:
 
-    def __init__(self, agent: Agent, llm_client: AgentLLMClient, dialog_id: UUID) -> None:
+    def __init__(
+        self,
+        agent: Agent,
+        llm_client: AgentLLMClient,
+        dialog_id: UUID,
+        context_builder: ContextBuilder | None = None,
+    ) -> None:
         self._dialog_id = dialog_id
         self._agent = agent
         self._llm_client = llm_client
+        self._context_builder = context_builder
 
     @property
     def agent(self) -> Agent:
@@ -97,13 +140,90 @@ class AgentRunner:
     def dialog_id(self) -> UUID:
         return self._dialog_id
 
-    async def run(self, messages: list[Message]) -> Message:
+    async def run(
+        self, messages: list[Message], on_delta: Callable[[str], Awaitable[None]] | None = None
+    ) -> Message:
         """
         Запускает агента на выполнение. Видит только свои прошлые сообщения и сообщения пользователя.
+
+        Если передан `on_delta`, ответ генерируется потоково и каждый фрагмент
+        передаётся в callback по мере получения.
+
+        Если задан `context_builder`, контекст обрезается под бюджет токенов,
+        а размер контекста и ответа записывается в metadata ответа. Расход токенов
+        по данным провайдера (в том числе из кэша промптов) — в `metadata["usage"]`.
         """
-        answer: str = await self._llm_client.generate(
-            system_prompt=self._agent.prompt,
-            messages=messages,
-        )
+        messages, metadata = self._build_context(messages)
+        params = self._generation_params()
+        with track_llm_usage() as usage:
+            if on_delta is None:
+                answer: str = await self._llm_client.generate(
+                    system_prompt=self._agent.prompt, messages=messages, **params
+                )
+            else:
+                chunks: list[str] = []
+                async for chunk in self._llm_client.generate_stream(
+                    system_prompt=self._agent.prompt, messages=messages, **params
+                ):
+                    chunks.append(chunk)
+                    await on_delta(chunk)
+                answer = "".join(chunks).strip()
+        if usage.prompt_tokens:  # Нет при ответе из кэша ответов
+            metadata["usage"] = usage.to_dict()
         print(f"Agent {self._agent.name} answer: {answer}, messages: {messages}")
-        return Message.from_agent(dialog_id=self._dialog_id, agent_id=self._agent.id, text=answer)
+        return self._answer_message(answer, metadata)
+
+    async def run_choices(self, messages: list[Message], n: int) -> list[Message]:
+        """
+        Запускает агента один раз с `n` вариантами ответа: контекст отправляется
+        и оплачивается один раз. Ответы не стримятся.
+
+        Расход токенов всего запроса записывается в metadata первого варианта,
+        номер варианта — в `metadata["choice"]`.
+        """
+        messages, metadata = self._build_context(messages)
+        with track_llm_usage() as usage:
+            answers = await self._llm_client.generate_choices(
+                system_prompt=self._agent.prompt, messages=messages, n=n, **self._generation_params()
+            )
+        print(f"Agent {self._agent.name} answers ({n} choices): {answers}, messages: {messages}")
+        results: list[Message] = []
+        for i, answer in enumerate(answers):
+            choice_metadata = {**metadata, "choice": i}
+            if i == 0 and usage.prompt_tokens:
+                choice_metadata["usage"] = usage.to_dict()
+            results.append(self._answer_message(answer, choice_metadata))
+        return results
+
+    def _build_context(self, messages: list[Message]) -> tuple[list[Message], dict[str, Any]]:
+        """Контекст вызова под бюджет токенов (если задан `context_builder`) и начальная metadata ответа."""
+        metadata: dict[str, Any] = {}
+        if self._context_builder is not None:
+            context = self._context_builder.build(self._agent, messages)
+            messages = context.messages
+            metadata["prompt_tokens"] = context.prompt_tokens
+            if context.dropped:
+                print(f"Agent {self._agent.name}: {context.dropped} messages do not fit the context budget")
+        return messages, metadata
+
+    def _answer_message(self, answer: str, metadata: dict[str, Any]) -> Message:
+        if self._context_builder is not None:
+            metadata["tokens"] = self._context_builder.tokenizer.count(answer)
+        return Message.from_agent(
+            dialog_id=self._dialog_id, agent_id=self._agent.id, text=answer, metadata=metadata
+        )
+
+    def _generation_params(self) -> dict[str, Any]:
+        """Параметры вызова LLM из настроек агента; незаданные не передаются."""
+        params: dict[str, Any] = {"temperature": self._agent.temperature}
+        if self._agent.model:
+            params["model"] = self._agent.model
+        if self._agent.endpoint:
+            params["endpoint"] = self._agent.endpoint
+        if self._agent.max_tokens:
+            params["max_tokens"] = self._agent.max_tokens
+        if self._agent.stop:
+            params["stop"] = self._agent.stop
+        if self._agent.reasoning_effort:
+            params["reasoning_effort"] = self._agent.reasoning_effort
+        return params
@@ -1,7 +1,10 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from enum import Enum
 from typing import Any
 from uuid import UUID
 
+from src.application.messages.dto import MessageDTO
+
 
 @dataclass(frozen=True, slots=True, kw_only=True)
 class PatchPipelineCommand:
@@ -17,3 +20,24 @@ class PatchPipelineCommand:
             "description": self.description,
             "root": self.root,
         }
+
+
+class PipelineEventType(str, Enum):
+    NODE_START = "node_start"
+    NODE_FINISH = "node_finish"
+    DELTA = "delta"
+    DONE = "done"
+    ERROR = "error"
+
+
+@dataclass(frozen=True, slots=True, kw_only=True)
+class PipelineEventDTO:
+    """Событие потокового выполнения пайплайна."""
+
+    type: PipelineEventType
+    node_id: UUID | None = None
+    node_type: str | None = None
+    agent_id: UUID | None = None
+    delta: str = ""
+    messages: list[MessageDTO] = field(default_factory=list)
+    detail: str = ""
@@ -1,19 +1,41 @@
+from typing import AsyncIterator
 from uuid import UUID
 
+from src.application.agents.context import ContextBuilder
 from src.application.messages.dto import MessageDTO
 from src.application.pipelines.commands import RunPipelineCommand
-from src.application.pipelines.dto import PatchPipelineCommand
+from src.application.pipelines.dto import (
+    PatchPipelineCommand,
+    PipelineEventDTO,
+    PipelineEventType,
+)
 from src.application.services import AgentLLMClient
 from src.domain.common.unit_of_work import UnitOfWork
+from src.domain.messages.entities import Message
 from src.domain.pipelines.entities import Pipeline
+from src.infrastructure.db.repositories.cached import invalidate_pipeline
 from src.infrastructure.pipelines.executor import PipelineExecutor
+from src.infrastructure.pipelines.plan import ExecutionPlan, plan_cache
 
 
 class PipelineHandler:
 
-    def __init__(self, uow: UnitOfWork, llm: AgentLLMClient):
+    def __init__(
+        self,
+        uow: UnitOfWork,
+        llm: AgentLLMClient,
+        *,
+        cached_llm: AgentLLMClient | None = None,
+        history_limit: int = 100,
+        history_max_tokens: int | None = None,
+        context_builder: ContextBuilder | None = None,
+    ):
         self.uow = uow
         self.llm = llm
+        self.cached_llm = cached_llm
+        self.history_limit = history_limit
+        self.history_max_tokens = history_max_tokens
+        self.context_builder = context_builder
 
     async def handle_create(self, pipeline: Pipeline) -> Pipeline:
         async with self.uow:
@@ -31,7 +53,8 @@ class PipelineHandler:
             agents = await self.uow.agents.get_many(pipeline.get_agent_ids())
             pipeline.validate_agents([a.id for a in agents])
             pipeline = await self.uow.pipelines.update(pipeline)
-            return pipeline
+        self._invalidate(pipeline.id)
+        return pipeline
 
     async def handle_patch(self, cmd: PatchPipelineCommand) -> Pipeline:
         async with self.uow:
@@ -42,29 +65,91 @@ class PipelineHandler:
             pipeline.validate_agents([a.id for a in agents])
 
             pipeline = await self.uow.pipelines.update(pipeline)
+        self._invalidate(pipeline.id)
         return pipeline
 
     async def handle_delete(self, pipeline_id: UUID) -> None:
         async with self.uow:
             await self.uow.pipelines.delete(pipeline_id)
+        self._invalidate(pipeline_id)
 
     async def handle_run_pipeline(self, cmd: RunPipelineCommand) -> list[MessageDTO]:
+        executor, history = await self._prepare_run(cmd)
+
+        # Ответы LLM ждем без открытой транзакции: соединение возвращено в пул
+        new_messages = await executor.run(user_id=cmd.user_id, history=history, user_input=cmd.user_message)
+
         async with self.uow:
-            pipeline = await self.uow.pipelines.get_by_id(cmd.pipeline_id)
+            await self.uow.messages.add_many(executor.generated_messages)
+        return [MessageDTO.from_entity(msg) for msg in new_messages]
+
+    async def handle_run_pipeline_stream(self, cmd: RunPipelineCommand) -> AsyncIterator[PipelineEventDTO]:
+        """
+        Потоковый вариант `handle_run_pipeline`: отдаёт события выполнения узлов
+        и фрагменты ответов агентов по мере генерации. Последнее событие — `done`
+        с итоговыми сообщениями пайплайна.
+        """
+        executor, history = await self._prepare_run(cmd)
+
+        root_node_id = executor.plan.root_step.node_id
+        result: list[MessageDTO] = []
+        async for event in executor.stream(user_id=cmd.user_id, history=history, user_input=cmd.user_message):
+            # Результат корневого узла — итоговые сообщения пайплайна
+            if event.type == PipelineEventType.NODE_FINISH and event.node_id == root_node_id:
+                result = event.messages
+            yield event
+
+        async with self.uow:
+            await self.uow.messages.add_many(executor.generated_messages)
+        yield PipelineEventDTO(type=PipelineEventType.DONE, messages=result)
+
+    async def _prepare_run(self, cmd: RunPipelineCommand) -> tuple[PipelineExecutor, list[Message]]:
+        """
+        Читающая фаза запуска: план, проверка владельца диалога, история и агенты.
+
+        Транзакция фиксируется до вызовов LLM, чтобы не держать соединение
+        с БД на время генерации ответов.
+        """
+        async with self.uow:
+            plan = await self._get_plan(cmd.pipeline_id)
             dialog = await self.uow.dialogs.get_by_id(cmd.dialog_id)
 
             if dialog.user_id != cmd.user_id:
                 raise ValueError(f"User with id {cmd.user_id} is not owner of dialog with id {cmd.dialog_id}")
 
-            messages, _ = await self.uow.messages.get_by_dialog_id(cmd.dialog_id, page=1, page_size=100)
-
-            agents = await self.uow.agents.get_many(pipeline.get_agent_ids())
-            pipeline.validate_agents([a.id for a in agents])
-
-            executor = PipelineExecutor(pipeline, agents=agents, dialog_id=cmd.dialog_id, llm_client=self.llm)
-            new_messages = await executor.run(
-                user_id=cmd.user_id, history=messages, user_input=cmd.user_message
+            # Последние сообщения диалога в пределах окна контекста
+            history = await self.uow.messages.get_history(
+                cmd.dialog_id, limit=self.history_limit, max_tokens=self.history_max_tokens
             )
-            await self.uow.messages.add_many(executor.generated_messages)
 
-        return [MessageDTO.from_entity(msg) for msg in new_messages]
+            agents = await self.uow.agents.get_many(list(plan.agent_ids))
+            plan.validate_agents([a.id for a in agents])
+
+        executor = PipelineExecutor(
+            plan,
+            agents=agents,
+            dialog_id=cmd.dialog_id,
+            llm_client=self.llm,
+            cached_llm_client=self.cached_llm,
+            context_builder=self.context_builder,
+        )
+        return executor, history
+
+    async def _get_plan(self, pipeline_id: UUID) -> ExecutionPlan:
+        """
+        Возвращает скомпилированный план пайплайна.
+
+        Определение пайплайна загружается и валидируется только если
+        в кэше нет плана для текущей версии (`updated_at`) пайплайна.
+        """
+        version = await self.uow.pipelines.get_updated_at(pipeline_id)
+        if (plan := plan_cache.get(pipeline_id, version)) is not None:
+            return plan
+        pipeline = await self.uow.pipelines.get_by_id(pipeline_id)
+        return plan_cache.put(ExecutionPlan.compile(pipeline, version=version))
+
+    @staticmethod
+    def _invalidate(pipeline_id: UUID) -> None:
+        """Сбрасывает кэши пайплайна после фиксации транзакции."""
+        invalidate_pipeline(pipeline_id)
+        plan_cache.invalidate(pipeline_id)
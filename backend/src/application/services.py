@@ -1,11 +1,16 @@
+import asyncio
 from abc import ABC, abstractmethod
-from typing import Any
-from uuid import UUID
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass
+from typing import Any, AsyncGenerator, Iterator
 
-from src.application.users.dto import UserDTO
+from src.application.users.dto import AuthUserDTO
+from src.domain.auth.entities import UserClaims
 from src.domain.common.unit_of_work import UnitOfWork
 from src.domain.messages.entities import Message
 from src.infrastructure.auth.token_service import JWTService
+from src.infrastructure.db.repositories.cached import user_claims_cache
 
 
 class AgentLLMClient(ABC):
@@ -15,19 +20,98 @@ class AgentLLMClient(ABC):
     async def generate(self, system_prompt: str, messages: list[Message], **kwargs: Any) -> str:
         """Сгенерировать ответ на основе prompt и опционального контекста."""
 
+    async def generate_stream(
+        self, system_prompt: str, messages: list[Message], **kwargs: Any
+    ) -> AsyncGenerator[str, None]:
+        """
+        Сгенерировать ответ по частям (token deltas).
 
-async def get_user_by_token(token: str, *, token_service: JWTService, uow: UnitOfWork) -> UserDTO:
-    user_id: UUID = await token_service.get_user_id(token)
-    async with uow:
-        user = await uow.users.get_by_id(user_id)
-    return UserDTO(
-        id=user.id,
-        username=user.username,
-        email=user.email,
-        first_name=user.first_name,
-        last_name=user.last_name,
-        is_active=user.is_active,
-        is_superuser=user.is_superuser,
-        created_at=user.created_at,
-        updated_at=user.updated_at,
-    )
+        По умолчанию отдаёт весь ответ `generate` одним фрагментом,
+        клиенты с поддержкой стриминга переопределяют этот метод.
+        """
+        yield await self.generate(system_prompt, messages, **kwargs)
+
+    async def generate_choices(
+        self, system_prompt: str, messages: list[Message], n: int, **kwargs: Any
+    ) -> list[str]:
+        """
+        Сгенерировать `n` вариантов ответа на один запрос.
+
+        По умолчанию — `n` независимых вызовов `generate`. Клиенты, чей провайдер
+        отдает несколько вариантов в одном ответе (параметр `n`), переопределяют
+        этот метод: контекст передается и оплачивается один раз.
+        """
+        calls = [self.generate(system_prompt, messages, **kwargs) for _ in range(n)]
+        return list(await asyncio.gather(*calls))
+
+
+@dataclass(slots=True)
+class LLMUsage:
+    """Токены вызовов LLM по данным провайдера."""
+
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cached_tokens: int = 0  # Часть prompt_tokens, взятая из кэша промптов провайдера
+
+    def add(self, other: "LLMUsage") -> None:
+        self.prompt_tokens += other.prompt_tokens
+        self.completion_tokens += other.completion_tokens
+        self.cached_tokens += other.cached_tokens
+
+    def to_dict(self) -> dict[str, Any]:
+        return asdict(self)
+
+
+# Расход токенов с начала работы процесса и внутри текущего `track_llm_usage`
+llm_usage_totals = LLMUsage()
+_llm_usage: ContextVar[LLMUsage | None] = ContextVar("llm_usage", default=None)
+
+
+def record_llm_usage(usage: LLMUsage) -> None:
+    """Вызывается LLM клиентами после каждого ответа провайдера."""
+    llm_usage_totals.add(usage)
+    if (current := _llm_usage.get()) is not None:
+        current.add(usage)
+
+
+@contextmanager
+def track_llm_usage() -> Iterator[LLMUsage]:
+    """Суммирует расход токенов всех вызовов LLM внутри блока."""
+    usage = LLMUsage()
+    token = _llm_usage.set(usage)
+    try:
+        yield usage
+    finally:
+        _llm_usage.reset(token)
+
+
+class Tokenizer(ABC):
+    """Подсчет токенов так, как их считает модель."""
+
+    @abstractmethod
+    def count(self, text: str) -> int: ...
+
+    @abstractmethod
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """Оставить последние `max_tokens` токенов текста."""
+
+
+async def get_user_by_token(token: str, *, token_service: JWTService, uow: UnitOfWork) -> AuthUserDTO:
+    """
+    Права пользователя по access-токену.
+
+    Берутся из claims токена, если они там есть, иначе из кэша прав.
+    В БД идем только при промахе кэша.
+    """
+    payload = token_service.get_payload(token)
+    if payload.is_active is not None and payload.is_superuser is not None:
+        claims = UserClaims(is_active=payload.is_active, is_superuser=payload.is_superuser)
+    else:
+        cached = user_claims_cache.get(payload.sub)
+        if cached is None:
+            async with uow:
+                user = await uow.users.get_by_id(payload.sub)
+            cached = UserClaims(is_active=user.is_active, is_superuser=user.is_superuser)
+            user_claims_cache.set(payload.sub, cached)
+        claims = cached
+    return AuthUserDTO(id=payload.sub, is_active=claims.is_active, is_superuser=claims.is_superuser)
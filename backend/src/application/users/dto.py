@@ -18,6 +18,15 @@ class UserDTO:
     updated_at: datetime
 
 
+@dataclass(frozen=True, slots=True, kw_only=True)
+class AuthUserDTO:
+    """Снимок пользователя для проверки доступа на каждом запросе."""
+
+    id: UUID
+    is_active: bool
+    is_superuser: bool
+
+
 @dataclass(frozen=True, slots=True, kw_only=True)
 class JWTokenDTO:
     access: str
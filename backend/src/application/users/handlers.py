@@ -1,5 +1,6 @@
 from src.application.users.commands import LoginUserCommand, RegisterUserCommand
 from src.application.users.dto import JWTokenDTO, UserDTO
+from src.domain.auth.entities import UserClaims
 from src.domain.auth.services import AuthService
 from src.domain.common.exceptions import (
     AuthorizationError,
@@ -36,7 +37,7 @@ class RegisterUserHandler:
         Raises:
             UniqueError: если пользователь с таким email или username уже существует.
         """
-        password_hash = self.hasher.hash(cmd.password)
+        password_hash = await self.hasher.hash(cmd.password)
 
         user = User.create(
             username=cmd.username,
@@ -68,12 +69,13 @@ class JWTHandler:
         """
         async with self.uow:
             user = await self.uow.users.get_by_username(cmd.username)
-            if user is None or not self.hasher.verify(cmd.password, user.password_hash):
+            if user is None or not await self.hasher.verify(cmd.password, user.password_hash):
                 raise AuthorizationError("Invalid email or password")
             if not user.is_active:
                 raise AuthorizationError("User is inactive")
 
-            tokens = await self.auth_service.login(user_id=user.id)
+            claims = UserClaims(is_active=user.is_active, is_superuser=user.is_superuser)
+            tokens = await self.auth_service.login(user_id=user.id, claims=claims)
         return JWTokenDTO(access=tokens.access.token, refresh=tokens.refresh.token)
 
     async def handle_refresh_token(self, token: str) -> JWTokenDTO:
@@ -85,7 +87,12 @@ class JWTHandler:
             InvalidTokenError: если токен не валиден.
         """
         async with self.uow:
-            tokens = await self.auth_service.refresh(token)
+            claims = None
+            if self.token_service.embed_user_claims:
+                # Права в новом access-токене берем актуальные, а не из старого токена
+                user = await self.uow.users.get_by_id(self.token_service.get_payload(token).sub)
+                claims = UserClaims(is_active=user.is_active, is_superuser=user.is_superuser)
+            tokens = await self.auth_service.refresh(token, claims=claims)
         return JWTokenDTO(access=tokens.access.token, refresh=tokens.refresh.token)
 
     async def get_user_by_token(self, token: str) -> UserDTO:
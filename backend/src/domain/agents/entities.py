@@ -1,9 +1,13 @@
 from dataclasses import dataclass
-from typing import Self
+from typing import Literal, Self, get_args
 from uuid import UUID, uuid4
 
 from src.domain.common.exceptions import ValidationError
 
+ReasoningEffort = Literal["minimal", "low", "medium", "high"]
+REASONING_EFFORTS: tuple[str, ...] = get_args(ReasoningEffort)
+MAX_STOP_SEQUENCES = 4  # Ограничение OpenAI API
+
 
 @dataclass(slots=True)
 class Agent:
@@ -12,21 +16,64 @@ class Agent:
     description: str
     prompt: str
     temperature: float = 0.7
+    # Переиспользовать ответ LLM на точно такой же запрос (для детерминированных агентов)
+    cache_responses: bool = False
+    # Модель и группа endpoint'ов LLM (None — модель endpoint'а и группа по умолчанию)
+    model: str | None = None
+    endpoint: str | None = None
+    # Ограничения генерации (None — значения провайдера по умолчанию)
+    max_tokens: int | None = None
+    stop: list[str] | None = None
+    reasoning_effort: ReasoningEffort | None = None
 
     @classmethod
-    def create(cls, name: str, description: str, prompt: str, temperature: float = 0.7) -> Self:
-        """Фабричный метод — создание агента с валидацией."""
+    def create(
+        cls,
+        name: str,
+        description: str,
+        prompt: str,
+        temperature: float = 0.7,
+        cache_responses: bool = False,
+        model: str | None = None,
+        endpoint: str | None = None,
+        max_tokens: int | None = None,
+        stop: list[str] | None = None,
+        reasoning_effort: ReasoningEffort | None = None,
+        agent_id: UUID | None = None,
+    ) -> Self:
+        """Фабричный метод — создание агента с валидацией. `agent_id` задают при замене агента целиком."""
         if not (0 <= temperature <= 1):
             raise ValidationError("Temperature must be between 0 and 1")
+        cls.validate_generation_limits(max_tokens, stop, reasoning_effort)
 
         return cls(
-            id=uuid4(),
+            id=agent_id or uuid4(),
             name=name,
             description=description,
             prompt=prompt,
             temperature=temperature,
+            cache_responses=cache_responses,
+            model=model,
+            endpoint=endpoint,
+            max_tokens=max_tokens,
+            stop=stop,
+            reasoning_effort=reasoning_effort,
         )
 
+    @staticmethod
+    def validate_generation_limits(
+        max_tokens: int | None, stop: list[str] | None, reasoning_effort: ReasoningEffort | None
+    ) -> None:
+        if max_tokens is not None and max_tokens <= 0:
+            raise ValidationError("max_tokens must be positive")
+        if stop is not None:
+            if len(stop) > MAX_STOP_SEQUENCES:
+                raise ValidationError(f"No more than {MAX_STOP_SEQUENCES} stop sequences are allowed")
+            if not all(stop):
+                raise ValidationError("Stop sequences cannot be empty")
+        if reasoning_effort is not None and reasoning_effort not in REASONING_EFFORTS:
+            raise ValidationError(f"reasoning_effort must be one of {', '.join(REASONING_EFFORTS)}")
+
     def update_prompt(self, new_prompt: str) -> None:
         """Изменить prompt агента."""
         if not new_prompt.strip():
@@ -34,6 +81,11 @@ class Agent:
         self.prompt = new_prompt
 
     def patch(self, **kwargs) -> Self:
+        self._patch_description(**kwargs)
+        self._patch_generation(**kwargs)
+        return self
+
+    def _patch_description(self, **kwargs) -> None:
         if temperature := kwargs.get("temperature"):
             if not isinstance(temperature, (int, float)):
                 raise ValidationError("Temperature must be a number between 0 and 1")
@@ -50,7 +102,25 @@ class Agent:
             self.name = kwargs["name"]
         if description := kwargs.get("description"):
             self.description = description.strip()
-        return self
+
+    def _patch_generation(self, **kwargs) -> None:
+        if (cache_responses := kwargs.get("cache_responses")) is not None:
+            self.cache_responses = cache_responses
+        # Пустая строка сбрасывает значение к настройкам по умолчанию
+        if (model := kwargs.get("model")) is not None:
+            self.model = model.strip() or None
+        if (endpoint := kwargs.get("endpoint")) is not None:
+            self.endpoint = endpoint.strip() or None
+        # 0, [] и "" сбрасывают ограничение
+        if (max_tokens := kwargs.get("max_tokens")) is not None:
+            self.validate_generation_limits(max_tokens or None, None, None)
+            self.max_tokens = max_tokens or None
+        if (stop := kwargs.get("stop")) is not None:
+            self.validate_generation_limits(None, stop, None)
+            self.stop = stop or None
+        if (reasoning_effort := kwargs.get("reasoning_effort")) is not None:
+            self.validate_generation_limits(None, None, reasoning_effort or None)
+            self.reasoning_effort = reasoning_effort or None
 
 
 @dataclass
@@ -12,6 +12,16 @@ class TokenPayload(BaseModel):
     exp: int
     iat: int
 
+    # Необязательные claims пользователя в access-токене (см. `UserClaims`)
+    is_active: bool | None = None
+    is_superuser: bool | None = None
+
+
+@dataclass(frozen=True, slots=True, kw_only=True)
+class UserClaims:
+    is_active: bool
+    is_superuser: bool
+
 
 @dataclass(frozen=True, slots=True, kw_only=True)
 class JWToken:
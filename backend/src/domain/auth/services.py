@@ -7,7 +7,7 @@ from ..common.exceptions import (
     ObjectNotFoundError,
     RefreshTokenRevokedError,
 )
-from .entities import JWToken, TokenPayload
+from .entities import JWToken, TokenPayload, UserClaims
 from .repository import RefreshTokenRepository
 
 
@@ -20,10 +20,10 @@ class TokenPair:
 class TokenService(ABC):
 
     @abstractmethod
-    async def create_token_pair(self, user_id: UUID) -> TokenPair: ...
+    async def create_token_pair(self, user_id: UUID, claims: UserClaims | None = None) -> TokenPair: ...
 
     @abstractmethod
-    async def refresh_token(self, refresh_token: str) -> TokenPair: ...
+    async def refresh_token(self, refresh_token: str, claims: UserClaims | None = None) -> TokenPair: ...
 
     @abstractmethod
     async def get_user_id(self, token: str) -> UUID: ...
@@ -45,19 +45,19 @@ class AuthService:
         self.token_service = token_service
         self.refresh_repo = refresh_repo
 
-    async def login(self, user_id: UUID) -> TokenPair:
-        pair = await self.token_service.create_token_pair(user_id)
+    async def login(self, user_id: UUID, claims: UserClaims | None = None) -> TokenPair:
+        pair = await self.token_service.create_token_pair(user_id, claims)
         await self.refresh_repo.add(pair.refresh)
         return pair
 
-    async def refresh(self, refresh_token: str) -> TokenPair:
+    async def refresh(self, refresh_token: str, claims: UserClaims | None = None) -> TokenPair:
         """
         Raises:
             RefreshTokenRevokedError: если токен уже был использован
             InvalidTokenError: если токен не валиден
         """
         payload = self.token_service.get_payload(refresh_token)
-        if not payload.type != "refresh":
+        if payload.type != "refresh":
             raise InvalidTokenError("Refresh token is not valid. It is not a 'refresh' token")
 
         token_hash: str = self.token_service.get_token_hash(refresh_token)
@@ -69,7 +69,7 @@ class AuthService:
         if token.revoked:
             raise RefreshTokenRevokedError("Refresh token not found or already revoked")
 
-        pair = await self.token_service.refresh_token(refresh_token)
+        pair = await self.token_service.refresh_token(refresh_token, claims)
         try:
             await self.refresh_repo.revoke(token_hash)
         except ObjectNotFoundError as exc:
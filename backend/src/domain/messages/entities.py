@@ -1,5 +1,5 @@
 from dataclasses import dataclass, field
-from datetime import datetime
+from datetime import UTC, datetime
 from enum import Enum
 from typing import Any, Self
 from uuid import UUID, uuid4
@@ -20,8 +20,8 @@ class Message:
     author_id: UUID
     author_type: AuthorType
     text: str
-    created_at: datetime = field(default_factory=datetime.now)
-    updated_at: datetime = field(default_factory=datetime.now)
+    created_at: datetime = field(default_factory=lambda: datetime.now(UTC))
+    updated_at: datetime = field(default_factory=lambda: datetime.now(UTC))
     metadata: dict[str, Any] = field(default_factory=dict)
 
     @classmethod
@@ -47,5 +47,10 @@ class Message:
         if not text:
             raise ValidationError("Text cannot be empty")
         return cls(
-            id=uuid4(), text=text, dialog_id=dialog_id, author_id=agent_id, author_type=AuthorType.AGENT
+            id=uuid4(),
+            text=text,
+            dialog_id=dialog_id,
+            author_id=agent_id,
+            author_type=AuthorType.AGENT,
+            metadata=metadata or {},
         )
@@ -1,4 +1,5 @@
 from abc import ABC, abstractmethod
+from datetime import datetime
 from uuid import UUID
 
 from .entities import Message
@@ -15,11 +16,34 @@ class MessageRepository(ABC):
         self, dialog_id: UUID, page: int, page_size: int
     ) -> tuple[list[Message], int]: ...
 
+    @abstractmethod
+    async def get_history(
+        self,
+        dialog_id: UUID,
+        *,
+        limit: int,
+        before: tuple[datetime, UUID] | None = None,
+        max_tokens: int | None = None,
+    ) -> list[Message]:
+        """
+        Последние сообщения диалога без подсчета общего количества.
+
+        Keyset-пагинация по (created_at, id): `before` — ключ самого старого
+        уже загруженного сообщения. Возвращает не более `limit` самых новых
+        сообщений, укладывающихся в `max_tokens`, в хронологическом порядке.
+        """
+
     @abstractmethod
     async def add(self, message: Message) -> Message: ...
 
     @abstractmethod
-    async def add_many(self, messages: list[Message]) -> list[Message]: ...
+    async def add_many(self, messages: list[Message], *, returning: bool = False) -> list[Message]:
+        """
+        Сохраняет сообщения одним запросом.
+
+        По умолчанию возвращает переданные сообщения без чтения из БД,
+        с `returning=True` — строки, записанные в БД.
+        """
 
     @abstractmethod
     async def update(self, message: Message) -> Message: ...
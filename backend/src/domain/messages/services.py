@@ -0,0 +1,3 @@
+def estimate_tokens(text: str) -> int:
+    """Грубая оценка количества токенов в тексте (~4 символа на токен)."""
+    return len(text) // 4 + 1
@@ -1,10 +1,10 @@
 from __future__ import annotations
 
 from enum import Enum
-from typing import Any, Literal, Union
+from typing import Any, Literal, Self, Union
 from uuid import UUID, uuid4
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
 from pydantic import ValidationError as PydanticValidationError
 
 from src.domain.common.exceptions import ObjectNotFoundError, ValidationError
@@ -25,6 +25,19 @@ class SequenceNode(BaseModel):
 class MergeStrategy(str, Enum):
     CONCAT = "concat"
     CONCAT_NUMBERED = "concat_numbered"
+    # Стратегии с выбором: ветки, не попавшие в выбор, отменяются
+    FIRST_K = "first_k"  # Первые `k` завершившихся веток
+    DEADLINE = "deadline"  # Ветки, завершившиеся за `deadline` секунд, но не меньше одной
+    QUORUM = "quorum"  # Большинство (или `k`) веток, отстающим — еще `deadline` секунд, если задан
+
+
+SELECTING_MERGE_STRATEGIES = frozenset({MergeStrategy.FIRST_K, MergeStrategy.DEADLINE, MergeStrategy.QUORUM})
+
+
+class FailurePolicy(str, Enum):
+    FAIL_FAST = "fail_fast"  # Первая ошибка ветки отменяет остальные и прерывает пайплайн
+    BEST_EFFORT = "best_effort"  # Упавшие ветки пропускаются, нужен хотя бы один результат
+    AT_LEAST = "at_least"  # Нужно не меньше `min_successes` успешных веток
 
 
 class ParallelNode(BaseModel):
@@ -32,6 +45,37 @@ class ParallelNode(BaseModel):
     type: Literal["parallel"]
     merge_strategy: MergeStrategy
     nodes: list["Node"]
+    max_concurrency: int | None = Field(default=None, ge=1)  # Веток одновременно; None — все сразу
+    timeout: float | None = Field(default=None, gt=0)  # Секунд на ветку
+    failure_policy: FailurePolicy = FailurePolicy.FAIL_FAST
+    min_successes: int | None = Field(default=None, ge=1)
+    k: int | None = Field(default=None, ge=1)  # Для first_k и quorum
+    deadline: float | None = Field(default=None, gt=0)  # Секунд, для deadline и quorum
+
+    @model_validator(mode="after")
+    def check_failure_policy(self) -> Self:
+        if self.failure_policy == FailurePolicy.AT_LEAST:
+            if self.min_successes is None:
+                raise ValueError("min_successes is required for failure_policy 'at_least'")
+            if self.min_successes > len(self.nodes):
+                raise ValueError(f"min_successes {self.min_successes} exceeds the number of nodes")
+        return self
+
+    @model_validator(mode="after")
+    def check_merge_strategy(self) -> Self:
+        if self.merge_strategy == MergeStrategy.FIRST_K and self.k is None:
+            raise ValueError("k is required for merge_strategy 'first_k'")
+        if self.merge_strategy == MergeStrategy.DEADLINE and self.deadline is None:
+            raise ValueError("deadline is required for merge_strategy 'deadline'")
+        if self.k is not None and self.k > len(self.nodes):
+            raise ValueError(f"k {self.k} exceeds the number of nodes")
+        if (
+            self.merge_strategy == MergeStrategy.FIRST_K
+            and self.k is not None
+            and (self.min_successes or 0) > self.k
+        ):
+            raise ValueError("min_successes cannot exceed k for merge_strategy 'first_k'")
+        return self
 
 
 class TransformNode(BaseModel):
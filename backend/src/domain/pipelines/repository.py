@@ -1,4 +1,5 @@
 from abc import ABC, abstractmethod
+from datetime import datetime
 from uuid import UUID
 
 from .entities import Pipeline
@@ -8,6 +9,15 @@ class PipelineRepository(ABC):
     @abstractmethod
     async def get_by_id(self, pipeline_id: UUID) -> Pipeline: ...
 
+    @abstractmethod
+    async def get_updated_at(self, pipeline_id: UUID) -> datetime:
+        """
+        Время последнего изменения пайплайна (версия определения).
+
+        Raises:
+            ObjectNotFoundError: Если пайплайна не существует
+        """
+
     @abstractmethod
     async def add(self, pipeline: Pipeline) -> Pipeline: ...
 
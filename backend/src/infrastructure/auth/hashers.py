@@ -1,21 +1,87 @@
+import asyncio
+import time
 from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from typing import Any, Callable
 
 from passlib.context import CryptContext
 
 
 class PasswordHasherProtocol(ABC):
     @abstractmethod
-    def hash(self, password: str) -> str: ...
+    async def hash(self, password: str) -> str: ...
     @abstractmethod
-    def verify(self, password: str, hash_: str) -> bool: ...
+    async def verify(self, password: str, hash_: str) -> bool: ...
+
+
+@dataclass(slots=True)
+class HasherStats:
+    queued: int = 0  # Ждут свободного потока
+    running: int = 0
+    completed: int = 0
+    max_queued: int = 0
+    wait_seconds: float = 0.0
+    work_seconds: float = 0.0
+
+    def to_dict(self) -> dict[str, Any]:
+        done = self.completed or 1
+        return {
+            **asdict(self),
+            "avg_wait_ms": round(self.wait_seconds / done * 1000, 3),
+            "avg_work_ms": round(self.work_seconds / done * 1000, 3),
+        }
 
 
 class BcryptPasswordHasher(PasswordHasherProtocol):
-    def __init__(self):
-        self.ctx = CryptContext(schemes=["bcrypt"], deprecated="auto")
+    """
+    bcrypt в отдельном пуле потоков.
+
+    Хэширование занимает сотни миллисекунд CPU, поэтому не выполняется в event loop.
+    Одновременно работает не больше `max_workers` операций, остальные ждут
+    в очереди, не занимая потоков.
+    """
+
+    def __init__(self, rounds: int = 12, max_workers: int = 4):
+        self.ctx = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=rounds)
+        self.max_workers = max_workers
+        self.stats = HasherStats()
+        self._executor: ThreadPoolExecutor | None = None
+        self._slots = asyncio.Semaphore(max_workers)
+
+    async def hash(self, password: str) -> str:
+        return await self._run(self.ctx.hash, password)
+
+    async def verify(self, password: str, hash_: str) -> bool:
+        return await self._run(self.ctx.verify, password, hash_)
+
+    def info(self) -> dict[str, Any]:
+        return {"max_workers": self.max_workers, **self.stats.to_dict()}
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        self._slots = asyncio.Semaphore(self.max_workers)
 
-    def hash(self, password: str) -> str:
-        return self.ctx.hash(password)
+    async def _run[T](self, func: Callable[..., T], *args: Any) -> T:
+        self.stats.queued += 1
+        self.stats.max_queued = max(self.stats.max_queued, self.stats.queued)
+        queued_at = time.perf_counter()
+        try:
+            await self._slots.acquire()
+        finally:
+            self.stats.queued -= 1
 
-    def verify(self, password: str, hash_: str) -> bool:
-        return self.ctx.verify(password, hash_)
+        started_at = time.perf_counter()
+        self.stats.wait_seconds += started_at - queued_at
+        self.stats.running += 1
+        try:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="bcrypt")
+            return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+        finally:
+            self.stats.running -= 1
+            self.stats.completed += 1
+            self.stats.work_seconds += time.perf_counter() - started_at
+            self._slots.release()
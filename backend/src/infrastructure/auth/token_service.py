@@ -5,23 +5,30 @@ from uuid import UUID
 
 import jwt
 
-from src.domain.auth.entities import JWToken, TokenPayload
+from src.domain.auth.entities import JWToken, TokenPayload, UserClaims
 from src.domain.auth.services import TokenPair, TokenService
 from src.domain.common.exceptions import InvalidTokenError
 
 
 class JWTService(TokenService):
-    def __init__(self, secret: str, access_expiration_minutes: int = 60, refresh_expiration_days: int = 30):
+    def __init__(
+        self,
+        secret: str,
+        access_expiration_minutes: int = 60,
+        refresh_expiration_days: int = 30,
+        embed_user_claims: bool = False,
+    ):
         self._secret = secret
         self.access_expiration_minutes = access_expiration_minutes
         self.refresh_expiration_days = refresh_expiration_days
+        self.embed_user_claims = embed_user_claims
 
     async def get_user_id(self, token: str) -> UUID:
         payload = self.get_payload(token)
         return payload.sub
 
-    async def create_token_pair(self, user_id: UUID) -> TokenPair:
-        access, access_payload = self._create_token(user_id, "access")
+    async def create_token_pair(self, user_id: UUID, claims: UserClaims | None = None) -> TokenPair:
+        access, access_payload = self._create_token(user_id, "access", claims)
         refresh, refresh_payload = self._create_token(user_id, "refresh")
         return TokenPair(
             access=JWToken(
@@ -44,11 +51,11 @@ class JWTService(TokenService):
             ),
         )
 
-    async def refresh_token(self, refresh_token: str) -> TokenPair:
+    async def refresh_token(self, refresh_token: str, claims: UserClaims | None = None) -> TokenPair:
         payload = self.get_payload(refresh_token)
         if payload.type != "refresh":
             raise InvalidTokenError(f"Invalid token type. Expected 'refresh', got '{payload.type}'.")
-        return await self.create_token_pair(payload.sub)
+        return await self.create_token_pair(payload.sub, claims)
 
     def get_payload(self, token: str) -> TokenPayload:
         try:
@@ -59,7 +66,9 @@ class JWTService(TokenService):
             raise InvalidTokenError("Invalid token")
         return payload
 
-    def _create_token(self, user_id: UUID, type_: Literal["access", "refresh"]) -> tuple[str, TokenPayload]:
+    def _create_token(
+        self, user_id: UUID, type_: Literal["access", "refresh"], claims: UserClaims | None = None
+    ) -> tuple[str, TokenPayload]:
         exp = datetime.now(UTC)
         if type_ == "access":
             exp += timedelta(minutes=self.access_expiration_minutes)
@@ -72,8 +81,14 @@ class JWTService(TokenService):
             type=type_,
             iat=int(datetime.now(UTC).timestamp()),
         )
+        # Права пользователя кладем только в access-токен: его проверяют на каждом запросе
+        if type_ == "access" and self.embed_user_claims and claims is not None:
+            payload.is_active = claims.is_active
+            payload.is_superuser = claims.is_superuser
 
-        enc_token = jwt.encode(payload.model_dump(mode="json"), self._secret, algorithm="HS256")
+        enc_token = jwt.encode(
+            payload.model_dump(mode="json", exclude_none=True), self._secret, algorithm="HS256"
+        )
         return enc_token, payload
 
     @staticmethod
@@ -0,0 +1,75 @@
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Any
+
+
+@dataclass(slots=True)
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def to_dict(self) -> dict[str, Any]:
+        return {**asdict(self), "hit_rate": round(self.hit_rate, 4)}
+
+
+class TTLCache[K, V]:
+    """
+    Процесс-локальный LRU кэш с ограничением времени жизни записей.
+
+    При `ttl <= 0` или `maxsize <= 0` кэш отключен: записи не сохраняются.
+    """
+
+    def __init__(self, name: str, *, maxsize: int, ttl: float) -> None:
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.stats = CacheStats()
+        self._data: OrderedDict[K, tuple[float, V]] = OrderedDict()
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.maxsize > 0
+
+    def get(self, key: K) -> V | None:
+        item = self._data.get(key)
+        if item is None:
+            self.stats.misses += 1
+            return None
+
+        expire_at, value = item
+        if expire_at < time.monotonic():
+            del self._data[key]
+            self.stats.misses += 1
+            return None
+
+        self._data.move_to_end(key)
+        self.stats.hits += 1
+        return value
+
+    def set(self, key: K, value: V) -> None:
+        if not self.enabled:
+            return
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.stats.evictions += 1
+
+    def pop(self, key: K) -> None:
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def info(self) -> dict[str, Any]:
+        return {"size": len(self._data), "maxsize": self.maxsize, "ttl": self.ttl, **self.stats.to_dict()}
@@ -1,7 +1,11 @@
+import time
 from asyncio import current_task
 from contextlib import asynccontextmanager
-from typing import AsyncIterator, Optional
+from dataclasses import asdict, dataclass
+from typing import Any, AsyncIterator, Optional
 
+from sqlalchemy import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from sqlalchemy.ext.asyncio import (
     AsyncConnection,
     AsyncEngine,
@@ -10,6 +14,47 @@ from sqlalchemy.ext.asyncio import (
     async_sessionmaker,
     create_async_engine,
 )
+from sqlalchemy.pool import AsyncAdaptedQueuePool, ConnectionPoolEntry
+
+
+@dataclass(slots=True)
+class PoolStats:
+    checkouts: int = 0
+    timeouts: int = 0
+    wait_seconds: float = 0.0
+    max_wait_seconds: float = 0.0
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            **asdict(self),
+            "avg_wait_ms": round(self.wait_seconds / (self.checkouts or 1) * 1000, 3),
+        }
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """Пул соединений, измеряющий время ожидания свободного соединения."""
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def _do_get(self) -> ConnectionPoolEntry:
+        started_at = time.perf_counter()
+        try:
+            entry = super()._do_get()
+        except PoolTimeoutError:
+            self.stats.timeouts += 1
+            raise
+        waited = time.perf_counter() - started_at
+        self.stats.checkouts += 1
+        self.stats.wait_seconds += waited
+        self.stats.max_wait_seconds = max(self.stats.max_wait_seconds, waited)
+        return entry
+
+    def recreate(self) -> "TimedQueuePool":
+        pool = super().recreate()
+        pool.stats = self.stats  # type: ignore[attr-defined]
+        return pool  # type: ignore[return-value]
 
 
 class DatabaseSessionManager:
@@ -19,18 +64,61 @@ class DatabaseSessionManager:
     Класс предоставляет методы для инициализации,
     закрытия соединения с базой данных, а также создания
     асинхронных сессий и подключений.
+
+    Если задан DSN реплики, сессии только для чтения (`read_session`)
+    открываются на ней, иначе — на основной базе.
     """
 
     def __init__(self) -> None:
         self._engine: Optional[AsyncEngine] = None
         self._session_maker: Optional[async_sessionmaker[AsyncSession]] = None
+        self._replica_engine: Optional[AsyncEngine] = None
+        self._replica_session_maker: Optional[async_sessionmaker[AsyncSession]] = None
 
-    def init(self, dsn: str, **conn_args) -> None:
+    def init(
+        self,
+        dsn: str,
+        *,
+        replica_dsn: str | None = None,
+        echo: bool = False,
+        pool_size: int = 10,
+        max_overflow: int = 20,
+        pool_recycle: int = 1800,
+        pool_timeout: float = 30.0,
+        pgbouncer: bool = True,
+        **conn_args,
+    ) -> None:
         """Инициализирует соединение с базой данных."""
 
-        # Just additional example of customization.
-        # you can add parameters to init and so on
-        if "postgresql" in dsn:
+        engine_args: dict[str, Any] = {
+            "echo": echo,
+            "pool_size": pool_size,
+            "max_overflow": max_overflow,
+            "pool_recycle": pool_recycle,
+            "pool_timeout": pool_timeout,
+            "pgbouncer": pgbouncer,
+            **conn_args,
+        }
+        self._engine = self._create_engine(dsn, **engine_args)
+        self._session_maker = self._create_session_maker(self._engine)
+        if replica_dsn:
+            self._replica_engine = self._create_engine(replica_dsn, **engine_args)
+            self._replica_session_maker = self._create_session_maker(self._replica_engine)
+
+    @staticmethod
+    def _create_engine(
+        dsn: str,
+        *,
+        echo: bool,
+        pool_size: int,
+        max_overflow: int,
+        pool_recycle: int,
+        pool_timeout: float,
+        pgbouncer: bool,
+        **conn_args,
+    ) -> AsyncEngine:
+        url = make_url(dsn)
+        if url.get_backend_name() == "postgresql" and pgbouncer:
             # These settings are needed to work with pgbouncer in transaction mode
             # because you can't use prepared statements in such case
             connect_args = {
@@ -42,19 +130,38 @@ class DatabaseSessionManager:
 
         connect_args.update(conn_args)
 
-        self._engine = create_async_engine(
-            url=dsn,
+        pool_args: dict[str, Any] = {}
+        # In-memory SQLite живет в единственном соединении (StaticPool), пул не настраивается
+        if not (url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")):
+            pool_args = {
+                "poolclass": TimedQueuePool,
+                "pool_size": pool_size,
+                "max_overflow": max_overflow,
+                "pool_recycle": pool_recycle,
+                "pool_timeout": pool_timeout,
+            }
+
+        return create_async_engine(
+            url=url,
             pool_pre_ping=True,
             connect_args=connect_args,
-            echo=True,
+            echo=echo,
+            **pool_args,
         )
-        self._session_maker = async_sessionmaker(
-            bind=self._engine,
+
+    @staticmethod
+    def _create_session_maker(engine: AsyncEngine) -> async_sessionmaker[AsyncSession]:
+        return async_sessionmaker(
+            bind=engine,
             expire_on_commit=False,
             autoflush=False,
             autocommit=False,
         )
 
+    @property
+    def has_replica(self) -> bool:
+        return self._replica_session_maker is not None
+
     @property
     def session_maker(self) -> async_sessionmaker[AsyncSession]:
         if self._session_maker is not None:
@@ -69,6 +176,15 @@ class DatabaseSessionManager:
         await self._engine.dispose()
         self._engine = None
         self._session_maker = None
+        if self._replica_engine is not None:
+            await self._replica_engine.dispose()
+            self._replica_engine = None
+            self._replica_session_maker = None
+
+    def pool_info(self) -> dict[str, Any]:
+        """Состояние пулов соединений: занятые/свободные соединения и время ожидания."""
+        engines = {"primary": self._engine, "replica": self._replica_engine}
+        return {name: _pool_info(engine) for name, engine in engines.items() if engine is not None}
 
     @asynccontextmanager
     async def session(self) -> AsyncIterator[AsyncSession]:
@@ -88,6 +204,20 @@ class DatabaseSessionManager:
                 await session.rollback()
                 raise
 
+    @asynccontextmanager
+    async def read_session(self) -> AsyncIterator[AsyncSession]:
+        """Сессия только для чтения: на реплике, если она настроена."""
+        if self._replica_session_maker is None:
+            async with self.session() as session:
+                yield session
+            return
+        async with self._replica_session_maker() as session:
+            try:
+                yield session
+            except Exception:
+                await session.rollback()
+                raise
+
     @asynccontextmanager
     async def connect(self) -> AsyncIterator[AsyncConnection]:
         """
@@ -107,6 +237,19 @@ class DatabaseSessionManager:
                 raise
 
 
+def _pool_info(engine: AsyncEngine) -> dict[str, Any]:
+    pool = engine.pool
+    info: dict[str, Any] = {"class": type(pool).__name__, "status": pool.status()}
+    if isinstance(pool, TimedQueuePool):
+        info |= {
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+            **pool.stats.to_dict(),
+        }
+    return info
+
+
 db_manager: DatabaseSessionManager = DatabaseSessionManager()
 
 
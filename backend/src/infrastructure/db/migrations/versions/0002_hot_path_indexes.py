@@ -0,0 +1,41 @@
+"""0002_hot_path_indexes
+
+Revision ID: 5c3e9a1b7d24
+Revises: 711628a716a7
+Create Date: 2026-10-18 11:02:17.408311
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "5c3e9a1b7d24"
+down_revision: Union[str, Sequence[str], None] = "711628a716a7"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        "ix_messages_dialog_id_created_at_id", "messages", ["dialog_id", "created_at", "id"], unique=False
+    )
+    op.create_index("ix_dialogs_user_id_created_at", "dialogs", ["user_id", "created_at"], unique=False)
+    op.create_index(
+        "ix_refresh_tokens_user_id_revoked", "refresh_tokens", ["user_id", "revoked"], unique=False
+    )
+    op.create_index(
+        "ix_agents_dialogs_dialog_id_agent_id", "agents_dialogs", ["dialog_id", "agent_id"], unique=False
+    )
+    op.create_index("ix_agents_dialogs_agent_id", "agents_dialogs", ["agent_id"], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_agents_dialogs_agent_id", table_name="agents_dialogs")
+    op.drop_index("ix_agents_dialogs_dialog_id_agent_id", table_name="agents_dialogs")
+    op.drop_index("ix_refresh_tokens_user_id_revoked", table_name="refresh_tokens")
+    op.drop_index("ix_dialogs_user_id_created_at", table_name="dialogs")
+    op.drop_index("ix_messages_dialog_id_created_at_id", table_name="messages")
@@ -0,0 +1,30 @@
+"""0003_agent_cache_responses
+
+Revision ID: 8f41c2d6a9e3
+Revises: 5c3e9a1b7d24
+Create Date: 2026-10-18 13:40:51.207114
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "8f41c2d6a9e3"
+down_revision: Union[str, Sequence[str], None] = "5c3e9a1b7d24"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "agents", sa.Column("cache_responses", sa.Boolean(), server_default=sa.false(), nullable=False)
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("agents", "cache_responses")
@@ -0,0 +1,30 @@
+"""0004_agent_llm_routing
+
+Revision ID: 2d7b9e4f1c68
+Revises: 8f41c2d6a9e3
+Create Date: 2026-10-18 15:12:34.581920
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "2d7b9e4f1c68"
+down_revision: Union[str, Sequence[str], None] = "8f41c2d6a9e3"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("agents", sa.Column("model", sa.String(length=100), nullable=True))
+    op.add_column("agents", sa.Column("endpoint", sa.String(length=100), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("agents", "endpoint")
+    op.drop_column("agents", "model")
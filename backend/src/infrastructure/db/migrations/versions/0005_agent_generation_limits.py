@@ -0,0 +1,45 @@
+"""0005_agent_generation_limits
+
+Revision ID: a3c58e0b6f17
+Revises: 2d7b9e4f1c68
+Create Date: 2026-10-18 15:48:09.334127
+
+"""
+
+from typing import Sequence, Union
+
+import advanced_alchemy
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy import Text
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = "a3c58e0b6f17"
+down_revision: Union[str, Sequence[str], None] = "2d7b9e4f1c68"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("agents", sa.Column("max_tokens", sa.Integer(), nullable=True))
+    op.add_column(
+        "agents",
+        sa.Column(
+            "stop",
+            sa.JSON()
+            .with_variant(postgresql.JSONB(astext_type=Text()), "cockroachdb")
+            .with_variant(advanced_alchemy.types.json.ORA_JSONB(), "oracle")
+            .with_variant(postgresql.JSONB(astext_type=Text()), "postgresql"),
+            nullable=True,
+        ),
+    )
+    op.add_column("agents", sa.Column("reasoning_effort", sa.String(length=16), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("agents", "reasoning_effort")
+    op.drop_column("agents", "stop")
+    op.drop_column("agents", "max_tokens")
@@ -2,8 +2,18 @@ from datetime import datetime
 from uuid import UUID
 
 from advanced_alchemy.base import UUIDAuditBase, UUIDBase, orm_registry
-from advanced_alchemy.types import DateTimeUTC
-from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, Table, Text, func
+from advanced_alchemy.types import DateTimeUTC, JsonB
+from sqlalchemy import (
+    Boolean,
+    Column,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    Table,
+    Text,
+    func,
+)
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from src.domain.messages.entities import AuthorType
@@ -32,6 +42,7 @@ class UserModel(UUIDAuditBase):
 
 class RefreshTokenModel(UUIDBase):
     __tablename__ = "refresh_tokens"
+    __table_args__ = (Index("ix_refresh_tokens_user_id_revoked", "user_id", "revoked"),)
 
     user_id: Mapped[UUID] = mapped_column(ForeignKey("users.id", ondelete="RESTRICT"))
     token_hash: Mapped[str] = mapped_column(String(150), unique=True)
@@ -46,6 +57,8 @@ agents_dialogs_model = Table(
     Column("id", Integer, primary_key=True, autoincrement=True),
     Column("agent_id", ForeignKey("agents.id", ondelete="RESTRICT")),
     Column("dialog_id", ForeignKey("dialogs.id", ondelete="RESTRICT")),
+    Index("ix_agents_dialogs_dialog_id_agent_id", "dialog_id", "agent_id"),
+    Index("ix_agents_dialogs_agent_id", "agent_id"),
 )
 
 
@@ -55,6 +68,12 @@ class AgentModel(UUIDAuditBase):
     temperature: Mapped[float] = mapped_column(default=0.7)
     description: Mapped[str] = mapped_column(Text)
     prompt: Mapped[str] = mapped_column(Text)
+    cache_responses: Mapped[bool] = mapped_column(default=False, server_default=func.false())
+    model: Mapped[str | None] = mapped_column(String(100), default=None)
+    endpoint: Mapped[str | None] = mapped_column(String(100), default=None)
+    max_tokens: Mapped[int | None] = mapped_column(default=None)
+    stop: Mapped[list[str] | None] = mapped_column(JsonB, default=None)
+    reasoning_effort: Mapped[str | None] = mapped_column(String(16), default=None)
 
 
 class PipelineModel(UUIDAuditBase):
@@ -66,6 +85,7 @@ class PipelineModel(UUIDAuditBase):
 
 class DialogModel(UUIDAuditBase):
     __tablename__ = "dialogs"
+    __table_args__ = (Index("ix_dialogs_user_id_created_at", "user_id", "created_at"),)
     name: Mapped[str] = mapped_column(String(150))
     user_id: Mapped[UUID] = mapped_column(ForeignKey("users.id", ondelete="RESTRICT"))
     pipeline_id: Mapped[UUID] = mapped_column(ForeignKey("pipelines.id", ondelete="RESTRICT"))
@@ -76,6 +96,8 @@ class DialogModel(UUIDAuditBase):
 
 class MessageModel(UUIDAuditBase):
     __tablename__ = "messages"
+    # Покрывает keyset-пагинацию истории: WHERE dialog_id = ? ORDER BY created_at, id
+    __table_args__ = (Index("ix_messages_dialog_id_created_at_id", "dialog_id", "created_at", "id"),)
 
     text: Mapped[str] = mapped_column(Text)
 
@@ -1,8 +1,8 @@
 from uuid import UUID
 
-from sqlalchemy import or_
 from advanced_alchemy.filters import LimitOffset
 from advanced_alchemy.repository import SQLAlchemyAsyncRepository
+from sqlalchemy import or_
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.domain.agents.entities import Agent, AgentFilter
@@ -68,7 +68,19 @@ class SqlAlchemyAgentRepository(AgentRepository):
         model = self._to_model(agent)
         with wrap_sqlalchemy_exception(self._repo.dialect):
             model = await self._repo.update(
-                model, attribute_names=["name", "description", "prompt", "temperature"]
+                model,
+                attribute_names=[
+                    "name",
+                    "description",
+                    "prompt",
+                    "temperature",
+                    "cache_responses",
+                    "model",
+                    "endpoint",
+                    "max_tokens",
+                    "stop",
+                    "reasoning_effort",
+                ],
             )
         return self._to_domain(model)
 
@@ -84,6 +96,12 @@ class SqlAlchemyAgentRepository(AgentRepository):
             description=model.description,
             prompt=model.prompt,
             temperature=model.temperature,
+            cache_responses=model.cache_responses,
+            model=model.model,
+            endpoint=model.endpoint,
+            max_tokens=model.max_tokens,
+            stop=model.stop,
+            reasoning_effort=model.reasoning_effort,  # type: ignore[arg-type]
         )
 
     @staticmethod
@@ -94,4 +112,10 @@ class SqlAlchemyAgentRepository(AgentRepository):
             description=agent.description,
             prompt=agent.prompt,
             temperature=agent.temperature,
+            cache_responses=agent.cache_responses,
+            model=agent.model,
+            endpoint=agent.endpoint,
+            max_tokens=agent.max_tokens,
+            stop=agent.stop,
+            reasoning_effort=agent.reasoning_effort,
         )
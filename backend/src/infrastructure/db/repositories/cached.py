@@ -0,0 +1,164 @@
+from dataclasses import replace
+from datetime import datetime
+from uuid import UUID
+
+from src.domain.agents.entities import Agent, AgentFilter
+from src.domain.agents.repository import AgentRepository
+from src.domain.auth.entities import UserClaims
+from src.domain.pipelines.entities import Pipeline
+from src.domain.pipelines.repository import PipelineRepository
+from src.domain.users.entities import User
+from src.domain.users.repository import UserRepository
+from src.infrastructure.cache import TTLCache
+from src.infrastructure.settings import settings
+
+pipeline_cache: TTLCache[UUID, Pipeline] = TTLCache(
+    "pipelines", maxsize=settings.repository_cache_size, ttl=settings.repository_cache_ttl
+)
+pipeline_version_cache: TTLCache[UUID, datetime] = TTLCache(
+    "pipeline_versions", maxsize=settings.repository_cache_size, ttl=settings.repository_cache_ttl
+)
+agent_cache: TTLCache[UUID, Agent] = TTLCache(
+    "agents", maxsize=settings.repository_cache_size, ttl=settings.repository_cache_ttl
+)
+user_claims_cache: TTLCache[UUID, UserClaims] = TTLCache(
+    "user_claims", maxsize=settings.auth_cache_size, ttl=settings.auth_cache_ttl
+)
+
+
+def invalidate_pipeline(pipeline_id: UUID) -> None:
+    pipeline_cache.pop(pipeline_id)
+    pipeline_version_cache.pop(pipeline_id)
+
+
+def invalidate_agent(agent_id: UUID) -> None:
+    agent_cache.pop(agent_id)
+
+
+def invalidate_user(user_id: UUID) -> None:
+    user_claims_cache.pop(user_id)
+
+
+class CachedPipelineRepository(PipelineRepository):
+    """
+    Read-through кэш поверх репозитория пайплайнов.
+
+    Возвращает копии закэшированных объектов, т.к. вызывающий код может их изменять.
+    Кэш сбрасывают обработчики команд после фиксации транзакции: сброс до коммита
+    позволил бы конкурентному чтению снова закэшировать старую версию.
+    """
+
+    def __init__(self, repo: PipelineRepository):
+        self._repo = repo
+
+    async def get_by_id(self, pipeline_id: UUID) -> Pipeline:
+        if (pipeline := pipeline_cache.get(pipeline_id)) is None:
+            pipeline = await self._repo.get_by_id(pipeline_id)
+            pipeline_cache.set(pipeline_id, pipeline)
+        return pipeline.model_copy(deep=True)
+
+    async def get_updated_at(self, pipeline_id: UUID) -> datetime:
+        if (updated_at := pipeline_version_cache.get(pipeline_id)) is None:
+            updated_at = await self._repo.get_updated_at(pipeline_id)
+            pipeline_version_cache.set(pipeline_id, updated_at)
+        return updated_at
+
+    async def add(self, pipeline: Pipeline) -> Pipeline:
+        return await self._repo.add(pipeline)
+
+    async def get_paginated(self, page: int, page_size: int) -> tuple[list[Pipeline], int]:
+        return await self._repo.get_paginated(page, page_size)
+
+    async def update(self, pipeline: Pipeline) -> Pipeline:
+        return await self._repo.update(pipeline)
+
+    async def delete(self, pipeline_id: UUID) -> None:
+        await self._repo.delete(pipeline_id)
+
+
+class CachedAgentRepository(AgentRepository):
+    """Read-through кэш поверх репозитория агентов. Сброс кэша — в обработчиках после коммита."""
+
+    def __init__(self, repo: AgentRepository):
+        self._repo = repo
+
+    async def get_by_id(self, agent_id: UUID) -> Agent:
+        if (agent := agent_cache.get(agent_id)) is None:
+            agent = await self._repo.get_by_id(agent_id)
+            agent_cache.set(agent_id, agent)
+        return replace(agent)
+
+    async def get_filtered(self, filter_: AgentFilter) -> tuple[list[Agent], int]:
+        return await self._repo.get_filtered(filter_)
+
+    async def get_many(self, agent_ids: list[UUID]) -> list[Agent]:
+        agents: list[Agent] = []
+        missing: list[UUID] = []
+        for agent_id in dict.fromkeys(agent_ids):
+            if (agent := agent_cache.get(agent_id)) is not None:
+                agents.append(replace(agent))
+            else:
+                missing.append(agent_id)
+
+        if missing:
+            for agent in await self._repo.get_many(missing):
+                agent_cache.set(agent.id, agent)
+                agents.append(replace(agent))
+        return agents
+
+    async def add(self, agent: Agent) -> Agent:
+        return await self._repo.add(agent)
+
+    async def update(self, agent: Agent) -> Agent:
+        return await self._repo.update(agent)
+
+    async def delete(self, agent_id: UUID) -> None:
+        await self._repo.delete(agent_id)
+
+
+class CachedUserRepository(UserRepository):
+    """
+    Репозиторий пользователей, сбрасывающий кэш прав при изменениях.
+
+    Сами пользователи не кэшируются: в `user_claims_cache` хранятся только
+    флаги, нужные для проверки access-токена. Измененные пользователи копятся
+    в `_changed` и сбрасываются из кэша через `invalidate_changed` после коммита.
+    """
+
+    def __init__(self, repo: UserRepository):
+        self._repo = repo
+        self._changed: set[UUID] = set()
+
+    def invalidate_changed(self) -> None:
+        """Вызывается Unit of Work после фиксации транзакции."""
+        for user_id in self._changed:
+            invalidate_user(user_id)
+        self._changed.clear()
+
+    def discard_changed(self) -> None:
+        """Вызывается Unit of Work при откате: данные в БД не изменились."""
+        self._changed.clear()
+
+    async def get_by_id(self, user_id: UUID) -> User:
+        return await self._repo.get_by_id(user_id)
+
+    async def get_paginated(self, page: int, page_size: int) -> tuple[list[User], int]:
+        return await self._repo.get_paginated(page, page_size)
+
+    async def add(self, user: User) -> User:
+        return await self._repo.add(user)
+
+    async def update(self, user: User) -> User:
+        user = await self._repo.update(user)
+        self._changed.add(user.id)
+        return user
+
+    async def delete(self, user_id: UUID) -> None:
+        await self._repo.delete(user_id)
+        self._changed.add(user_id)
+
+    async def get_by_username(self, username: str) -> User:
+        return await self._repo.get_by_username(username)
+
+    async def get_by_email(self, email: str) -> User:
+        return await self._repo.get_by_email(email)
@@ -1,11 +1,14 @@
+from datetime import datetime
 from uuid import UUID
 
-from advanced_alchemy.filters import LimitOffset
+from advanced_alchemy.filters import LimitOffset, OrderBy
 from advanced_alchemy.repository import SQLAlchemyAsyncRepository
+from sqlalchemy import Row, and_, insert, or_, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.domain.messages.entities import Message
 from src.domain.messages.repository import MessageRepository
+from src.domain.messages.services import estimate_tokens
 from src.infrastructure.db.exception_handler import wrap_sqlalchemy_exception
 from src.infrastructure.db.models import MessageModel
 
@@ -34,19 +37,67 @@ class SqlAlchemyMessageRepository(MessageRepository):
         offset = (page - 1) * page_size
         with wrap_sqlalchemy_exception(self._repo.dialect):
             results, total = await self._repo.list_and_count(
-                MessageModel.dialog_id == dialog_id, LimitOffset(offset=offset, limit=page_size)
+                MessageModel.dialog_id == dialog_id,
+                OrderBy("created_at", "asc"),
+                OrderBy("id", "asc"),
+                LimitOffset(offset=offset, limit=page_size),
             )
         return [self._to_domain(r) for r in results], total
 
+    async def get_history(
+        self,
+        dialog_id: UUID,
+        *,
+        limit: int,
+        before: tuple[datetime, UUID] | None = None,
+        max_tokens: int | None = None,
+    ) -> list[Message]:
+        stmt = select(MessageModel).where(MessageModel.dialog_id == dialog_id)
+        if before is not None:
+            created_at, message_id = before
+            stmt = stmt.where(
+                or_(
+                    MessageModel.created_at < created_at,
+                    and_(MessageModel.created_at == created_at, MessageModel.id < message_id),
+                )
+            )
+        stmt = stmt.order_by(MessageModel.created_at.desc(), MessageModel.id.desc()).limit(limit)
+
+        with wrap_sqlalchemy_exception(self._repo.dialect):
+            results = (await self.session.execute(stmt)).scalars().all()
+
+        # Идем от новых к старым, пока укладываемся в бюджет токенов
+        messages: list[Message] = []
+        tokens = 0
+        for model in results:
+            if max_tokens is not None:
+                # Точное число токенов записывает `ContextBuilder`, для старых сообщений — оценка
+                tokens += (model.meta_data or {}).get("tokens") or estimate_tokens(model.text)
+                if tokens > max_tokens:
+                    break
+            messages.append(self._to_domain(model))
+
+        messages.reverse()
+        return messages
+
     async def add(self, message: Message) -> Message:
         model = self._to_model(message)
         with wrap_sqlalchemy_exception(self._repo.dialect):
             model = await self._repo.add(model)
         return self._to_domain(model)
 
-    async def add_many(self, messages: list[Message]) -> list[Message]:
+    async def add_many(self, messages: list[Message], *, returning: bool = False) -> list[Message]:
+        if not messages:
+            return []
+
+        # Один многострочный INSERT на уровне Core: без ORM объектов и refresh каждой строки
+        stmt = insert(MessageModel)
+        rows = [self._to_row(m) for m in messages]
         with wrap_sqlalchemy_exception(self._repo.dialect):
-            await self._repo.add_many([self._to_model(m) for m in messages])
+            if returning:
+                result = await self.session.execute(stmt.returning(*MessageModel.__table__.c), rows)
+                return [self._to_domain(row) for row in result]
+            await self.session.execute(stmt, rows)
         return messages
 
     async def update(self, message: Message) -> Message:
@@ -62,7 +113,20 @@ class SqlAlchemyMessageRepository(MessageRepository):
             await self._repo.delete(message_id)
 
     @staticmethod
-    def _to_domain(model: MessageModel) -> Message:
+    def _to_row(domain: Message) -> dict:
+        return {
+            "id": domain.id,
+            "text": domain.text,
+            "dialog_id": domain.dialog_id,
+            "author_id": domain.author_id,
+            "author_type": domain.author_type,
+            "meta_data": domain.metadata,
+            "created_at": domain.created_at,
+            "updated_at": domain.updated_at,
+        }
+
+    @staticmethod
+    def _to_domain(model: MessageModel | Row) -> Message:
         return Message(
             id=model.id,
             text=model.text,
@@ -70,6 +134,8 @@ class SqlAlchemyMessageRepository(MessageRepository):
             author_id=model.author_id,
             author_type=model.author_type,
             metadata=model.meta_data,
+            created_at=model.created_at,
+            updated_at=model.updated_at,
         )
 
     @staticmethod
@@ -81,4 +147,6 @@ class SqlAlchemyMessageRepository(MessageRepository):
             author_id=domain.author_id,
             author_type=domain.author_type,
             meta_data=domain.metadata,
+            created_at=domain.created_at,
+            updated_at=domain.updated_at,
         )
@@ -1,9 +1,12 @@
+from datetime import datetime
 from uuid import UUID
 
 from advanced_alchemy.filters import LimitOffset
 from advanced_alchemy.repository import SQLAlchemyAsyncRepository
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from src.domain.common.exceptions import ObjectNotFoundError
 from src.domain.pipelines.entities import Pipeline
 from src.domain.pipelines.repository import PipelineRepository
 
@@ -31,6 +34,14 @@ class SqlAlchemyPipelineRepository(PipelineRepository):
             agent = await self._repo.get(pipeline_id)
         return self._to_domain(agent)
 
+    async def get_updated_at(self, pipeline_id: UUID) -> datetime:
+        with wrap_sqlalchemy_exception(self._repo.dialect):
+            stmt = select(PipelineModel.updated_at).where(PipelineModel.id == pipeline_id)
+            updated_at = (await self.session.execute(stmt)).scalar_one_or_none()
+        if updated_at is None:
+            raise ObjectNotFoundError("Object not found")
+        return updated_at
+
     async def add(self, pipeline: Pipeline) -> Pipeline:
         model = self._to_model(pipeline)
         with wrap_sqlalchemy_exception(self._repo.dialect):
@@ -60,7 +60,7 @@ class SqlAlchemyUserRepository(UserRepository):
                 attribute_names=[
                     "username",
                     "email",
-                    "password_hash",
+                    "password",
                     "first_name",
                     "last_name",
                     "is_superuser",
@@ -2,6 +2,11 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.domain.common.unit_of_work import UnitOfWork
 from src.infrastructure.db.repositories.agent_repo import SqlAlchemyAgentRepository
+from src.infrastructure.db.repositories.cached import (
+    CachedAgentRepository,
+    CachedPipelineRepository,
+    CachedUserRepository,
+)
 from src.infrastructure.db.repositories.dialog_repo import SqlAlchemyDialogRepository
 from src.infrastructure.db.repositories.message_repo import SqlAlchemyMessageRepository
 from src.infrastructure.db.repositories.pipeline_repo import (
@@ -16,11 +21,11 @@ from src.infrastructure.db.repositories.user_repo import SqlAlchemyUserRepositor
 class SqlAlchemyUnitOfWork(UnitOfWork):
     def __init__(self, session: AsyncSession):
         self._session = session
-        self._agents: SqlAlchemyAgentRepository | None = None
-        self._users: SqlAlchemyUserRepository | None = None
+        self._agents: CachedAgentRepository | None = None
+        self._users: CachedUserRepository | None = None
         self._dialogs: SqlAlchemyDialogRepository | None = None
         self._messages: SqlAlchemyMessageRepository | None = None
-        self._pipelines: SqlAlchemyPipelineRepository | None = None
+        self._pipelines: CachedPipelineRepository | None = None
         self._refresh_token: SqlAlchemyRefreshTokenRepository | None = None
 
     @property
@@ -28,15 +33,15 @@ class SqlAlchemyUnitOfWork(UnitOfWork):
         return self._session
 
     @property
-    def agents(self) -> SqlAlchemyAgentRepository:
+    def agents(self) -> CachedAgentRepository:
         if self._agents is None:
-            self._agents = SqlAlchemyAgentRepository(self._session)
+            self._agents = CachedAgentRepository(SqlAlchemyAgentRepository(self._session))
         return self._agents
 
     @property
-    def users(self) -> SqlAlchemyUserRepository:
+    def users(self) -> CachedUserRepository:
         if self._users is None:
-            self._users = SqlAlchemyUserRepository(self._session)
+            self._users = CachedUserRepository(SqlAlchemyUserRepository(self._session))
         return self._users
 
     @property
@@ -52,9 +57,9 @@ class SqlAlchemyUnitOfWork(UnitOfWork):
         return self._messages
 
     @property
-    def pipelines(self) -> SqlAlchemyPipelineRepository:
+    def pipelines(self) -> CachedPipelineRepository:
         if self._pipelines is None:
-            self._pipelines = SqlAlchemyPipelineRepository(self._session)
+            self._pipelines = CachedPipelineRepository(SqlAlchemyPipelineRepository(self._session))
         return self._pipelines
 
     @property
@@ -74,6 +79,10 @@ class SqlAlchemyUnitOfWork(UnitOfWork):
 
     async def commit(self):
         await self._session.commit()
+        if self._users is not None:
+            self._users.invalidate_changed()
 
     async def rollback(self):
         await self._session.rollback()
+        if self._users is not None:
+            self._users.discard_changed()
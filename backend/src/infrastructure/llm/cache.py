@@ -0,0 +1,192 @@
+import asyncio
+import hashlib
+import json
+import sqlite3
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Any, AsyncGenerator, Iterator
+
+from src.application.services import AgentLLMClient
+from src.domain.messages.entities import Message
+from src.infrastructure.cache import CacheStats, TTLCache
+
+
+class LLMResponseCache(ABC):
+    """Хранилище ответов LLM по ключу запроса."""
+
+    name: str
+
+    def __init__(self) -> None:
+        self.stats = CacheStats()
+
+    @abstractmethod
+    async def get(self, key: str) -> str | None: ...
+
+    @abstractmethod
+    async def set(self, key: str, value: str) -> None: ...
+
+    @abstractmethod
+    async def info(self) -> dict[str, Any]: ...
+
+
+class MemoryResponseCache(LLMResponseCache):
+    """Процесс-локальный LRU кэш ответов."""
+
+    name = "memory"
+
+    def __init__(self, *, maxsize: int, ttl: float) -> None:
+        self._cache: TTLCache[str, str] = TTLCache("llm_responses", maxsize=maxsize, ttl=ttl)
+        self.stats = self._cache.stats
+
+    async def get(self, key: str) -> str | None:
+        return self._cache.get(key)
+
+    async def set(self, key: str, value: str) -> None:
+        self._cache.set(key, value)
+
+    async def info(self) -> dict[str, Any]:
+        return {"backend": self.name, **self._cache.info()}
+
+
+class SQLiteResponseCache(LLMResponseCache):
+    """
+    Кэш ответов в SQLite файле: переживает перезапуск и общий для процессов на одной машине.
+
+    Запросы к файлу выполняются в потоке, чтобы не блокировать event loop.
+    При превышении `maxsize` удаляются давно не читавшиеся записи.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path: str, *, maxsize: int, ttl: float) -> None:
+        super().__init__()
+        self.path = path
+        self.maxsize = maxsize
+        self.ttl = ttl
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_responses ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "expire_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS ix_llm_responses_accessed_at ON llm_responses (accessed_at)"
+            )
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.path, timeout=5.0)
+        try:
+            with conn:  # commit или rollback
+                yield conn
+        finally:
+            conn.close()
+
+    async def get(self, key: str) -> str | None:
+        value = await asyncio.to_thread(self._get, key)
+        if value is None:
+            self.stats.misses += 1
+        else:
+            self.stats.hits += 1
+        return value
+
+    async def set(self, key: str, value: str) -> None:
+        if self.ttl > 0 and self.maxsize > 0:
+            self.stats.evictions += await asyncio.to_thread(self._set, key, value)
+
+    def _get(self, key: str) -> str | None:
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT value FROM llm_responses WHERE key = ? AND expire_at > ?", (key, now)
+            ).fetchone()
+            if row is not None:
+                conn.execute("UPDATE llm_responses SET accessed_at = ? WHERE key = ?", (now, key))
+        return row[0] if row else None
+
+    def _set(self, key: str, value: str) -> int:
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_responses (key, value, expire_at, accessed_at) "
+                "VALUES (?, ?, ?, ?)",
+                (key, value, now + self.ttl, now),
+            )
+            evicted = conn.execute("DELETE FROM llm_responses WHERE expire_at <= ?", (now,)).rowcount
+            evicted += conn.execute(
+                "DELETE FROM llm_responses WHERE key IN ("
+                "SELECT key FROM llm_responses ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.maxsize,),
+            ).rowcount
+        return evicted
+
+    def _size(self) -> int:
+        with self._connect() as conn:
+            (size,) = conn.execute("SELECT COUNT(*) FROM llm_responses").fetchone()
+        return size
+
+    async def info(self) -> dict[str, Any]:
+        size = await asyncio.to_thread(self._size)
+        return {
+            "backend": self.name,
+            "path": self.path,
+            "size": size,
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            **self.stats.to_dict(),
+        }
+
+
+class CachingLLMClient(AgentLLMClient):
+    """
+    Декоратор LLM клиента, возвращающий сохраненный ответ на точно такой же запрос.
+
+    Ключ — хэш модели, системного промпта, сообщений (роль и текст) и параметров
+    генерации. Имеет смысл только для детерминированных агентов, поэтому
+    включается для каждого агента отдельно (`Agent.cache_responses`).
+    """
+
+    def __init__(self, client: AgentLLMClient, cache: LLMResponseCache) -> None:
+        self.client = client
+        self.cache = cache
+
+    async def generate(self, system_prompt: str, messages: list[Message], **kwargs: Any) -> str:
+        key = self.make_key(system_prompt, messages, **kwargs)
+        if (answer := await self.cache.get(key)) is not None:
+            return answer
+        answer = await self.client.generate(system_prompt, messages, **kwargs)
+        await self.cache.set(key, answer)
+        return answer
+
+    async def generate_choices(
+        self, system_prompt: str, messages: list[Message], n: int, **kwargs: Any
+    ) -> list[str]:
+        # Несколько вариантов просят ради разных ответов, из кэша они не берутся
+        return await self.client.generate_choices(system_prompt, messages, n, **kwargs)
+
+    async def generate_stream(
+        self, system_prompt: str, messages: list[Message], **kwargs: Any
+    ) -> AsyncGenerator[str, None]:
+        key = self.make_key(system_prompt, messages, **kwargs)
+        if (answer := await self.cache.get(key)) is not None:
+            yield answer
+            return
+
+        chunks: list[str] = []
+        async for chunk in self.client.generate_stream(system_prompt, messages, **kwargs):
+            chunks.append(chunk)
+            yield chunk
+        # Сохраняем только полностью полученный ответ
+        await self.cache.set(key, "".join(chunks).strip())
+
+    def make_key(self, system_prompt: str, messages: list[Message], **kwargs: Any) -> str:
+        payload = {
+            # Модель берем у клиента, если он ее знает, иначе различаем по типу клиента
+            "model": getattr(self.client, "model", type(self.client).__name__),
+            "system": system_prompt.strip(),
+            "messages": [[msg.author_type.value, msg.text.strip()] for msg in messages],
+            "params": kwargs,
+        }
+        raw = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(raw.encode()).hexdigest()
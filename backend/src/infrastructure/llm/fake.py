@@ -0,0 +1,120 @@
+import asyncio
+import hashlib
+import math
+import random
+from dataclasses import dataclass
+from typing import Any, AsyncGenerator
+
+from src.application.services import AgentLLMClient, LLMUsage, record_llm_usage
+from src.domain.messages.entities import Message
+from src.domain.messages.services import estimate_tokens
+
+_WORDS = (
+    "идея", "риск", "план", "рынок", "клиент", "продукт", "команда", "бюджет", "срок", "гипотеза",
+    "метрика", "рост", "качество", "скорость", "стоимость", "решение", "вариант", "анализ", "шаг", "итог",
+)  # fmt: skip
+
+
+@dataclass(frozen=True, slots=True, kw_only=True)
+class FakeLLMProfile:
+    """
+    Поведение фейкового провайдера.
+
+    Время до первого токена распределено логнормально с медианой `latency`
+    и разбросом `latency_sigma`, дальше ответ идет со скоростью `tokens_per_second`.
+    Доля `error_rate` вызовов завершается ошибкой со статусом `error_status`.
+    """
+
+    latency: float = 0.5
+    latency_sigma: float = 0.3
+    tokens_per_second: float = 50.0
+    answer_tokens: int = 64
+    error_rate: float = 0.0
+    error_status: int = 503
+    seed: int | None = None
+
+
+class FakeLLMError(Exception):
+    """Ошибка провайдера; `status_code` понимают планировщик и повторы вызовов."""
+
+    def __init__(self, status_code: int) -> None:
+        super().__init__(f"Fake LLM error {status_code}")
+        self.status_code = status_code
+        self.response = None
+
+
+class FakeLLMClient(AgentLLMClient):
+    """
+    Детерминированный LLM без сети: ответ зависит только от промпта и контекста,
+    задержки и ошибки — от `FakeLLMProfile`. Для нагрузочных тестов и локальной разработки.
+    """
+
+    def __init__(self, profile: FakeLLMProfile | None = None, *, model: str = "fake") -> None:
+        self.profile = profile or FakeLLMProfile()
+        self.model = model
+        # Случайность только для имитации задержек и ошибок, криптостойкость не требуется
+        self._random = random.Random(self.profile.seed)  # noqa: S311
+
+    async def generate(self, system_prompt: str, messages: list[Message], **kwargs: Any) -> str:
+        return "".join([chunk async for chunk in self.generate_stream(system_prompt, messages, **kwargs)])
+
+    async def generate_stream(
+        self, system_prompt: str, messages: list[Message], **kwargs: Any
+    ) -> AsyncGenerator[str, None]:
+        texts = [msg.text for msg in messages]
+        words = self.answer(system_prompt, texts, max_tokens=kwargs.get("max_tokens"))
+        await asyncio.sleep(self.first_token_delay())
+        self.maybe_fail()
+
+        per_token = 1 / self.profile.tokens_per_second if self.profile.tokens_per_second > 0 else 0.0
+        for i, word in enumerate(words):
+            if i and per_token:
+                await asyncio.sleep(per_token)
+            yield word if i == 0 else " " + word
+
+        record_llm_usage(
+            LLMUsage(prompt_tokens=self.prompt_tokens(system_prompt, texts), completion_tokens=len(words))
+        )
+
+    async def generate_choices(
+        self, system_prompt: str, messages: list[Message], n: int, **kwargs: Any
+    ) -> list[str]:
+        texts = [msg.text for msg in messages]
+        max_tokens = kwargs.get("max_tokens")
+        answers = [self.answer(system_prompt, texts, max_tokens=max_tokens, choice=i) for i in range(n)]
+        # Как у провайдера: одна задержка на запрос, ответ готов, когда готов самый длинный вариант
+        longest = max(len(words) for words in answers)
+        per_token = 1 / self.profile.tokens_per_second if self.profile.tokens_per_second > 0 else 0.0
+        await asyncio.sleep(self.first_token_delay() + per_token * (longest - 1))
+        self.maybe_fail()
+
+        record_llm_usage(
+            LLMUsage(
+                prompt_tokens=self.prompt_tokens(system_prompt, texts),
+                completion_tokens=sum(len(words) for words in answers),
+            )
+        )
+        return [" ".join(words) for words in answers]
+
+    def answer(
+        self, system_prompt: str, texts: list[str], *, max_tokens: int | None = None, choice: int = 0
+    ) -> list[str]:
+        """Слова ответа (один токен на слово), одинаковые для одинакового запроса и номера варианта."""
+        parts = [system_prompt, *texts] if choice == 0 else [system_prompt, *texts, str(choice)]
+        digest = hashlib.sha256("\x00".join(parts).encode()).digest()
+        count = min(self.profile.answer_tokens, max_tokens or self.profile.answer_tokens)
+        # Генератор с зерном из хэша запроса нужен ради воспроизводимости, а не криптостойкости
+        return random.Random(digest).choices(_WORDS, k=max(1, count))  # noqa: S311
+
+    @staticmethod
+    def prompt_tokens(system_prompt: str, texts: list[str]) -> int:
+        return estimate_tokens(system_prompt) + sum(estimate_tokens(text) for text in texts)
+
+    def first_token_delay(self) -> float:
+        if self.profile.latency <= 0:
+            return 0.0
+        return self.profile.latency * math.exp(self.profile.latency_sigma * self._random.gauss())
+
+    def maybe_fail(self) -> None:
+        if self.profile.error_rate > 0 and self._random.random() < self.profile.error_rate:
+            raise FakeLLMError(self.profile.error_status)
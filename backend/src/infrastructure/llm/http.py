@@ -0,0 +1,150 @@
+import asyncio
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass
+from typing import Any, AsyncIterator, Iterator, cast
+
+import httpx
+from openai import DefaultAsyncHttpxClient
+
+# Время ожидания соединения для запросов текущего вызова LLM (см. `track_pool_wait`)
+_pool_waits: ContextVar[list[float] | None] = ContextVar("llm_pool_waits", default=None)
+
+
+@dataclass(slots=True)
+class HttpPoolStats:
+    requests: int = 0
+    connects: int = 0
+    wait_seconds: float = 0.0
+    max_wait_seconds: float = 0.0
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            **asdict(self),
+            "avg_wait_ms": round(self.wait_seconds / (self.requests or 1) * 1000, 3),
+        }
+
+
+class TimedTransport(httpx.AsyncHTTPTransport):
+    """
+    Транспорт httpx, измеряющий ожидание соединения из пула.
+
+    Ожидание — время от начала запроса до отправки заголовков за вычетом
+    установки нового соединения (TCP + TLS). Считается по trace-событиям httpcore.
+    Запрос считается активным, пока не закрыт поток его ответа.
+    """
+
+    def __init__(self, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self.stats = HttpPoolStats()
+        self.in_flight = 0
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        started_at = time.perf_counter()
+        connect_started_at = 0.0
+        connect_seconds = 0.0
+        recorded = False
+        parent_trace = request.extensions.get("trace")
+
+        async def trace(event_name: str, info: dict[str, Any]) -> None:
+            nonlocal connect_started_at, connect_seconds, recorded
+            now = time.perf_counter()
+            if event_name.startswith("connection.") and event_name.endswith(".started"):
+                connect_started_at = now
+            elif event_name.startswith("connection.") and event_name.endswith(".complete"):
+                connect_seconds += now - connect_started_at
+                if event_name == "connection.connect_tcp.complete":
+                    self.stats.connects += 1
+            elif event_name.endswith("send_request_headers.started") and not recorded:
+                recorded = True
+                self._record_wait(now - started_at - connect_seconds)
+            if parent_trace is not None:
+                await parent_trace(event_name, info)
+
+        request.extensions["trace"] = trace
+        self.in_flight += 1
+        try:
+            response = await super().handle_async_request(request)
+        except BaseException:
+            self.in_flight -= 1
+            raise
+        # AsyncHTTPTransport всегда отдает асинхронный поток
+        response.stream = _TrackedStream(cast(httpx.AsyncByteStream, response.stream), self)
+        return response
+
+    def _record_wait(self, wait: float) -> None:
+        self.stats.requests += 1
+        self.stats.wait_seconds += wait
+        self.stats.max_wait_seconds = max(self.stats.max_wait_seconds, wait)
+        if (waits := _pool_waits.get()) is not None:
+            waits.append(wait)
+
+    def info(self) -> dict[str, Any]:
+        return {"in_flight": self.in_flight, **self.stats.to_dict()}
+
+
+class _TrackedStream(httpx.AsyncByteStream):
+    """Поток ответа, снимающий запрос с учета `TimedTransport.in_flight` при закрытии."""
+
+    def __init__(self, stream: httpx.AsyncByteStream, transport: TimedTransport) -> None:
+        self._stream = stream
+        self._transport = transport
+        self._closed = False
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self) -> None:
+        if not self._closed:
+            self._closed = True
+            self._transport.in_flight -= 1
+        await self._stream.aclose()
+
+
+@contextmanager
+def track_pool_wait() -> Iterator[list[float]]:
+    """Собирает время ожидания соединения для всех HTTP запросов внутри блока."""
+    waits: list[float] = []
+    token = _pool_waits.set(waits)
+    try:
+        yield waits
+    finally:
+        _pool_waits.reset(token)
+
+
+def create_http_transport(
+    *, max_connections: int, max_keepalive_connections: int, keepalive_expiry: float, http2: bool
+) -> TimedTransport:
+    """Транспорт с настраиваемым пулом соединений для LLM провайдеров."""
+    limits = httpx.Limits(
+        max_connections=max_connections,
+        max_keepalive_connections=max_keepalive_connections,
+        keepalive_expiry=keepalive_expiry,
+    )
+    return TimedTransport(limits=limits, http2=http2)
+
+
+def create_http_client(
+    transport: TimedTransport, *, timeout: float, connect_timeout: float
+) -> httpx.AsyncClient:
+    """Общий HTTP клиент для LLM провайдеров поверх `create_http_transport`."""
+    return DefaultAsyncHttpxClient(
+        transport=transport, timeout=httpx.Timeout(timeout, connect=connect_timeout)
+    )
+
+
+async def warm_up(client: httpx.AsyncClient, base_url: str, connections: int) -> int:
+    """
+    Заранее открывает `connections` соединений с `base_url`, чтобы первые вызовы LLM
+    не тратили время на TCP и TLS. Запрос — дешевый GET /models: ответ сервера
+    (в том числе 401 без ключа) не важен, соединения остаются в пуле.
+
+    Возвращает число успешных запросов.
+    """
+    if connections <= 0:
+        return 0
+    url = f"{base_url.rstrip('/')}/models"
+    results = await asyncio.gather(*(client.get(url) for _ in range(connections)), return_exceptions=True)
+    return sum(1 for result in results if not isinstance(result, BaseException))
@@ -1,20 +1,133 @@
-from typing import Any
+from typing import Any, AsyncGenerator
 
+import httpx
 from openai import AsyncOpenAI
 from openai.resources.chat.completions.completions import ChatCompletionMessageParam
+from openai.types.completion_usage import CompletionUsage
 from openai.types.shared.chat_model import ChatModel
 
-from src.application.services import AgentLLMClient
+from src.application.services import AgentLLMClient, LLMUsage, record_llm_usage
 from src.domain.messages.entities import AuthorType, Message
 
+from .http import track_pool_wait
+
+# Reasoning модели принимают max_completion_tokens вместо max_tokens и только температуру по умолчанию
+REASONING_MODEL_PREFIXES = ("o1", "o3", "o4", "gpt-5")
+
 
 class OpenAIChatClient(AgentLLMClient):
-    def __init__(self, api_key: str, model: ChatModel, base_url: str | None = None) -> None:
+    def __init__(
+        self,
+        api_key: str,
+        model: ChatModel | str,
+        base_url: str | None = None,
+        http_client: httpx.AsyncClient | None = None,
+        max_retries: int = 2,
+        pool_wait_log_threshold: float = 0.05,
+    ) -> None:
         self._api_key: str = api_key
-        self.model: ChatModel = model
-        self.client = AsyncOpenAI(api_key=self._api_key, base_url=base_url)
+        self.pool_wait_log_threshold = pool_wait_log_threshold
+        # Модель произвольного OpenAI-совместимого провайдера может не входить в ChatModel
+        self.model: ChatModel | str = model
+        # http_client — общий пул соединений (см. `create_http_client`)
+        self.client = AsyncOpenAI(
+            api_key=self._api_key, base_url=base_url, http_client=http_client, max_retries=max_retries
+        )
 
     async def generate(self, system_prompt: str, messages: list[Message], **kwargs: Any) -> str:
+        # Агент может переопределить модель endpoint'а
+        model = kwargs.pop("model", None) or self.model
+        context = self._build_context(system_prompt, messages)
+        with track_pool_wait() as waits:
+            resp = await self.client.chat.completions.create(
+                model=model, messages=context, **self._generation_params(model, kwargs)
+            )
+        self._report_pool_wait(model, waits)
+        self._report_finish_reason(model, resp.choices[0].finish_reason)
+        self._record_usage(model, resp.usage)
+        return (resp.choices[0].message.content or "").strip()
+
+    async def generate_choices(
+        self, system_prompt: str, messages: list[Message], n: int, **kwargs: Any
+    ) -> list[str]:
+        # Один запрос с n вариантами: prompt токены оплачиваются один раз
+        model = kwargs.pop("model", None) or self.model
+        context = self._build_context(system_prompt, messages)
+        with track_pool_wait() as waits:
+            resp = await self.client.chat.completions.create(
+                model=model, messages=context, n=n, **self._generation_params(model, kwargs)
+            )
+        self._report_pool_wait(model, waits)
+        for choice in resp.choices:
+            self._report_finish_reason(model, choice.finish_reason)
+        self._record_usage(model, resp.usage)
+        choices = sorted(resp.choices, key=lambda choice: choice.index)
+        return [(choice.message.content or "").strip() for choice in choices]
+
+    async def generate_stream(
+        self, system_prompt: str, messages: list[Message], **kwargs: Any
+    ) -> AsyncGenerator[str, None]:
+        model = kwargs.pop("model", None) or self.model
+        context = self._build_context(system_prompt, messages)
+        with track_pool_wait() as waits:
+            stream = await self.client.chat.completions.create(
+                model=model,
+                messages=context,
+                stream=True,
+                # Расход токенов приходит последним фрагментом без choices
+                stream_options={"include_usage": True},
+                **self._generation_params(model, kwargs),
+            )
+        self._report_pool_wait(model, waits)
+        async for chunk in stream:
+            if chunk.usage is not None:
+                self._record_usage(model, chunk.usage)
+            if not chunk.choices:
+                continue
+            if delta := chunk.choices[0].delta.content:
+                yield delta
+            self._report_finish_reason(model, chunk.choices[0].finish_reason)
+
+    @staticmethod
+    def _generation_params(model: str, kwargs: dict[str, Any]) -> dict[str, Any]:
+        """Приводит параметры агента к виду, который принимает модель."""
+        params = {key: value for key, value in kwargs.items() if value is not None}
+        if model.startswith(REASONING_MODEL_PREFIXES):
+            if "max_tokens" in params:
+                params["max_completion_tokens"] = params.pop("max_tokens")
+            params.pop("temperature", None)
+        else:
+            params.pop("reasoning_effort", None)
+        return params
+
+    @staticmethod
+    def _record_usage(model: str, usage: CompletionUsage | None) -> None:
+        if usage is None:
+            return
+        details = usage.prompt_tokens_details
+        cached = (details.cached_tokens or 0) if details is not None else 0
+        record_llm_usage(
+            LLMUsage(
+                prompt_tokens=usage.prompt_tokens,
+                completion_tokens=usage.completion_tokens,
+                cached_tokens=cached,
+            )
+        )
+        print(f"LLM call {model}: {usage.prompt_tokens} prompt tokens, {cached} cached")
+
+    @staticmethod
+    def _report_finish_reason(model: str, finish_reason: str | None) -> None:
+        if finish_reason == "length":
+            print(f"LLM call {model}: answer truncated by max_tokens")
+
+    def _report_pool_wait(self, model: str, waits: list[float]) -> None:
+        if not waits or max(waits) < self.pool_wait_log_threshold:
+            return
+        # Несколько значений — были повторные попытки запроса
+        print(f"LLM call {model}: pool wait {', '.join(f'{w * 1000:.1f}' for w in waits)} ms")
+
+    @staticmethod
+    def _build_context(system_prompt: str, messages: list[Message]) -> list[ChatCompletionMessageParam]:
         context: list[ChatCompletionMessageParam] = [{"role": "system", "content": system_prompt}]
         for message in messages:
             if message.author_type == AuthorType.USER:
@@ -28,6 +141,4 @@ class OpenAIChatClient(AgentLLMClient):
             print(message)
         print("*" * 200)
         print("\n")
-
-        resp = await self.client.chat.completions.create(model=self.model, messages=context, **kwargs)
-        return (resp.choices[0].message.content or "").strip()
+        return context
@@ -0,0 +1,210 @@
+import asyncio
+import random
+import time
+from collections import deque
+from contextlib import aclosing
+from dataclasses import asdict, dataclass
+from typing import Any, AsyncGenerator, Awaitable, Callable
+
+import httpx
+import openai
+
+from src.application.services import AgentLLMClient
+from src.domain.messages.entities import Message
+
+# Ошибки, после которых повтор запроса имеет смысл. 429 повторяют `LLMScheduler` и `LLMRouter`
+RETRYABLE_STATUS_CODES = frozenset({408, 409, 500, 502, 503, 504})
+
+
+def is_retryable(exc: BaseException) -> bool:
+    if isinstance(exc, (TimeoutError, openai.APIConnectionError, httpx.TransportError)):
+        return True
+    return getattr(exc, "status_code", None) in RETRYABLE_STATUS_CODES
+
+
+class LatencyWindow:
+    """Длительности последних успешных запросов для оценки перцентилей."""
+
+    def __init__(self, size: int = 500) -> None:
+        self._values: deque[float] = deque(maxlen=size)
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def add(self, value: float) -> None:
+        self._values.append(value)
+
+    def percentile(self, q: float) -> float | None:
+        if not self._values:
+            return None
+        values = sorted(self._values)
+        return values[min(len(values) - 1, int(q * len(values)))]
+
+
+@dataclass(slots=True)
+class LLMCallStats:
+    calls: int = 0
+    failed: int = 0
+    retries: int = 0
+    timeouts: int = 0
+    hedges: int = 0  # Запущено дублирующих запросов
+    hedges_won: int = 0  # Дубль ответил раньше основного запроса
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            **asdict(self),
+            "hedge_win_rate": round(self.hedges_won / self.hedges, 3) if self.hedges else None,
+        }
+
+
+class ResilientLLMClient(AgentLLMClient):
+    """
+    Декоратор LLM клиента для снижения хвостовых задержек.
+
+    - `timeout` — дедлайн одной попытки (для стрима — до первого фрагмента ответа);
+    - повтор с экспоненциальной задержкой и jitter только для временных ошибок
+      (таймауты, обрывы соединения, 5xx), не больше `max_retries` раз. Это
+      единственное место, где повторяются такие ошибки: роутер на них не
+      переключается, а планировщик повторяет только 429;
+    - hedging: если запрос не ответил за `hedge_quantile` перцентиль недавних
+      длительностей, отправляется дубль и берется первый ответ. Для стримов
+      не применяется — дубль пришлось бы вычитывать параллельно с отданным ответом.
+      Для нескольких вариантов ответа (`generate_choices`) тоже: дубль удвоил бы
+      и без того кратный расход токенов.
+    """
+
+    def __init__(
+        self,
+        client: AgentLLMClient,
+        *,
+        timeout: float = 0.0,
+        max_retries: int = 2,
+        backoff: float = 0.5,
+        max_backoff: float = 8.0,
+        hedge: bool = False,
+        hedge_quantile: float = 0.95,
+        hedge_min_delay: float = 1.0,
+        hedge_min_samples: int = 20,
+    ) -> None:
+        self.client = client
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile
+        self.hedge_min_delay = hedge_min_delay
+        self.hedge_min_samples = hedge_min_samples
+        self.latencies = LatencyWindow()
+        self.stats = LLMCallStats()
+
+    @property
+    def model(self) -> str:
+        return getattr(self.client, "model", type(self.client).__name__)
+
+    async def generate(self, system_prompt: str, messages: list[Message], **kwargs: Any) -> str:
+        self.stats.calls += 1
+        attempt = 0
+        while True:
+            try:
+                async with asyncio.timeout(self.timeout or None):
+                    return await self._hedged(lambda: self.client.generate(system_prompt, messages, **kwargs))
+            except Exception as exc:
+                await self._before_retry(exc, attempt)
+            attempt += 1
+
+    async def generate_choices(
+        self, system_prompt: str, messages: list[Message], n: int, **kwargs: Any
+    ) -> list[str]:
+        self.stats.calls += 1
+        attempt = 0
+        while True:
+            try:
+                async with asyncio.timeout(self.timeout or None):
+                    return await self.client.generate_choices(system_prompt, messages, n, **kwargs)
+            except Exception as exc:
+                await self._before_retry(exc, attempt)
+            attempt += 1
+
+    async def generate_stream(
+        self, system_prompt: str, messages: list[Message], **kwargs: Any
+    ) -> AsyncGenerator[str, None]:
+        self.stats.calls += 1
+        attempt = 0
+        while True:
+            async with aclosing(self.client.generate_stream(system_prompt, messages, **kwargs)) as stream:
+                started_at = time.perf_counter()
+                try:
+                    async with asyncio.timeout(self.timeout or None):
+                        first = await anext(stream, None)
+                except Exception as exc:
+                    await self._before_retry(exc, attempt)
+                    attempt += 1
+                    continue
+                self.latencies.add(time.perf_counter() - started_at)
+                # После первого фрагмента ответ уже у клиента, повторять нельзя
+                if first is not None:
+                    yield first
+                async for chunk in stream:
+                    yield chunk
+                return
+
+    def hedge_delay(self) -> float | None:
+        """Через сколько секунд отправлять дубль; None — пока не отправлять."""
+        if not self.hedge or len(self.latencies) < self.hedge_min_samples:
+            return None
+        return max(self.hedge_min_delay, self.latencies.percentile(self.hedge_quantile) or 0.0)
+
+    def info(self) -> dict[str, Any]:
+        percentiles = {f"latency_p{round(q * 100)}": self.latencies.percentile(q) for q in (0.5, 0.95, 0.99)}
+        return {
+            "hedge_delay": self.hedge_delay(),
+            **{name: round(value, 4) if value is not None else None for name, value in percentiles.items()},
+            **self.stats.to_dict(),
+        }
+
+    async def _hedged(self, call: Callable[[], Awaitable[str]]) -> str:
+        primary = asyncio.create_task(self._timed(call))
+        pending = {primary}
+        try:
+            delay = self.hedge_delay()
+            if delay is not None:
+                done, pending = await asyncio.wait(pending, timeout=delay)
+                if not done:
+                    self.stats.hedges += 1
+                    pending.add(asyncio.create_task(self._timed(call)))
+
+            error: BaseException | None = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if (exc := task.exception()) is None:
+                        if task is not primary:
+                            self.stats.hedges_won += 1
+                        return task.result()
+                    error = error or exc
+            if error is None:  # Основной запрос завершился до запуска дубля
+                return primary.result()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def _timed(self, call: Callable[[], Awaitable[str]]) -> str:
+        started_at = time.perf_counter()
+        result = await call()
+        self.latencies.add(time.perf_counter() - started_at)
+        return result
+
+    async def _before_retry(self, exc: Exception, attempt: int) -> None:
+        """Пробрасывает ошибку, если повторять нельзя, иначе ждет перед повтором."""
+        if isinstance(exc, TimeoutError):
+            self.stats.timeouts += 1
+        if not is_retryable(exc) or attempt >= self.max_retries:
+            self.stats.failed += 1
+            raise exc
+        self.stats.retries += 1
+        # Full jitter: повторы параллельных вызовов не приходят к провайдеру одновременно.
+        # Случайность нужна только для разброса задержек, криптостойкость не требуется
+        backoff = min(self.max_backoff, self.backoff * 2**attempt)
+        await asyncio.sleep(random.uniform(0, backoff))  # noqa: S311
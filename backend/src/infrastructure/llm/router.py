@@ -0,0 +1,219 @@
+import asyncio
+import time
+from contextlib import aclosing
+from dataclasses import asdict, dataclass
+from typing import Any, AsyncGenerator, Awaitable, Callable
+
+from src.application.services import AgentLLMClient
+from src.domain.common.exceptions import ValidationError
+from src.domain.messages.entities import Message
+
+from .resilience import is_retryable
+from .scheduler import LLMScheduler, is_rate_limited
+
+
+@dataclass(slots=True)
+class EndpointStats:
+    requests: int = 0
+    failures: int = 0
+    failovers: int = 0  # Запрос ушел на другой endpoint после ошибки этого
+
+
+class LLMEndpoint:
+    """
+    Один API ключ на одном base_url со своим планировщиком лимитов.
+
+    После `failure_threshold` ошибок подряд endpoint считается деградировавшим
+    и `cooldown` секунд получает запросы, только если здоровых не осталось.
+    `timeout` — дедлайн одного запроса к endpoint'у (для стрима — до первого
+    фрагмента): зависший endpoint получает ошибку и уходит в конец очереди.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        client: AgentLLMClient,
+        *,
+        scheduler: LLMScheduler | None = None,
+        failure_threshold: int = 3,
+        cooldown: float = 30.0,
+        timeout: float = 0.0,
+    ) -> None:
+        self.name = name
+        self.client = client
+        self.scheduler = scheduler
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.timeout = timeout
+        self.outstanding = 0
+        self.consecutive_failures = 0
+        self.degraded_until = 0.0
+        self.stats = EndpointStats()
+
+    @property
+    def healthy(self) -> bool:
+        return time.monotonic() >= self.degraded_until
+
+    def record_success(self) -> None:
+        self.consecutive_failures = 0
+        self.degraded_until = 0.0
+
+    def record_failure(self) -> None:
+        self.stats.failures += 1
+        self.consecutive_failures += 1
+        if self.consecutive_failures >= self.failure_threshold:
+            self.degraded_until = time.monotonic() + self.cooldown
+
+    def info(self) -> dict[str, Any]:
+        return {
+            "model": getattr(self.client, "model", None),
+            "healthy": self.healthy,
+            "outstanding": self.outstanding,
+            "consecutive_failures": self.consecutive_failures,
+            **asdict(self.stats),
+        }
+
+
+def is_failover_error(exc: BaseException) -> bool:
+    """Ошибка endpoint, а не запроса: считается при выводе endpoint'а из ротации."""
+    return is_retryable(exc) or is_rate_limited(exc)
+
+
+class LLMRouter(AgentLLMClient):
+    """
+    Выбирает endpoint для каждого вызова.
+
+    Endpoint'ы объединены в группы (уровни моделей); группу выбирает агент
+    параметром `endpoint`, без него используется `default_group`. Внутри
+    группы запрос уходит на здоровый endpoint с наименьшим числом запросов
+    в работе.
+
+    Сам роутер повторяет только ответ 429: запрос сразу уходит на следующий
+    endpoint группы (стрим — только пока не получен первый фрагмент). Временные
+    ошибки (таймауты, 5xx) пробрасываются и повторяются `ResilientLLMClient`:
+    повтор снова проходит через роутер и уходит на endpoint без недавних ошибок.
+    Так число попыток одного вызова не перемножается между слоями.
+
+    Дедлайн попытки (`LLMEndpoint.timeout`) отсчитывает сам роутер: отмена сверху
+    не отличает зависший endpoint от ненужного ответа (отмененная ветка, проигравший
+    дубль), а свой таймаут засчитывается ошибкой именно этому endpoint'у.
+    """
+
+    def __init__(self, groups: dict[str, list[LLMEndpoint]], *, default_group: str = "default") -> None:
+        if not groups.get(default_group):
+            raise ValueError(f"LLM endpoint group {default_group!r} is not configured")
+        self.groups = groups
+        self.default_group = default_group
+
+    @property
+    def model(self) -> str:
+        endpoint = self.groups[self.default_group][0]
+        return getattr(endpoint.client, "model", type(endpoint.client).__name__)
+
+    async def generate(
+        self, system_prompt: str, messages: list[Message], *, endpoint: str | None = None, **kwargs: Any
+    ) -> str:
+        return await self._call(endpoint, lambda client: client.generate(system_prompt, messages, **kwargs))
+
+    async def generate_choices(
+        self,
+        system_prompt: str,
+        messages: list[Message],
+        n: int,
+        *,
+        endpoint: str | None = None,
+        **kwargs: Any,
+    ) -> list[str]:
+        return await self._call(
+            endpoint, lambda client: client.generate_choices(system_prompt, messages, n, **kwargs)
+        )
+
+    async def generate_stream(
+        self, system_prompt: str, messages: list[Message], *, endpoint: str | None = None, **kwargs: Any
+    ) -> AsyncGenerator[str, None]:
+        group = self._group(endpoint)
+        tried: list[LLMEndpoint] = []
+        while True:
+            target = self._pick(group, tried)
+            target.outstanding += 1
+            target.stats.requests += 1
+            received = False
+            try:
+                async with aclosing(
+                    target.client.generate_stream(system_prompt, messages, **kwargs)
+                ) as stream:
+                    async with asyncio.timeout(target.timeout or None):
+                        first = await anext(stream, None)
+                    # После первого фрагмента ответ уже у клиента, дедлайн и переключение не действуют
+                    received = True
+                    if first is not None:
+                        yield first
+                    async for chunk in stream:
+                        yield chunk
+            except Exception as exc:
+                if received:
+                    if is_failover_error(exc):
+                        target.record_failure()
+                    raise
+                self._on_error(exc, target, group, tried)
+                continue
+            finally:
+                target.outstanding -= 1
+            target.record_success()
+            return
+
+    def info(self) -> dict[str, Any]:
+        return {
+            name: {endpoint.name: endpoint.info() for endpoint in endpoints}
+            for name, endpoints in self.groups.items()
+        }
+
+    async def _call[T](self, endpoint: str | None, call: Callable[[AgentLLMClient], Awaitable[T]]) -> T:
+        group = self._group(endpoint)
+        tried: list[LLMEndpoint] = []
+        while True:
+            target = self._pick(group, tried)
+            target.outstanding += 1
+            target.stats.requests += 1
+            try:
+                async with asyncio.timeout(target.timeout or None):
+                    result = await call(target.client)
+            except Exception as exc:
+                self._on_error(exc, target, group, tried)
+                continue
+            finally:
+                target.outstanding -= 1
+            target.record_success()
+            return result
+
+    def _group(self, name: str | None) -> list[LLMEndpoint]:
+        group = self.groups.get(name or self.default_group)
+        if group is None:
+            raise ValidationError(f"Unknown LLM endpoint: {name}")
+        return group
+
+    @staticmethod
+    def _pick(group: list[LLMEndpoint], tried: list[LLMEndpoint]) -> LLMEndpoint:
+        candidates = [endpoint for endpoint in group if endpoint not in tried]
+        # Деградировавшие и с недавней ошибкой — в последнюю очередь;
+        # при равной нагрузке — менее загруженный за все время
+        return min(
+            candidates,
+            key=lambda e: (not e.healthy, e.consecutive_failures > 0, e.outstanding, e.stats.requests),
+        )
+
+    @staticmethod
+    def _on_error(
+        exc: Exception, target: LLMEndpoint, group: list[LLMEndpoint], tried: list[LLMEndpoint]
+    ) -> None:
+        """Пробрасывает ошибку, если это не 429 или переключаться некуда."""
+        if not is_failover_error(exc):
+            raise exc
+        target.record_failure()
+        if not is_rate_limited(exc):
+            raise exc
+        tried.append(target)
+        if len(tried) >= len(group):
+            raise exc
+        target.stats.failovers += 1
+        print(f"LLM endpoint {target.name} failed ({type(exc).__name__}), failing over")
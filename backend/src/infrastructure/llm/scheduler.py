@@ -0,0 +1,260 @@
+import asyncio
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, AsyncGenerator, Awaitable, Callable
+
+from src.application.services import AgentLLMClient
+from src.domain.messages.entities import Message
+from src.domain.messages.services import estimate_tokens
+
+
+class TokenBucket:
+    """
+    Ведро токенов с непрерывным пополнением `per_minute` единиц в минуту.
+
+    Ожидающие обслуживаются по очереди (FIFO). При `per_minute <= 0` лимита нет.
+    """
+
+    def __init__(self, per_minute: float) -> None:
+        self.per_minute = per_minute
+        self.capacity = per_minute
+        self._tokens = per_minute
+        self._updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    @property
+    def available(self) -> float:
+        self._refill()
+        return self._tokens
+
+    async def acquire(self, amount: float = 1) -> None:
+        if self.per_minute <= 0:
+            return
+        # Запрос больше емкости ведра иначе ждал бы вечно
+        amount = min(amount, self.capacity)
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return
+                await asyncio.sleep((amount - self._tokens) / self.per_minute * 60)
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.per_minute / 60)
+        self._updated_at = now
+
+
+class AdaptiveConcurrency:
+    """
+    Ограничение числа одновременных вызовов с AIMD подстройкой.
+
+    Успешный быстрый вызов увеличивает лимит примерно на 1 за "окно" из `limit` вызовов,
+    ответ 429 уменьшает его вдвое, медленный ответ (дольше `latency_target`) — на 10%.
+    """
+
+    def __init__(self, *, initial: int, minimum: int, maximum: int, latency_target: float) -> None:
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.limit = float(min(max(initial, self.minimum), self.maximum))
+        self.latency_target = latency_target
+        self.in_flight = 0
+        self._cond = asyncio.Condition()
+
+    async def acquire(self) -> None:
+        async with self._cond:
+            await self._cond.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+
+    async def release(self, *, latency: float | None = None, throttled: bool = False) -> None:
+        async with self._cond:
+            self.in_flight -= 1
+            if throttled:
+                self.limit = max(self.minimum, self.limit / 2)
+            elif latency is not None and 0 < self.latency_target < latency:
+                self.limit = max(self.minimum, self.limit * 0.9)
+            elif latency is not None:
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            self._cond.notify_all()
+
+
+@dataclass(slots=True)
+class SchedulerStats:
+    queued: int = 0
+    completed: int = 0
+    throttled: int = 0
+    failed: int = 0
+    wait_seconds: float = 0.0
+    max_wait_seconds: float = 0.0
+
+    def to_dict(self) -> dict[str, Any]:
+        started = self.completed + self.failed
+        return {**asdict(self), "avg_wait_ms": round(self.wait_seconds / (started or 1) * 1000, 3)}
+
+
+class LLMScheduler:
+    """
+    Общая очередь вызовов LLM с учетом лимитов провайдера.
+
+    Перед вызовом ждет места в ведрах запросов (RPM) и токенов (TPM) и свободного
+    слота конкурентности. Ответ 429 не пробрасывается сразу: лимит конкурентности
+    уменьшается, а вызов возвращается в очередь до `max_retries` раз.
+    """
+
+    def __init__(
+        self,
+        *,
+        rpm: float,
+        tpm: float,
+        max_concurrency: int,
+        min_concurrency: int = 1,
+        latency_target: float = 0.0,
+        max_retries: int = 5,
+        retry_delay: float = 1.0,
+    ) -> None:
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.concurrency = AdaptiveConcurrency(
+            initial=max_concurrency,
+            minimum=min_concurrency,
+            maximum=max_concurrency,
+            latency_target=latency_target,
+        )
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.stats = SchedulerStats()
+
+    async def acquire(self, tokens: int) -> None:
+        self.stats.queued += 1
+        queued_at = time.perf_counter()
+        try:
+            await self.requests.acquire(1)
+            await self.tokens.acquire(tokens)
+            await self.concurrency.acquire()
+        finally:
+            self.stats.queued -= 1
+        waited = time.perf_counter() - queued_at
+        self.stats.wait_seconds += waited
+        self.stats.max_wait_seconds = max(self.stats.max_wait_seconds, waited)
+
+    async def release(self, *, latency: float | None = None, throttled: bool = False) -> None:
+        await self.concurrency.release(latency=latency, throttled=throttled)
+
+    async def run[T](self, tokens: int, call: Callable[[], Awaitable[T]]) -> T:
+        attempt = 0
+        while True:
+            await self.acquire(tokens)
+            started_at = time.perf_counter()
+            latency: float | None = None
+            throttled = False
+            try:
+                result = await call()
+                latency = time.perf_counter() - started_at
+                self.stats.completed += 1
+                return result
+            except Exception as exc:
+                throttled = is_rate_limited(exc)
+                if not (throttled and attempt < self.max_retries):
+                    self.stats.failed += 1
+                    raise
+                self.stats.throttled += 1
+                delay = self.retry_delay_for(exc, attempt)
+            finally:
+                # Слот освобождается и при отмене вызова
+                await self.release(latency=latency, throttled=throttled)
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    def retry_delay_for(self, exc: BaseException, attempt: int) -> float:
+        return retry_after(exc) or self.retry_delay * 2**attempt
+
+    def info(self) -> dict[str, Any]:
+        return {
+            "in_flight": self.concurrency.in_flight,
+            "concurrency_limit": round(self.concurrency.limit, 2),
+            "rpm_available": round(self.requests.available, 1),
+            "tpm_available": round(self.tokens.available, 1),
+            **self.stats.to_dict(),
+        }
+
+
+def is_rate_limited(exc: BaseException) -> bool:
+    return getattr(exc, "status_code", None) == 429
+
+
+def retry_after(exc: BaseException) -> float | None:
+    """Значение заголовка Retry-After ответа 429, если провайдер его прислал."""
+    response = getattr(exc, "response", None)
+    value = response.headers.get("retry-after") if response is not None else None
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+class SchedulingLLMClient(AgentLLMClient):
+    """Декоратор LLM клиента, пропускающий все вызовы через `LLMScheduler`."""
+
+    def __init__(
+        self, client: AgentLLMClient, scheduler: LLMScheduler, *, completion_tokens: int = 512
+    ) -> None:
+        self.client = client
+        self.scheduler = scheduler
+        self.completion_tokens = completion_tokens
+
+    @property
+    def model(self) -> str:
+        return getattr(self.client, "model", type(self.client).__name__)
+
+    async def generate(self, system_prompt: str, messages: list[Message], **kwargs: Any) -> str:
+        return await self.scheduler.run(
+            self._estimate_tokens(system_prompt, messages, kwargs),
+            lambda: self.client.generate(system_prompt, messages, **kwargs),
+        )
+
+    async def generate_choices(
+        self, system_prompt: str, messages: list[Message], n: int, **kwargs: Any
+    ) -> list[str]:
+        return await self.scheduler.run(
+            self._estimate_tokens(system_prompt, messages, kwargs, n=n),
+            lambda: self.client.generate_choices(system_prompt, messages, n, **kwargs),
+        )
+
+    async def generate_stream(
+        self, system_prompt: str, messages: list[Message], **kwargs: Any
+    ) -> AsyncGenerator[str, None]:
+        scheduler = self.scheduler
+        tokens = self._estimate_tokens(system_prompt, messages, kwargs)
+        attempt = 0
+        while True:
+            await scheduler.acquire(tokens)
+            started_at = time.perf_counter()
+            latency: float | None = None
+            throttled = False
+            received = False
+            try:
+                async for chunk in self.client.generate_stream(system_prompt, messages, **kwargs):
+                    received = True
+                    yield chunk
+                latency = time.perf_counter() - started_at
+                scheduler.stats.completed += 1
+                return
+            except Exception as exc:
+                throttled = is_rate_limited(exc)
+                # Повторять можно, только пока клиенту ничего не отдали
+                if not (throttled and not received and attempt < scheduler.max_retries):
+                    scheduler.stats.failed += 1
+                    raise
+                scheduler.stats.throttled += 1
+                delay = scheduler.retry_delay_for(exc, attempt)
+            finally:
+                await scheduler.release(latency=latency, throttled=throttled)
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    def _estimate_tokens(
+        self, system_prompt: str, messages: list[Message], kwargs: dict[str, Any], *, n: int = 1
+    ) -> int:
+        prompt = estimate_tokens(system_prompt) + sum(estimate_tokens(msg.text) for msg in messages)
+        return prompt + n * (kwargs.get("max_tokens") or self.completion_tokens)
@@ -0,0 +1,171 @@
+"""
+OpenAI-совместимый сервер-заглушка для нагрузочных тестов `OpenAIChatClient`.
+
+Отвечает на POST /v1/chat/completions (в том числе stream=true) ответами
+`FakeLLMClient` с заданными задержками, скоростью токенов и долей ошибок.
+Несколько вариантов ответа (`n`) поддерживаются только без стриминга.
+
+Запуск из каталога backend:
+    python -m src.infrastructure.llm.stub_server --port 8001 --latency 0.3 --error-rate 0.01
+
+и в .env приложения:
+    OPENAI_BASE_URL=http://127.0.0.1:8001/v1
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from typing import Any, AsyncIterator
+from uuid import uuid4
+
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from .fake import FakeLLMClient, FakeLLMError, FakeLLMProfile
+
+
+def create_stub_app(profile: FakeLLMProfile) -> FastAPI:
+    app = FastAPI(title="LLM stub")
+    fake = FakeLLMClient(profile)
+
+    # Сюда же ходит прогрев пула соединений (`warm_up`)
+    @app.get("/v1/models")
+    async def models() -> dict[str, Any]:
+        model = {"id": fake.model, "object": "model", "created": 0, "owned_by": "stub"}
+        return {"object": "list", "data": [model]}
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request) -> Response:
+        body = await request.json()
+        model = body.get("model", fake.model)
+        system = [m["content"] for m in body["messages"] if m["role"] in ("system", "developer")]
+        texts = [m["content"] for m in body["messages"] if m["role"] not in ("system", "developer")]
+        system_prompt = "".join(system)
+        max_tokens = body.get("max_completion_tokens") or body.get("max_tokens")
+        n = 1 if body.get("stream") else body.get("n") or 1
+        answers = [fake.answer(system_prompt, texts, max_tokens=max_tokens, choice=i) for i in range(n)]
+        prompt_tokens = fake.prompt_tokens(system_prompt, texts)
+        completion_tokens = sum(len(choice) for choice in answers)
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
+
+        await asyncio.sleep(fake.first_token_delay())
+        try:
+            fake.maybe_fail()
+        except FakeLLMError as exc:
+            return _error_response(exc.status_code)
+
+        completion = _Completion(model=model, max_tokens=max_tokens, usage=usage)
+        if not body.get("stream"):
+            # Время генерации всего ответа, как у настоящего провайдера
+            if profile.tokens_per_second > 0:
+                longest = max(len(choice) for choice in answers)
+                await asyncio.sleep((longest - 1) / profile.tokens_per_second)
+            return JSONResponse(completion.response(answers))
+
+        include_usage = bool((body.get("stream_options") or {}).get("include_usage"))
+        events = completion.stream(answers[0], profile.tokens_per_second, include_usage=include_usage)
+        return StreamingResponse(events, media_type="text/event-stream")
+
+    return app
+
+
+class _Completion:
+    """Ответ chat completions в формате OpenAI: целиком или чанками SSE."""
+
+    def __init__(self, *, model: str, max_tokens: int | None, usage: dict[str, int]) -> None:
+        self.id = f"chatcmpl-{uuid4().hex}"
+        self.created = int(time.time())
+        self.model = model
+        self.max_tokens = max_tokens
+        self.usage = usage
+
+    def finish_reason(self, choice: list[str]) -> str:
+        return "length" if self.max_tokens and len(choice) >= self.max_tokens else "stop"
+
+    def response(self, answers: list[list[str]]) -> dict[str, Any]:
+        return {
+            "id": self.id,
+            "object": "chat.completion",
+            "created": self.created,
+            "model": self.model,
+            "choices": [
+                {
+                    "index": i,
+                    "message": {"role": "assistant", "content": " ".join(choice)},
+                    "finish_reason": self.finish_reason(choice),
+                }
+                for i, choice in enumerate(answers)
+            ],
+            "usage": self.usage,
+        }
+
+    def chunk(self, choices: list[dict[str, Any]], **extra: Any) -> str:
+        data = {
+            "id": self.id,
+            "object": "chat.completion.chunk",
+            "created": self.created,
+            "model": self.model,
+            "choices": choices,
+            **extra,
+        }
+        return f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+    async def stream(
+        self, words: list[str], tokens_per_second: float, *, include_usage: bool
+    ) -> AsyncIterator[str]:
+        for i, word in enumerate(words):
+            if i and tokens_per_second > 0:
+                await asyncio.sleep(1 / tokens_per_second)
+            delta = {"role": "assistant", "content": word} if i == 0 else {"content": " " + word}
+            yield self.chunk([{"index": 0, "delta": delta, "finish_reason": None}])
+        yield self.chunk([{"index": 0, "delta": {}, "finish_reason": self.finish_reason(words)}])
+        if include_usage:
+            yield self.chunk([], usage=self.usage)
+        yield "data: [DONE]\n\n"
+
+
+def _error_response(status_code: int) -> JSONResponse:
+    headers = {"retry-after": "1"} if status_code == 429 else None
+    return JSONResponse(
+        {"error": {"message": f"Injected error {status_code}", "type": "stub_error", "code": status_code}},
+        status_code=status_code,
+        headers=headers,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency", type=float, default=0.5, help="Медиана времени до первого токена, с")
+    parser.add_argument("--latency-sigma", type=float, default=0.3, help="Разброс (логнормальный)")
+    parser.add_argument("--tokens-per-second", type=float, default=50.0)
+    parser.add_argument("--answer-tokens", type=int, default=64)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    import uvicorn
+
+    profile = FakeLLMProfile(
+        latency=args.latency,
+        latency_sigma=args.latency_sigma,
+        tokens_per_second=args.tokens_per_second,
+        answer_tokens=args.answer_tokens,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        seed=args.seed,
+    )
+    uvicorn.run(create_stub_app(profile), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+from typing import Any
+
+from src.application.services import Tokenizer
+from src.domain.messages.services import estimate_tokens
+
+
+class HeuristicTokenizer(Tokenizer):
+    """Оценка ~4 символа на токен, если точный токенизатор недоступен."""
+
+    def count(self, text: str) -> int:
+        return estimate_tokens(text)
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        return text[-max(0, max_tokens - 1) * 4 :] if max_tokens > 1 else ""
+
+
+class TiktokenTokenizer(Tokenizer):
+    """Токенизатор OpenAI моделей (tiktoken), работает локально."""
+
+    def __init__(self, encoding: Any) -> None:
+        self.encoding = encoding
+
+    def count(self, text: str) -> int:
+        return len(self.encoding.encode(text, disallowed_special=()))
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        tokens = self.encoding.encode(text, disallowed_special=())
+        return self.encoding.decode(tokens[-max_tokens:]) if max_tokens > 0 else ""
+
+
+def create_tokenizer(model: str) -> Tokenizer:
+    """
+    Токенизатор для модели.
+
+    tiktoken — необязательная зависимость, а словарь кодировки он скачивает
+    при первом использовании (или берет из TIKTOKEN_CACHE_DIR). Если что-то
+    из этого недоступно, используется грубая оценка.
+    """
+    try:
+        import tiktoken
+    except ImportError:
+        print("tiktoken is not installed, token counts are estimated")
+        return HeuristicTokenizer()
+
+    try:
+        try:
+            encoding = tiktoken.encoding_for_model(model)
+        except KeyError:  # Неизвестная tiktoken модель, например у совместимого провайдера
+            encoding = tiktoken.get_encoding("o200k_base")
+    except Exception as exc:
+        print(f"Failed to load tiktoken encoding ({type(exc).__name__}), token counts are estimated")
+        return HeuristicTokenizer()
+    return TiktokenTokenizer(encoding)
@@ -1,48 +1,111 @@
 import asyncio
-from functools import wraps
+import contextlib
+import heapq
+from operator import attrgetter
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Coroutine,
+    Iterable,
+    Iterator,
+    Sequence,
+)
 from uuid import UUID
 
+from src.application.agents.context import ContextBuilder
 from src.application.agents.handlers import AgentRunner
+from src.application.messages.dto import MessageDTO
+from src.application.pipelines.dto import PipelineEventDTO, PipelineEventType
 from src.application.services import AgentLLMClient
 from src.domain.agents.entities import Agent
 from src.domain.messages.entities import AuthorType, Message
+from src.domain.messages.services import estimate_tokens
 from src.domain.pipelines.entities import (
-    AgentNode,
-    Node,
-    ParallelNode,
+    SELECTING_MERGE_STRATEGIES,
+    FailurePolicy,
+    MergeStrategy,
     Pipeline,
-    SequenceNode,
-    TransformNode,
 )
 
+from .history import MERGED_FROM, HistoryIndex, deduplicate
+from .plan import ExecutionPlan, PlanStep
 
-def set_previous_node_decorator(func):
+StepRunner = Callable[[PlanStep, HistoryIndex, list[Message] | None], Awaitable[list[Message]]]
+BranchTask = asyncio.Task[list[Message] | None]
+BranchRunner = Callable[[int], Coroutine[Any, Any, list[Message] | None]]
 
-    @wraps(func)
-    def wrapper(self: "PipelineExecutor", node: Node, *args, **kwargs):
-        result = func(self, node, *args, **kwargs)
-        self.set_previous_node(node)
-        return result
+_created_at = attrgetter("created_at")
+
+
+class ParallelNodeError(ValueError):
+    """Ветки параллельного узла не дали нужного числа результатов."""
+
+
+class ChoiceBatch:
+    """
+    Один запрос к LLM с `n` вариантами ответа на несколько одинаковых веток параллельного узла.
+
+    Запрос запускает первая дошедшая до него ветка, остальные ждут свой вариант.
+    Отмена одной ветки запрос не отменяет — его отменяет параллельный узел, когда
+    варианты больше никому не нужны.
+    """
+
+    __slots__ = ("positions", "n", "task")
 
-    return wrapper
+    def __init__(self, node_ids: list[UUID]) -> None:
+        self.positions = {node_id: i for i, node_id in enumerate(node_ids)}
+        self.n = len(node_ids)
+        self.task: asyncio.Task[list[Message]] | None = None
+
+    async def take(self, node_id: UUID) -> Message:
+        if self.task is None:
+            raise RuntimeError(f"Choice request for node {node_id} has not been started")
+        choices = await asyncio.shield(self.task)
+        return choices[self.positions[node_id]]
 
 
 class PipelineExecutor:
     def __init__(
-        self, pipeline: Pipeline, *, dialog_id: UUID, agents: list[Agent], llm_client: AgentLLMClient
+        self,
+        pipeline: Pipeline | ExecutionPlan,
+        *,
+        dialog_id: UUID,
+        agents: list[Agent],
+        llm_client: AgentLLMClient,
+        cached_llm_client: AgentLLMClient | None = None,
+        context_builder: ContextBuilder | None = None,
+        batch_choices: bool = True,
     ):
-        self.pipeline = pipeline
+        self.plan = pipeline if isinstance(pipeline, ExecutionPlan) else ExecutionPlan.compile(pipeline)
         self.dialog_id = dialog_id
+        # Агенты с `cache_responses` ходят в LLM через кэш ответов, если он настроен
         self.agents: dict[UUID, AgentRunner] = {
-            agent.id: AgentRunner(agent, llm_client=llm_client, dialog_id=dialog_id) for agent in agents
+            agent.id: AgentRunner(
+                agent,
+                llm_client=cached_llm_client if agent.cache_responses and cached_llm_client else llm_client,
+                dialog_id=dialog_id,
+                context_builder=context_builder,
+            )
+            for agent in agents
         }
         self.llm_client = llm_client
+        self.context_builder = context_builder
         self.generated_messages: list[Message] = []
-        self._previous_node: Node | None = None
-
-    def set_previous_node(self, node: Node):
-        if isinstance(node, (AgentNode, SequenceNode, ParallelNode, TransformNode)):
-            self._previous_node = node
+        # Прошлые ответы шагов за текущий ход: агенты параллельного узла получают одни и те же
+        # объединенные сообщения, а не собирают их каждый заново
+        self._previous_messages: dict[int, Sequence[Message]] = {}
+        # Одинаковые агенты в ветках параллельного узла получают ответы одним запросом с `n` вариантами
+        self.batch_choices = batch_choices
+        self._choice_batches: dict[UUID, ChoiceBatch] = {}
+        self._on_event: Callable[[PipelineEventDTO], Awaitable[None]] | None = None
+        self._step_runners: dict[str, StepRunner] = {
+            "agent": self._run_agent_node,
+            "sequence": self._run_sequence_node,
+            "parallel": self._run_parallel_node,
+            "transform": self._run_transform_node,
+        }
 
     async def run(self, user_id: UUID, user_input: str, history: list[Message]) -> list[Message]:
         # Сохраняем сообщение пользователя
@@ -50,78 +113,393 @@ class PipelineExecutor:
         self.generated_messages.append(user_msg)
         history.append(user_msg)
 
-        # Прокидываем историю в рекурсивную обработку
-        new_messages = await self._run_node(self.pipeline.root, history)
+        # Индекс истории строится один раз и прокидывается в рекурсивную обработку
+        self._previous_messages.clear()
+        try:
+            new_messages = await self._run_node(self.plan.root, HistoryIndex(history))
+        finally:
+            self._previous_messages.clear()
         return new_messages
 
-    @set_previous_node_decorator
+    async def stream(
+        self, user_id: UUID, user_input: str, history: list[Message]
+    ) -> AsyncIterator[PipelineEventDTO]:
+        """
+        Запускает пайплайн и отдаёт события выполнения (старт/завершение узлов,
+        фрагменты ответов агентов) по мере их появления.
+
+        Итоговые сообщения доступны в `self.generated_messages` после завершения итератора.
+        """
+        queue: asyncio.Queue[PipelineEventDTO | None] = asyncio.Queue()
+        self._on_event = queue.put
+
+        task = asyncio.create_task(self.run(user_id=user_id, user_input=user_input, history=history))
+        task.add_done_callback(lambda _: queue.put_nowait(None))
+        try:
+            while (event := await queue.get()) is not None:
+                yield event
+            await task  # Пробрасываем исключение выполнения, если оно было
+        finally:
+            if not task.done():
+                task.cancel()
+            self._on_event = None
+
+    async def _emit(self, event: PipelineEventDTO) -> None:
+        if self._on_event is not None:
+            await self._on_event(event)
+
     async def _run_node(
-        self, node: Node, messages: list[Message], extra_messages: list[Message] | None = None
+        self, index: int, history: HistoryIndex, extra_messages: list[Message] | None = None
     ) -> list[Message]:
-        if node.type == "agent" and isinstance(node, AgentNode):
-            # Запускаем агента
-            return await self._run_agent_node(node, messages, extra_messages)
-
-        elif hasattr(node, "nodes"):  # SequenceNode или ParallelNode
-            if node.type == "sequence" and isinstance(node, SequenceNode):
-                # Передаем результат предыдущего узла в следующий
-                return await self._run_sequence_node(node, messages)
-
-            elif node.type == "parallel" and isinstance(node, ParallelNode):
-                return await self._run_parallel_node(node, messages, extra_messages)
-
-        return []
+        step = self.plan.steps[index]
+        await self._emit(
+            PipelineEventDTO(
+                type=PipelineEventType.NODE_START,
+                node_id=step.node_id,
+                node_type=step.type,
+                agent_id=step.agent_id,
+            )
+        )
+        result = await self._step_runners[step.type](step, history, extra_messages)
+        await self._emit(
+            PipelineEventDTO(
+                type=PipelineEventType.NODE_FINISH,
+                node_id=step.node_id,
+                node_type=step.type,
+                agent_id=step.agent_id,
+                messages=[MessageDTO.from_entity(msg) for msg in result],
+            )
+        )
+        return result
 
     async def _run_agent_node(
-        self, node: AgentNode, messages: list[Message], extra_messages: list[Message] | None = None
+        self, step: PlanStep, history: HistoryIndex, extra_messages: list[Message] | None = None
     ) -> list[Message]:
         """Запускает агента на выполнение"""
 
-        print(f"Running agent {node.agent_id}...")
-        if node.agent_id not in self.agents:
-            raise ValueError(f"Agent with id {node.agent_id} not found. Check your pipeline config.")
+        print(f"Running agent {step.agent_id}...")
+        if step.agent_id not in self.agents:
+            raise ValueError(f"Agent with id {step.agent_id} not found. Check your pipeline config.")
+
+        agent = self.agents[step.agent_id]
+        batch = self._choice_batches.get(step.node_id)
+        if batch is not None and batch.task is not None:  # Запрос уже отправлен другой веткой
+            return [await self._take_choice(step, batch)]
+
+        messages_for_agent, deduplicated = self._agent_context(step, agent, history, extra_messages)
 
-        agent = self.agents[node.agent_id]
+        if batch is not None:
+            batch.task = asyncio.create_task(
+                self._run_choices(agent, messages_for_agent, batch.n, deduplicated)
+            )
+            return [await self._take_choice(step, batch)]
+
+        async def on_delta(chunk: str) -> None:
+            await self._emit_delta(step, chunk)
 
+        # Запускаем агента. При потоковом выполнении фрагменты ответа сразу уходят в события.
+        agent_msg = await agent.run(
+            messages_for_agent, on_delta=on_delta if self._on_event is not None else None
+        )
+        if deduplicated:
+            agent_msg.metadata["deduplicated"] = deduplicated
+        self.generated_messages.append(agent_msg)  # Сохраняем сообщение агента в истории
+        return [agent_msg]
+
+    def _agent_context(
+        self, step: PlanStep, agent: AgentRunner, history: HistoryIndex, extra_messages: list[Message] | None
+    ) -> tuple[list[Message], dict[str, int] | None]:
+        """Сообщения для агента в хронологическом порядке и сводка по удаленным повторам."""
         # Агент видит только свои прошлые сообщения и сообщения пользователя.
-        messages_for_agent = [
-            msg for msg in messages if msg.author_type == AuthorType.USER or msg.author_id == agent.agent_id
-        ]
+        sources: list[Iterable[Message]] = [history.visible_to(agent.agent_id)]
 
         if extra_messages:  # Если есть дополнительные сообщения, добавляем их
-            messages_for_agent.extend(extra_messages)
+            sources.append(sorted(extra_messages, key=_created_at))
 
         # Из истории достаём сообщения предыдущего узла.
         # Нужно для того, чтобы агент мог видеть свои предыдущие запросы,
         # на основе которых ранее сам генерировал ответы.
         # Используется, если в цепочке есть несколько агентов.
-        if self._previous_node is not None:
-            messages_for_agent.extend(self._get_previous_node_messages(self._previous_node, messages))
-
-        # Сортируем сообщения по времени в обратном порядке (от новых к старым)
-        messages_for_agent = sorted(messages_for_agent, key=lambda msg: msg.created_at, reverse=True)
+        if step.previous is not None:
+            sources.append(self._get_previous_node_messages(step.previous, history))
+
+        # Хронологический порядок: история — неизменный префикс промпта между ходами,
+        # новые сообщения добавляются в конец, и провайдер может взять префикс из кэша промптов.
+        # Все источники уже упорядочены, поэтому достаточно слияния
+        messages_for_agent = list(heapq.merge(*sources, key=_created_at))
+
+        # Один и тот же ответ может прийти и из истории, и от предыдущего узла — модели он нужен один раз
+        messages_for_agent, duplicates = deduplicate(messages_for_agent)
+        if not duplicates:
+            return messages_for_agent, None
+        duplicate_tokens = sum(self._count_tokens(msg) for msg in duplicates)
+        print(
+            f"Agent {agent.agent.name}: {len(duplicates)} duplicate messages "
+            f"({duplicate_tokens} tokens) removed from context"
+        )
+        return messages_for_agent, {"messages": len(duplicates), "tokens": duplicate_tokens}
 
-        agent_msg = await agent.run(messages_for_agent)  # Запускаем агента
-        self.generated_messages.append(agent_msg)  # Сохраняем сообщение агента в истории
-        return [agent_msg]
+    @staticmethod
+    async def _run_choices(
+        agent: AgentRunner, messages: list[Message], n: int, deduplicated: dict[str, int] | None
+    ) -> list[Message]:
+        choices = await agent.run_choices(messages, n)
+        if deduplicated:
+            for msg in choices:
+                msg.metadata["deduplicated"] = deduplicated
+        return choices
+
+    async def _take_choice(self, step: PlanStep, batch: ChoiceBatch) -> Message:
+        agent_msg = await batch.take(step.node_id)
+        # Варианты не стримятся: при потоковом выполнении ответ уходит одним фрагментом
+        await self._emit_delta(step, agent_msg.text)
+        self.generated_messages.append(agent_msg)
+        return agent_msg
+
+    async def _emit_delta(self, step: PlanStep, chunk: str) -> None:
+        await self._emit(
+            PipelineEventDTO(
+                type=PipelineEventType.DELTA,
+                node_id=step.node_id,
+                node_type=step.type,
+                agent_id=step.agent_id,
+                delta=chunk,
+            )
+        )
 
-    async def _run_sequence_node(self, node: SequenceNode, messages: list[Message]) -> list[Message]:
-        print(f"Running sequence node {node.id}...")
+    async def _run_sequence_node(
+        self, step: PlanStep, history: HistoryIndex, extra_messages: list[Message] | None = None
+    ) -> list[Message]:
+        print(f"Running sequence node {step.node_id}...")
+        # Передаем результат предыдущего узла в следующий
         answer_msgs: list[Message] = []
-        for child in node.nodes:
-            answer_msgs = await self._run_node(child, messages, answer_msgs)
+        for child in step.children:
+            answer_msgs = await self._run_node(child, history, answer_msgs)
         return answer_msgs
 
     async def _run_parallel_node(
-        self, node: ParallelNode, messages: list[Message], extra_messages: list[Message] | None = None
+        self, step: PlanStep, history: HistoryIndex, extra_messages: list[Message] | None = None
+    ) -> list[Message]:
+        print(f"Running parallel node {step.node_id}...")
+        batches, children = self._batch_children(step) if self.batch_choices else ([], step.children)
+        run_branch = self._branch_runner(step, len(children), history, extra_messages)
+        selecting = step.merge_strategy in SELECTING_MERGE_STRATEGIES
+        try:
+            # При fail_fast TaskGroup отменяет остальные ветки после первой ошибки
+            async with asyncio.TaskGroup() as tg:
+                tasks: list[BranchTask] = [tg.create_task(run_branch(child)) for child in children]
+                selected = tasks
+                if selecting:
+                    selected = await self._select_branches(step, tasks)
+                    # Ответы остальных веток не нужны: отмена сразу прерывает их запросы к LLM
+                    for task in tasks:
+                        task.cancel()
+        except ExceptionGroup as group:
+            raise group.exceptions[0]  # Наружу — исходная ошибка ветки, а не ExceptionGroup
+        finally:
+            self._release_batches(batches)
+
+        # Успешные ответы сохраняются, даже если часть веток упала
+        agent_msgs: list[Message] = []
+        for task in selected:
+            if (result := task.result()) is not None:
+                agent_msgs.extend(result)
+        if selecting:
+            self._record_selection(step, tasks, selected)
+        return [self._merge(agent_msgs, step.merge_strategy or "")]
+
+    def _branch_runner(
+        self, step: PlanStep, branches: int, history: HistoryIndex, extra_messages: list[Message] | None
+    ) -> BranchRunner:
+        """
+        Запуск ветки параллельного узла по его политике ошибок.
+
+        При fail_fast ошибка ветки пробрасывается. При остальных политиках ветка
+        возвращает None, пока успешных веток еще может набраться `required`.
+        """
+        # Не больше max_concurrency веток одновременно
+        semaphore = asyncio.Semaphore(step.max_concurrency) if step.max_concurrency else None
+
+        async def run_child(child: int) -> list[Message]:
+            return await self._run_branch(step, child, history, extra_messages, semaphore)
+
+        if step.failure_policy == FailurePolicy.FAIL_FAST:
+            return run_child
+
+        required = 1
+        if step.failure_policy == FailurePolicy.AT_LEAST and step.min_successes:
+            required = step.min_successes
+        errors: list[Exception] = []
+
+        async def run_child_tolerant(child: int) -> list[Message] | None:
+            # Ошибка ветки не отменяет соседей; отмена (CancelledError) проходит дальше
+            try:
+                return await run_child(child)
+            except Exception as exc:
+                errors.append(exc)
+                await self._report_branch_failure(step, child, exc)
+                if branches - len(errors) < required:
+                    # Нужного числа результатов уже не набрать — остальные ветки отменяются
+                    raise ParallelNodeError(
+                        f"Parallel node {step.node_id}: {len(errors)} of {branches} "
+                        f"branches failed, at least {required} must succeed"
+                    ) from exc
+                return None
+
+        return run_child_tolerant
+
+    async def _run_branch(
+        self,
+        step: PlanStep,
+        child: int,
+        history: HistoryIndex,
+        extra_messages: list[Message] | None,
+        semaphore: asyncio.Semaphore | None,
+    ) -> list[Message]:
+        """Выполняет ветку в слоте `semaphore`; таймаут узла считается с момента старта ветки."""
+        async with semaphore or contextlib.nullcontext():
+            timeout = asyncio.timeout(step.timeout)
+            try:
+                async with timeout:
+                    return await self._run_node(child, history, extra_messages)
+            except TimeoutError as exc:
+                if not timeout.expired():  # Таймаут внутри ветки, например вызова LLM
+                    raise
+                raise ParallelNodeError(
+                    f"Parallel node {step.node_id}: branch timed out after {step.timeout}s"
+                ) from exc
+
+    async def _report_branch_failure(self, step: PlanStep, child: int, exc: Exception) -> None:
+        print(f"Parallel node {step.node_id}: branch failed: {exc!r}")
+        child_step = self.plan.steps[child]
+        await self._emit(
+            PipelineEventDTO(
+                type=PipelineEventType.NODE_FINISH,
+                node_id=child_step.node_id,
+                node_type=child_step.type,
+                agent_id=child_step.agent_id,
+                detail=str(exc) or type(exc).__name__,
+            )
+        )
+
+    def _batch_children(self, step: PlanStep) -> tuple[list[ChoiceBatch], Sequence[int]]:
+        """
+        Объединяет ветки параллельного узла с одним и тем же агентом в запросы с `n` вариантами.
+
+        Ветки одного узла получают одинаковые историю и входные сообщения, поэтому
+        у одного агента совпадает и контекст. Агенты с кэшем ответов не объединяются:
+        варианты из кэша не берутся. При first_k вариантов просят не больше `k`:
+        все варианты запроса готовы одновременно, и лишние узел все равно отбросил бы.
+        Ветки сверх `k` не запускаются. Возвращает запросы и ветки для запуска.
+        """
+        first_k = step.merge_strategy == MergeStrategy.FIRST_K
+        by_agent: dict[UUID, list[UUID]] = {}
+        for child in step.children:
+            child_step = self.plan.steps[child]
+            if child_step.type != "agent" or child_step.agent_id not in self.agents:
+                continue
+            if self.agents[child_step.agent_id].agent.cache_responses:
+                continue
+            by_agent.setdefault(child_step.agent_id, []).append(child_step.node_id)
+
+        batches: list[ChoiceBatch] = []
+        skipped: set[UUID] = set()
+        for node_ids in by_agent.values():
+            if first_k and step.k:
+                skipped.update(node_ids[step.k :])
+                node_ids = node_ids[: step.k]
+            if len(node_ids) < 2:
+                continue
+            batch = ChoiceBatch(node_ids)
+            batches.append(batch)
+            for node_id in node_ids:
+                self._choice_batches[node_id] = batch
+        children = [child for child in step.children if self.plan.steps[child].node_id not in skipped]
+        return batches, children
+
+    def _release_batches(self, batches: list[ChoiceBatch]) -> None:
+        for batch in batches:
+            for node_id in batch.positions:
+                del self._choice_batches[node_id]
+            if batch.task is not None and not batch.task.done():
+                batch.task.cancel()  # Все ветки запроса отменены или упали
+
+    @staticmethod
+    async def _select_branches(step: PlanStep, tasks: list[BranchTask]) -> list[BranchTask]:
+        """
+        Ждет завершения веток, пока не выполнено условие стратегии объединения.
+
+        Возвращает успешно завершившиеся ветки в порядке завершения; остальные
+        отменяет вызывающий. Если из-за упавших веток `k` ответов или кворум не набрать,
+        бросает `ParallelNodeError`.
+        """
+        loop = asyncio.get_running_loop()
+        need: int | None = None  # Сколько успешных веток достаточно
+        stop_at: float | None = None  # Когда перестать ждать, если есть хотя бы один ответ
+        if step.merge_strategy == MergeStrategy.DEADLINE:
+            stop_at = loop.time() + (step.deadline or 0)
+        else:
+            need = step.k or len(tasks) // 2 + 1
+
+        finished: list[BranchTask] = []
+        pending: set[BranchTask] = set(tasks)
+        while pending:
+            timeout = None if stop_at is None else max(0.0, stop_at - loop.time())
+            done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            # Ошибку ветки при fail_fast обрабатывает TaskGroup, при других политиках ветка возвращает None
+            finished.extend(
+                task
+                for task in sorted(done, key=tasks.index)
+                if not task.cancelled() and task.exception() is None and task.result() is not None
+            )
+            if stop_at is not None and loop.time() >= stop_at:
+                if finished:
+                    break
+                stop_at, need = None, 1  # К сроку нет ни одного ответа — берем первый
+            elif need is not None and len(finished) >= need:
+                if step.merge_strategy != MergeStrategy.QUORUM or not step.deadline:
+                    break
+                stop_at, need = loop.time() + step.deadline, None  # Кворум есть, ждем отстающих
+            elif need is not None and len(finished) + len(pending) < need:
+                # Упавшие ветки не вернутся — нужного числа ответов (k или кворум) уже не набрать,
+                # остальные ветки отменяются. Меньше ответов, чем настроено, узел не объединяет
+                failed = len(tasks) - len(finished) - len(pending)
+                raise ParallelNodeError(
+                    f"Parallel node {step.node_id}: {MergeStrategy(step.merge_strategy).value} needs {need} "
+                    f"successful branches, {failed} of {len(tasks)} branches failed"
+                )
+
+        if step.merge_strategy == MergeStrategy.FIRST_K:
+            return finished[: step.k]
+        return finished
+
+    @staticmethod
+    def _record_selection(step: PlanStep, tasks: list[BranchTask], selected: list[BranchTask]) -> None:
+        """Записывает в metadata ответов веток, какие из них вошли в объединение."""
+        rank = {task: i for i, task in enumerate(selected)}
+        strategy = MergeStrategy(step.merge_strategy).value
+        cancelled = sum(task.cancelled() for task in tasks)
+        print(
+            f"Parallel node {step.node_id}: {len(selected)} of {len(tasks)} branches selected "
+            f"by {strategy}, {cancelled} cancelled"
+        )
+        for task in tasks:
+            if task.cancelled() or task.exception() is not None or (result := task.result()) is None:
+                continue
+            for msg in result:
+                msg.metadata["merge"] = {
+                    "node_id": str(step.node_id),
+                    "strategy": strategy,
+                    "selected": task in rank,
+                    "rank": rank.get(task),
+                    "branches": len(tasks),
+                    "cancelled": cancelled,
+                }
+
+    async def _run_transform_node(
+        self, step: PlanStep, history: HistoryIndex, extra_messages: list[Message] | None = None
     ) -> list[Message]:
-        print(f"Running parallel node {node.id}...")
-        tasks = [self._run_node(child, messages, extra_messages) for child in node.nodes]
-        results: list[list[Message]] = await asyncio.gather(*tasks)
-        agent_msgs = []
-        for result in results:
-            agent_msgs.extend(result)
-        return [self._merge(agent_msgs, node.merge_strategy)]
+        return []
 
     @staticmethod
     def _merge(results: list[Message], strategy: str) -> Message:
@@ -130,27 +508,40 @@ class PipelineExecutor:
         if len(results) == 1:
             return results[0]
 
-        if strategy == "concat" and len(results) > 1:
-            return Message.from_agent(
-                dialog_id=results[0].dialog_id,
-                agent_id=results[0].author_id,
-                text="\n\n".join(msg.text for msg in results).strip(),
-            )
-        if strategy == "concat_numbered" and len(results) > 1:
+        if strategy == MergeStrategy.CONCAT:
+            text = "\n\n".join(msg.text for msg in results)
+        elif strategy == MergeStrategy.CONCAT_NUMBERED or strategy in SELECTING_MERGE_STRATEGIES:
+            # Стратегии с выбором нумеруют ответы в порядке их завершения
             text = ""
             for i, msg in enumerate(results):
                 text += f"## Вариант {i + 1}.\n{msg.text}\n\n"
-            return Message.from_agent(
-                dialog_id=results[0].dialog_id,
-                agent_id=results[0].author_id,
-                text=text.strip(),
-            )
         else:
             raise ValueError(f"Unknown merge strategy: {strategy}")
 
+        # Части объединения (и части вложенных объединений), чтобы не передавать их агенту повторно
+        parts = [msg.id for msg in results]
+        for msg in results:
+            if MERGED_FROM in msg.metadata:
+                parts.extend(msg.metadata[MERGED_FROM])
+        merged = Message.from_agent(
+            dialog_id=results[0].dialog_id,
+            agent_id=results[0].author_id,
+            text=text.strip(),
+            metadata={MERGED_FROM: parts},
+        )
+        # Время последнего из ответов: объединение прошлого хода остается на своем месте
+        # в хронологии контекста, а не уходит в конец
+        merged.created_at = merged.updated_at = max(msg.created_at for msg in results)
+        return merged
+
+    def _count_tokens(self, message: Message) -> int:
+        if self.context_builder is not None:
+            return self.context_builder.count_message(message)
+        return estimate_tokens(message.text)
+
     @staticmethod
-    def _transform(node: TransformNode, message: str) -> str:
-        op = node.config.get("operation")
+    def _transform(step: PlanStep, message: str) -> str:
+        op = step.config.get("operation")
         if op == "uppercase":
             return message.upper()
         elif op == "lowercase":
@@ -158,47 +549,52 @@ class PipelineExecutor:
         # Можно добавить любые другие трансформации
         return message
 
-    def _get_previous_node_messages(self, previous_node: Node, history: list[Message]) -> list[Message]:
-        if previous_node.type == "agent":
-            return [
-                msg
-                for msg in history
-                if msg.author_id == previous_node.agent_id and msg.author_type == AuthorType.AGENT
-            ]
-
-        if previous_node.type == "parallel":
-            messages = []
-            for child in previous_node.nodes:
-                messages.extend(self._get_previous_node_messages(child, history))
-
-            # Сгруппируем сообщения по агентам
-            agent_msgs: dict[UUID, list[Message]] = {}
-            for msg in messages:
-                if msg.author_type != AuthorType.AGENT:
-                    continue
-                agent_msgs.setdefault(msg.author_id, []).append(msg)
-
-            # Отсортируем сообщения по времени в обратном порядке
-            for agent_id in agent_msgs:
-                agent_msgs[agent_id] = sorted(
-                    agent_msgs[agent_id], key=lambda msg: msg.created_at, reverse=True
-                )
-
-            # Применим merge стратегию для сообщений агентов
-            merged_msgs = []
+    def _get_previous_node_messages(self, index: int, history: HistoryIndex) -> Sequence[Message]:
+        """Прошлые ответы шага в хронологическом порядке; за ход вычисляются один раз."""
+        messages = self._previous_messages.get(index)
+        if messages is None:
+            messages = self._previous_messages[index] = self._collect_previous_node_messages(index, history)
+        return messages
 
-            # Берем минимальное количество сообщений для каждого агента
-            min_length = min(len(msgs_) for msgs_ in agent_msgs.values())
-            for position in range(min_length):
-                messages_for_merge = []
-                # Для каждого агента берем сообщение с позицией position
-                for msgs_ in agent_msgs.values():
-                    messages_for_merge.append(msgs_[position])
-                merged_msgs.append(self._merge(messages_for_merge, previous_node.merge_strategy))
+    def _collect_previous_node_messages(self, index: int, history: HistoryIndex) -> Sequence[Message]:
+        previous_step = self.plan.steps[index]
+        if previous_step.type == "agent" and previous_step.agent_id is not None:
+            return history.by_agent(previous_step.agent_id)
 
-            return merged_msgs
+        if previous_step.type == "parallel":
+            return self._collect_parallel_node_messages(previous_step, history)
 
-        if previous_node.type == "sequence" and previous_node.nodes:
-            return self._get_previous_node_messages(previous_node.nodes[-1], history)
+        if previous_step.type == "sequence" and previous_step.source is not None:
+            return self._get_previous_node_messages(previous_step.source, history)
 
         return []
+
+    def _collect_parallel_node_messages(self, step: PlanStep, history: HistoryIndex) -> list[Message]:
+        """Прошлые ответы параллельного узла: ответы веток каждого хода, объединенные его стратегией."""
+        # Сгруппируем ответы веток по ходам: в ходе могли ответить не все ветки
+        # (ошибка при best_effort, отмена при стратегиях с выбором)
+        turns: dict[int, list[Message]] = {}
+        for msg in self._branch_answers(step, history):
+            turns.setdefault(history.turn_of(msg), []).append(msg)
+
+        # Применим merge стратегию для сообщений агентов каждого хода
+        merged_msgs = []
+        selecting = step.merge_strategy in SELECTING_MERGE_STRATEGIES
+        for turn in sorted(turns):
+            messages_for_merge = turns[turn]
+            if selecting:  # Как при выполнении: в порядке завершения веток
+                messages_for_merge.sort(key=_created_at)
+            merged_msgs.append(self._merge(messages_for_merge, step.merge_strategy or ""))
+        return merged_msgs
+
+    def _branch_answers(self, step: PlanStep, history: HistoryIndex) -> Iterator[Message]:
+        """Прошлые ответы агентов в ветках параллельного узла, вошедшие в объединение."""
+        for child in step.children:
+            if (source := self.plan.steps[child].source) is None:
+                continue
+            for msg in self._get_previous_node_messages(source, history):
+                if msg.author_type != AuthorType.AGENT:
+                    continue
+                if msg.metadata.get("merge", {}).get("selected") is False:
+                    continue  # Ответ не вошел в объединение, когда узел выполнялся
+                yield msg
@@ -0,0 +1,92 @@
+import heapq
+from bisect import bisect_right
+from operator import attrgetter
+from typing import Iterable
+from uuid import UUID
+
+from src.domain.messages.entities import AuthorType, Message
+
+_created_at = attrgetter("created_at")
+
+# Ключ metadata объединенного ответа параллельного узла: id (UUID) сообщений, из которых он собран.
+# Объединенные ответы не сохраняются в БД, поэтому значения не приводятся к строкам
+MERGED_FROM = "merged_from"
+
+
+class HistoryIndex:
+    """
+    Неизменяемый индекс истории диалога, строится один раз за ход.
+
+    Сообщения сгруппированы по типу автора и по агентам, каждая группа —
+    кортеж в хронологическом порядке. Узлы пайплайна получают эти кортежи
+    без копирования вместо повторного просмотра и сортировки всей истории.
+    """
+
+    __slots__ = ("messages", "user", "_user_times", "_by_agent", "_visible")
+
+    def __init__(self, messages: Iterable[Message]) -> None:
+        # Стабильная сортировка: при равном времени сохраняется исходный порядок
+        self.messages: tuple[Message, ...] = tuple(sorted(messages, key=_created_at))
+        user: list[Message] = []
+        by_agent: dict[UUID, list[Message]] = {}
+        for msg in self.messages:
+            if msg.author_type == AuthorType.USER:
+                user.append(msg)
+            elif msg.author_type == AuthorType.AGENT:
+                by_agent.setdefault(msg.author_id, []).append(msg)
+        self.user: tuple[Message, ...] = tuple(user)
+        self._user_times = [msg.created_at for msg in user]
+        self._by_agent: dict[UUID, tuple[Message, ...]] = {
+            agent_id: tuple(msgs) for agent_id, msgs in by_agent.items()
+        }
+        self._visible: dict[UUID, tuple[Message, ...]] = {}
+
+    def __len__(self) -> int:
+        return len(self.messages)
+
+    def by_agent(self, agent_id: UUID) -> tuple[Message, ...]:
+        """Ответы агента в хронологическом порядке."""
+        return self._by_agent.get(agent_id, ())
+
+    def turn_of(self, message: Message) -> int:
+        """Номер хода: индекс последнего сообщения пользователя не позже `message` (-1 — до первого)."""
+        return bisect_right(self._user_times, message.created_at) - 1
+
+    def visible_to(self, agent_id: UUID) -> tuple[Message, ...]:
+        """Сообщения пользователя и собственные ответы агента в хронологическом порядке."""
+        visible = self._visible.get(agent_id)
+        if visible is None:
+            # Слияние двух упорядоченных групп вместо фильтрации и сортировки всей истории
+            visible = tuple(heapq.merge(self.user, self.by_agent(agent_id), key=_created_at))
+            self._visible[agent_id] = visible
+        return visible
+
+
+def deduplicate(messages: list[Message]) -> tuple[list[Message], list[Message]]:
+    """
+    Убирает из контекста агента повторы, не меняя порядок остальных сообщений.
+
+    - сообщение, пришедшее несколькими путями (один и тот же id), остается один раз;
+    - из ответов агентов с одинаковым текстом остается последний. Сообщения
+      пользователя по тексту не сравниваются: повторенный вопрос — это новый ход;
+    - ответ, вошедший в объединенный ответ параллельного узла, который тоже есть
+      в контексте, отдельно не передается.
+
+    Возвращает оставшиеся и удаленные сообщения.
+    """
+    # id сравниваются как int: хэш UUID считается на Python и заметен на длинной истории
+    merged_parts = {part.int for msg in messages for part in msg.metadata.get(MERGED_FROM, ())}
+    # Ключ по тексту только для ответов агентов; словарь хранит позицию последнего из одинаковых
+    keys = [msg.text.strip() if msg.author_type == AuthorType.AGENT else None for msg in messages]
+    latest_by_text = {key: i for i, key in enumerate(keys) if key is not None}
+    seen: set[int] = set()
+    kept: list[Message] = []
+    removed: list[Message] = []
+    for i, msg in enumerate(messages):
+        key, msg_id = keys[i], msg.id.int
+        if msg_id in seen or msg_id in merged_parts or (key is not None and latest_by_text[key] != i):
+            removed.append(msg)
+            continue
+        seen.add(msg_id)
+        kept.append(msg)
+    return kept, removed
@@ -0,0 +1,177 @@
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Literal, Self
+from uuid import UUID
+
+from src.domain.common.exceptions import ObjectNotFoundError
+from src.domain.pipelines.entities import (
+    AgentNode,
+    FailurePolicy,
+    MergeStrategy,
+    Node,
+    ParallelNode,
+    Pipeline,
+    SequenceNode,
+)
+from src.infrastructure.cache import CacheStats
+
+StepType = Literal["agent", "sequence", "parallel", "transform"]
+
+
+@dataclass(frozen=True, slots=True, kw_only=True)
+class PlanStep:
+    """
+    Шаг плана выполнения — узел пайплайна с заранее вычисленными связями.
+
+    `previous` — индекс шага, прошлые ответы которого видит агент (вход агента
+    на предыдущих ходах диалога). `source` — индекс шага, чьи сообщения
+    представляют результат этого шага в истории (для последовательности —
+    источник её последнего узла). `max_concurrency`, `timeout`, `failure_policy`,
+    `min_successes`, `k` и `deadline` — настройки выполнения веток параллельного узла.
+    """
+
+    node_id: UUID
+    type: StepType
+    children: tuple[int, ...] = ()
+    agent_id: UUID | None = None
+    merge_strategy: MergeStrategy | None = None
+    config: dict[str, Any] = field(default_factory=dict)
+    previous: int | None = None
+    source: int | None = None
+    max_concurrency: int | None = None
+    timeout: float | None = None
+    failure_policy: FailurePolicy = FailurePolicy.FAIL_FAST
+    min_successes: int | None = None
+    k: int | None = None
+    deadline: float | None = None
+
+
+@dataclass(frozen=True, slots=True, kw_only=True)
+class ExecutionPlan:
+    """Скомпилированный пайплайн: плоский список шагов вместо дерева pydantic моделей."""
+
+    pipeline_id: UUID
+    version: datetime | None
+    steps: tuple[PlanStep, ...]
+    root: int
+    agent_ids: frozenset[UUID]
+
+    @property
+    def root_step(self) -> PlanStep:
+        return self.steps[self.root]
+
+    @classmethod
+    def compile(cls, pipeline: Pipeline, version: datetime | None = None) -> Self:
+        steps: list[PlanStep | None] = []
+
+        def compile_node(node: Node, previous: int | None) -> int:
+            index = len(steps)
+            steps.append(None)  # Резервируем место, дочерние шаги идут после родителя
+
+            if isinstance(node, AgentNode):
+                steps[index] = PlanStep(
+                    node_id=node.id, type="agent", agent_id=node.agent_id, previous=previous, source=index
+                )
+
+            elif isinstance(node, SequenceNode):
+                # Каждый узел последовательности видит прошлые ответы узла перед ним
+                children: list[int] = []
+                child_previous = previous
+                for child in node.nodes:
+                    child_index = compile_node(child, child_previous)
+                    children.append(child_index)
+                    child_previous = _get(steps, child_index).source
+                steps[index] = PlanStep(
+                    node_id=node.id,
+                    type="sequence",
+                    children=tuple(children),
+                    previous=previous,
+                    source=_get(steps, children[-1]).source if children else None,
+                )
+
+            elif isinstance(node, ParallelNode):
+                steps[index] = PlanStep(
+                    node_id=node.id,
+                    type="parallel",
+                    children=tuple(compile_node(child, previous) for child in node.nodes),
+                    merge_strategy=node.merge_strategy,
+                    previous=previous,
+                    source=index,
+                    max_concurrency=node.max_concurrency,
+                    timeout=node.timeout,
+                    failure_policy=node.failure_policy,
+                    min_successes=node.min_successes,
+                    k=node.k,
+                    deadline=node.deadline,
+                )
+
+            else:  # TransformNode
+                steps[index] = PlanStep(
+                    node_id=node.id, type="transform", config=dict(node.config), previous=previous
+                )
+            return index
+
+        root = compile_node(pipeline.root, None)
+        compiled = tuple(_get(steps, i) for i in range(len(steps)))
+        return cls(
+            pipeline_id=pipeline.id,
+            version=version,
+            steps=compiled,
+            root=root,
+            agent_ids=frozenset(step.agent_id for step in compiled if step.agent_id is not None),
+        )
+
+    def validate_agents(self, existing_agents: list[UUID]) -> None:
+        missing = [aid for aid in self.agent_ids if aid not in existing_agents]
+        if missing:
+            raise ObjectNotFoundError(f"Agents not found: {missing}")
+
+
+def _get(steps: list[PlanStep | None], index: int) -> PlanStep:
+    step = steps[index]
+    if step is None:
+        raise ValueError(f"Plan step {index} is not compiled yet")
+    return step
+
+
+class ExecutionPlanCache:
+    """
+    Процесс-локальный LRU-кэш скомпилированных планов.
+
+    План считается актуальным, пока совпадает `updated_at` пайплайна в БД.
+    """
+
+    def __init__(self, maxsize: int = 256) -> None:
+        self.maxsize = maxsize
+        self.stats = CacheStats()
+        self._plans: OrderedDict[UUID, ExecutionPlan] = OrderedDict()
+
+    def get(self, pipeline_id: UUID, version: datetime) -> ExecutionPlan | None:
+        plan = self._plans.get(pipeline_id)
+        if plan is None or plan.version != version:
+            self.stats.misses += 1
+            return None
+        self._plans.move_to_end(pipeline_id)
+        self.stats.hits += 1
+        return plan
+
+    def put(self, plan: ExecutionPlan) -> ExecutionPlan:
+        self._plans[plan.pipeline_id] = plan
+        self._plans.move_to_end(plan.pipeline_id)
+        while len(self._plans) > self.maxsize:
+            self._plans.popitem(last=False)
+            self.stats.evictions += 1
+        return plan
+
+    def invalidate(self, pipeline_id: UUID) -> None:
+        self._plans.pop(pipeline_id, None)
+
+    def clear(self) -> None:
+        self._plans.clear()
+
+    def info(self) -> dict[str, Any]:
+        return {"size": len(self._plans), "maxsize": self.maxsize, **self.stats.to_dict()}
+
+
+plan_cache = ExecutionPlanCache()
@@ -1,17 +1,122 @@
+from typing import Literal
+
 from openai.types.shared.chat_model import ChatModel
+from pydantic import BaseModel
 from pydantic_settings import BaseSettings
 
 
+class LLMEndpointSettings(BaseModel):
+    """Endpoint LLM: base_url и ключ; лимиты и модель по умолчанию берутся из общих настроек."""
+
+    base_url: str
+    api_key: str
+    model: str | None = None
+    rpm_limit: int | None = None
+    tpm_limit: int | None = None
+
+
 class Settings(BaseSettings):
     db_url: str = "sqlite+aiosqlite:///./db.sqlite3"
+    # Реплика для запросов только на чтение (не задана — читаем с основной базы)
+    db_replica_url: str | None = None
+    db_echo: bool = False
+    db_pool_size: int = 10
+    db_max_overflow: int = 20
+    db_pool_recycle: int = 1800
+    db_pool_timeout: float = 30.0
+    # Отключает prepared statements asyncpg (pgbouncer в режиме transaction)
+    db_pgbouncer: bool = True
 
     jwt_secret: str
     jwt_access_token_expire_minutes: int = 30
     jwt_refresh_token_expire_days: int = 30
+    # Класть is_active/is_superuser в access-токен: проверка доступа без БД и кэша,
+    # но изменения прав вступают в силу только после обновления токена
+    jwt_embed_user_claims: bool = False
+
+    # bcrypt: стоимость хэша и число потоков для хэширования паролей
+    password_hash_rounds: int = 12
+    password_hash_workers: int = 4
 
     openai_api_key: str = "sk-..."
     openai_model: ChatModel = "gpt-4o-mini"
     openai_base_url: str = "https://api.openai.com/v1"
+    # Дополнительные ключи для группы "default": нагрузка распределяется между ними
+    openai_extra_api_keys: list[str] = []
+    # Общий пул HTTP соединений к LLM провайдеру
+    openai_max_connections: int = 100
+    openai_max_keepalive_connections: int = 50
+    openai_keepalive_expiry: float = 60.0
+    openai_http2: bool = False  # Требует пакет h2 (httpx[http2])
+    openai_timeout: float = 600.0
+    openai_connect_timeout: float = 5.0
+    # Сколько соединений открыть при старте приложения (0 — не открывать)
+    openai_warmup_connections: int = 0
+    # Печатать ожидание соединения из пула для вызовов LLM дольше порога, мс
+    openai_pool_wait_log_ms: float = 50.0
+    # Повторы внутри SDK; по умолчанию выключены — повторяют `LLMScheduler` и `ResilientLLMClient`
+    openai_max_retries: int = 0
+
+    # Лимиты провайдера LLM на один endpoint (0 — без лимита) и адаптивная конкурентность вызовов
+    llm_rpm_limit: int = 500
+    llm_tpm_limit: int = 200_000
+    llm_max_concurrency: int = 32
+    llm_min_concurrency: int = 1
+    llm_latency_target: float = 0.0  # Секунд; медленнее — снижаем конкурентность (0 — не учитывать)
+    # Повторы ответа 429 на том же endpoint'е; в группе из нескольких endpoint'ов
+    # вместо них роутер переключается на следующий
+    llm_rate_limit_retries: int = 5
+    llm_completion_tokens: int = 512  # Оценка длины ответа для TPM, если max_tokens не задан
+
+    # Источник ответов LLM: openai — провайдеры из openai_* и llm_endpoints,
+    # fake — `FakeLLMClient` без сети с задержками и ошибками из fake_llm_*
+    llm_backend: Literal["openai", "fake"] = "openai"
+    fake_llm_latency: float = 0.5  # Медиана времени до первого токена, секунд
+    fake_llm_latency_sigma: float = 0.3
+    fake_llm_tokens_per_second: float = 50.0
+    fake_llm_answer_tokens: int = 64
+    fake_llm_error_rate: float = 0.0
+    fake_llm_error_status: int = 503
+    fake_llm_seed: int | None = None
+
+    # Группы endpoint'ов (уровни моделей), группу выбирает агент полем `endpoint`.
+    # JSON: {"cheap": [{"base_url": "...", "api_key": "...", "model": "gpt-4o-mini"}]}.
+    # Группа "default" по умолчанию собирается из openai_* настроек
+    llm_endpoints: dict[str, list[LLMEndpointSettings]] = {}
+    llm_endpoint_failure_threshold: int = 3  # Ошибок подряд до вывода endpoint'а из ротации
+    llm_endpoint_cooldown: float = 30.0
+
+    # Дедлайн попытки, повторы временных ошибок и hedging вызовов LLM. Временные ошибки
+    # (таймауты, 5xx) повторяются только здесь: не больше 1 + llm_retries попыток на вызов.
+    # Дедлайн отсчитывается на каждом endpoint'е, для стрима — до первого фрагмента (0 — без дедлайна)
+    llm_call_timeout: float = 120.0
+    llm_retries: int = 2
+    llm_retry_backoff: float = 0.5
+    llm_retry_max_backoff: float = 8.0
+    llm_hedge: bool = False
+    llm_hedge_quantile: float = 0.95
+    llm_hedge_min_delay: float = 1.0
+
+    # Кэш ответов LLM для агентов с `cache_responses`: none | memory | sqlite
+    llm_cache_backend: Literal["none", "memory", "sqlite"] = "memory"
+    llm_cache_ttl: float = 24 * 60 * 60
+    llm_cache_size: int = 10000
+    llm_cache_path: str = "./llm_cache.sqlite3"
+
+    # Окно истории диалога, передаваемое в пайплайн
+    pipeline_history_limit: int = 100
+    pipeline_history_max_tokens: int | None = 16000
+    # Бюджет контекста одного агента: системный промпт и сообщения (None — без ограничения)
+    agent_context_max_tokens: int | None = None
+
+    # Процесс-локальный кэш пайплайнов и агентов (0 — отключить). Сбрасывается только в процессе,
+    # изменившем данные: остальные воркеры отдают старую версию до истечения TTL
+    repository_cache_ttl: float = 10.0
+    repository_cache_size: int = 1024
+
+    # Кэш прав пользователей для проверки access-токена (0 — отключить)
+    auth_cache_ttl: float = 30.0
+    auth_cache_size: int = 10000
 
     class Config:
         env_file = ".env"
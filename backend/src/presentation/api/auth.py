@@ -6,8 +6,12 @@ from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.application.services import get_user_by_token
-from src.application.users.dto import UserDTO
-from src.domain.common.exceptions import ObjectNotFoundError, ValidationError
+from src.application.users.dto import AuthUserDTO
+from src.domain.common.exceptions import (
+    AuthorizationError,
+    ObjectNotFoundError,
+    ValidationError,
+)
 from src.infrastructure.auth.token_service import JWTService
 from src.infrastructure.db.base import get_session
 from src.infrastructure.db.unit_of_work import SqlAlchemyUnitOfWork
@@ -20,7 +24,7 @@ async def get_current_user(
     token: str = Depends(oauth2_scheme),
     session: AsyncSession = Depends(get_session, use_cache=True),
     token_service: JWTService = Depends(get_jwt_token_service),
-) -> UserDTO:
+) -> AuthUserDTO:
     """Получение текущего пользователя по токену аутентификации."""
     uow = SqlAlchemyUnitOfWork(session)
 
@@ -28,7 +32,7 @@ async def get_current_user(
         user = await get_user_by_token(token, token_service=token_service, uow=uow)
         if not user.is_active:
             raise HTTPException(status_code=401, detail="Inactive user")
-    except (ValueError, ValidationError, ObjectNotFoundError) as exc:
+    except (ValueError, ValidationError, ObjectNotFoundError, AuthorizationError) as exc:
         raise HTTPException(status_code=401, detail=str(exc)) from exc
     return user
 
@@ -37,7 +41,7 @@ async def get_admin_user(
     token: str = Depends(oauth2_scheme),
     session: AsyncSession = Depends(get_session, use_cache=True),
     token_service: JWTService = Depends(get_jwt_token_service),
-) -> UserDTO:
+) -> AuthUserDTO:
     uow = SqlAlchemyUnitOfWork(session)
     try:
         if user := await get_user_by_token(token, token_service=token_service, uow=uow):
@@ -45,7 +49,7 @@ async def get_admin_user(
                 raise HTTPException(status_code=403, detail="Forbidden")
             return user
         raise HTTPException(status_code=401, detail="Unauthorized")
-    except (ValueError, ValidationError, ObjectNotFoundError) as exc:
+    except (ValueError, ValidationError, ObjectNotFoundError, AuthorizationError) as exc:
         raise HTTPException(status_code=401, detail=str(exc)) from exc
 
 
@@ -53,14 +57,14 @@ async def get_user_or_none(
     authorization: Optional[str] = Header(None),
     session: AsyncSession = Depends(get_session, use_cache=True),
     token_service: JWTService = Depends(get_jwt_token_service),
-) -> UserDTO | None:
+) -> AuthUserDTO | None:
     """
     Получение текущего пользователя по токену аутентификации.
 
     :param authorization: Значение заголовка HTTP (Authorization).
     :param session: :class:`AsyncSession` объект сессии.
     :param token_service: Объект сервиса для работы с токенами.
-    :return: Объект пользователя :class:`User` или :class:`None`.
+    :return: Права пользователя :class:`AuthUserDTO` или :class:`None`.
     :raises CredentialsException: Если пользователь не найден.
     """
     if authorization and (token_match := re.match(r"Bearer (\S+)", authorization)) is not None:
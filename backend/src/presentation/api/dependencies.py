@@ -1,24 +1,47 @@
+from contextlib import asynccontextmanager
 from functools import cache
+from typing import AsyncIterator
 
+import httpx
 from fastapi import Depends
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from src.application.agents.context import ContextBuilder
 from src.application.agents.handlers import AgentCommandHandler, AgentQueryHandler
 from src.application.dialogs.handlers import DialogHandler
 from src.application.pipelines.handlers import PipelineHandler
 from src.application.services import AgentLLMClient
 from src.application.users.handlers import JWTHandler, RegisterUserHandler
-from src.infrastructure.auth.hashers import BcryptPasswordHasher, PasswordHasherProtocol
+from src.infrastructure.auth.hashers import BcryptPasswordHasher
 from src.infrastructure.auth.token_service import JWTService
-from src.infrastructure.db.base import get_session
+from src.infrastructure.db.base import db_manager, get_session
 from src.infrastructure.db.unit_of_work import SqlAlchemyUnitOfWork
+from src.infrastructure.llm.cache import (
+    CachingLLMClient,
+    LLMResponseCache,
+    MemoryResponseCache,
+    SQLiteResponseCache,
+)
+from src.infrastructure.llm.fake import FakeLLMClient, FakeLLMProfile
+from src.infrastructure.llm.http import (
+    TimedTransport,
+    create_http_client,
+    create_http_transport,
+)
 from src.infrastructure.llm.openai_client import OpenAIChatClient
-from src.infrastructure.settings import settings
+from src.infrastructure.llm.resilience import ResilientLLMClient
+from src.infrastructure.llm.router import LLMEndpoint, LLMRouter
+from src.infrastructure.llm.scheduler import LLMScheduler, SchedulingLLMClient
+from src.infrastructure.llm.tokenizer import create_tokenizer
+from src.infrastructure.settings import LLMEndpointSettings, settings
 
 
 @cache
-def get_hasher() -> PasswordHasherProtocol:
-    return BcryptPasswordHasher()
+def get_hasher() -> BcryptPasswordHasher:
+    return BcryptPasswordHasher(
+        rounds=settings.password_hash_rounds,
+        max_workers=settings.password_hash_workers,
+    )
 
 
 @cache
@@ -29,18 +52,135 @@ def get_jwt_token_service(
         secret=settings.jwt_secret,
         access_expiration_minutes=settings.jwt_access_token_expire_minutes,
         refresh_expiration_days=settings.jwt_refresh_token_expire_days,
+        embed_user_claims=settings.jwt_embed_user_claims,
+    )
+
+
+@cache
+def get_llm_http_transport() -> TimedTransport:
+    return create_http_transport(
+        max_connections=settings.openai_max_connections,
+        max_keepalive_connections=settings.openai_max_keepalive_connections,
+        keepalive_expiry=settings.openai_keepalive_expiry,
+        http2=settings.openai_http2,
+    )
+
+
+@cache
+def get_llm_http_client() -> httpx.AsyncClient:
+    return create_http_client(
+        get_llm_http_transport(),
+        timeout=settings.openai_timeout,
+        connect_timeout=settings.openai_connect_timeout,
+    )
+
+
+def _create_llm_endpoint(name: str, config: LLMEndpointSettings, *, group_size: int) -> LLMEndpoint:
+    # У каждого ключа свои лимиты провайдера, поэтому и свой планировщик.
+    # 429 в группе из нескольких endpoint'ов повторяет роутер на другом ключе, а не планировщик
+    scheduler = LLMScheduler(
+        rpm=config.rpm_limit if config.rpm_limit is not None else settings.llm_rpm_limit,
+        tpm=config.tpm_limit if config.tpm_limit is not None else settings.llm_tpm_limit,
+        max_concurrency=settings.llm_max_concurrency,
+        min_concurrency=settings.llm_min_concurrency,
+        latency_target=settings.llm_latency_target,
+        max_retries=settings.llm_rate_limit_retries if group_size == 1 else 0,
+    )
+    client: AgentLLMClient
+    if settings.llm_backend == "fake":
+        client = _create_fake_llm(config.model or settings.openai_model)
+    else:
+        client = OpenAIChatClient(
+            config.api_key,
+            config.model or settings.openai_model,
+            config.base_url,
+            http_client=get_llm_http_client(),
+            max_retries=settings.openai_max_retries,
+            pool_wait_log_threshold=settings.openai_pool_wait_log_ms / 1000,
+        )
+    return LLMEndpoint(
+        name,
+        SchedulingLLMClient(client, scheduler, completion_tokens=settings.llm_completion_tokens),
+        scheduler=scheduler,
+        failure_threshold=settings.llm_endpoint_failure_threshold,
+        cooldown=settings.llm_endpoint_cooldown,
+        timeout=settings.llm_call_timeout,
+    )
+
+
+def _create_fake_llm(model: str) -> FakeLLMClient:
+    profile = FakeLLMProfile(
+        latency=settings.fake_llm_latency,
+        latency_sigma=settings.fake_llm_latency_sigma,
+        tokens_per_second=settings.fake_llm_tokens_per_second,
+        answer_tokens=settings.fake_llm_answer_tokens,
+        error_rate=settings.fake_llm_error_rate,
+        error_status=settings.fake_llm_error_status,
+        seed=settings.fake_llm_seed,
+    )
+    return FakeLLMClient(profile, model=model)
+
+
+@cache
+def get_llm_router() -> LLMRouter:
+    groups = dict(settings.llm_endpoints)
+    groups.setdefault(
+        "default",
+        [
+            LLMEndpointSettings(base_url=settings.openai_base_url, api_key=key)
+            for key in (settings.openai_api_key, *settings.openai_extra_api_keys)
+        ],
+    )
+    return LLMRouter(
+        {
+            group: [
+                _create_llm_endpoint(f"{group}-{i}", config, group_size=len(configs))
+                for i, config in enumerate(configs)
+            ]
+            for group, configs in groups.items()
+        }
     )
 
 
 @cache
 def get_llm() -> AgentLLMClient:
-    return OpenAIChatClient(
-        settings.openai_api_key,
-        settings.openai_model,
-        settings.openai_base_url,
+    # Повторы временных ошибок — только здесь; повтор и дубль запроса снова проходят
+    # через роутер и уходят на другой endpoint. Дедлайн попытки отсчитывает роутер
+    # (`LLMEndpoint.timeout`), чтобы засчитать таймаут зависшему endpoint'у
+    return ResilientLLMClient(
+        get_llm_router(),
+        max_retries=settings.llm_retries,
+        backoff=settings.llm_retry_backoff,
+        max_backoff=settings.llm_retry_max_backoff,
+        hedge=settings.llm_hedge,
+        hedge_quantile=settings.llm_hedge_quantile,
+        hedge_min_delay=settings.llm_hedge_min_delay,
+    )
+
+
+@cache
+def get_llm_response_cache() -> LLMResponseCache | None:
+    if settings.llm_cache_backend == "memory":
+        return MemoryResponseCache(maxsize=settings.llm_cache_size, ttl=settings.llm_cache_ttl)
+    if settings.llm_cache_backend == "sqlite":
+        return SQLiteResponseCache(
+            settings.llm_cache_path, maxsize=settings.llm_cache_size, ttl=settings.llm_cache_ttl
+        )
+    return None
+
+
+@cache
+def get_context_builder() -> ContextBuilder:
+    return ContextBuilder(
+        create_tokenizer(settings.openai_model), max_tokens=settings.agent_context_max_tokens
     )
 
 
+def _get_cached_llm(llm: AgentLLMClient) -> AgentLLMClient | None:
+    response_cache = get_llm_response_cache()
+    return CachingLLMClient(llm, response_cache) if response_cache is not None else None
+
+
 def get_token_auth_handler(
     session: AsyncSession = Depends(get_session, use_cache=True),
     hasher: BcryptPasswordHasher = Depends(get_hasher),
@@ -59,11 +199,28 @@ def get_register_handler(
 def get_agent_command_handler(
     session: AsyncSession = Depends(get_session, use_cache=True),
 ) -> AgentCommandHandler:
-    return AgentCommandHandler(uow=SqlAlchemyUnitOfWork(session))
+    return AgentCommandHandler(uow=SqlAlchemyUnitOfWork(session), endpoints=get_llm_router().groups.keys())
 
 
-def get_agent_query_handler(
+async def get_read_session(
     session: AsyncSession = Depends(get_session, use_cache=True),
+) -> AsyncIterator[AsyncSession]:
+    """
+    Сессия для запросов только на чтение.
+
+    Без реплики отдает ту же сессию, что и зависимости авторизации, чтобы запрос
+    не держал два соединения с основной БД. С репликой — отдельная сессия на реплике:
+    сессия авторизации берет соединение только при промахе кэша прав пользователя.
+    """
+    if not db_manager.has_replica:
+        yield session
+        return
+    async with db_manager.read_session() as read_session:
+        yield read_session
+
+
+def get_agent_query_handler(
+    session: AsyncSession = Depends(get_read_session),
 ) -> AgentQueryHandler:
     return AgentQueryHandler(uow=SqlAlchemyUnitOfWork(session))
 
@@ -79,4 +236,30 @@ def get_pipeline_handler(
     session: AsyncSession = Depends(get_session, use_cache=True),
     llm: AgentLLMClient = Depends(get_llm),
 ) -> PipelineHandler:
-    return PipelineHandler(uow=SqlAlchemyUnitOfWork(session), llm=llm)
+    return PipelineHandler(
+        uow=SqlAlchemyUnitOfWork(session),
+        llm=llm,
+        cached_llm=_get_cached_llm(llm),
+        history_limit=settings.pipeline_history_limit,
+        history_max_tokens=settings.pipeline_history_max_tokens,
+        context_builder=get_context_builder(),
+    )
+
+
+@asynccontextmanager
+async def open_pipeline_handler(llm: AgentLLMClient) -> AsyncIterator[PipelineHandler]:
+    """
+    Обработчик пайплайнов с собственной сессией БД.
+
+    Нужен для потоковых ответов: сессия из `get_session` закрывается
+    до того, как `StreamingResponse` начнет отдавать данные.
+    """
+    async with db_manager.session() as session:
+        yield PipelineHandler(
+            uow=SqlAlchemyUnitOfWork(session),
+            llm=llm,
+            cached_llm=_get_cached_llm(llm),
+            history_limit=settings.pipeline_history_limit,
+            history_max_tokens=settings.pipeline_history_max_tokens,
+            context_builder=get_context_builder(),
+        )
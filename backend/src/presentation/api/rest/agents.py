@@ -9,7 +9,7 @@ from src.application.agents.commands import (
 )
 from src.application.agents.handlers import AgentCommandHandler, AgentQueryHandler
 from src.application.agents.queries import AgentsQuery
-from src.application.users.dto import UserDTO
+from src.application.users.dto import AuthUserDTO
 from src.domain.common.exceptions import ValidationError
 
 from ..auth import get_admin_user
@@ -61,6 +61,12 @@ async def create_agent(
             description=data.description,
             prompt=data.prompt,
             temperature=data.temperature,
+            cache_responses=data.cache_responses,
+            model=data.model,
+            endpoint=data.endpoint,
+            max_tokens=data.max_tokens,
+            stop=data.stop,
+            reasoning_effort=data.reasoning_effort,
         )
     )
     return agent
@@ -69,7 +75,7 @@ async def create_agent(
 @router.get("/{agent_id}", response_model=ReadAgentSchema)
 async def get_agent(
     agent_id: UUID,
-    _: UserDTO = Depends(get_admin_user),
+    _: AuthUserDTO = Depends(get_admin_user),
     handler: AgentQueryHandler = Depends(get_agent_query_handler),
 ):
     return await handler.handle_get(agent_id)
@@ -79,7 +85,7 @@ async def get_agent(
 async def update_agent(
     agent_id: UUID,
     data: UpdateAgentSchema,
-    _: UserDTO = Depends(get_admin_user),
+    _: AuthUserDTO = Depends(get_admin_user),
     handler: AgentCommandHandler = Depends(get_agent_command_handler),
 ):
     cmd = UpdateAgentPromptCommand(
@@ -88,6 +94,12 @@ async def update_agent(
         prompt=data.prompt,
         description=data.description,
         temperature=data.temperature,
+        cache_responses=data.cache_responses,
+        model=data.model,
+        endpoint=data.endpoint,
+        max_tokens=data.max_tokens,
+        stop=data.stop,
+        reasoning_effort=data.reasoning_effort,
     )
     return await handler.handle_update(cmd)
 
@@ -96,7 +108,7 @@ async def update_agent(
 async def patch_agent(
     agent_id: UUID,
     data: PatchAgentSchema,
-    _: UserDTO = Depends(get_admin_user),
+    _: AuthUserDTO = Depends(get_admin_user),
     handler: AgentCommandHandler = Depends(get_agent_command_handler),
 ):
     cmd = PatchAgentPromptCommand(
@@ -105,6 +117,12 @@ async def patch_agent(
         prompt=data.prompt,
         description=data.description,
         temperature=data.temperature,
+        cache_responses=data.cache_responses,
+        model=data.model,
+        endpoint=data.endpoint,
+        max_tokens=data.max_tokens,
+        stop=data.stop,
+        reasoning_effort=data.reasoning_effort,
     )
     return await handler.handle_patch(cmd)
 
@@ -112,7 +130,7 @@ async def patch_agent(
 @router.delete("/{agent_id}", status_code=204)
 async def delete_agent(
     agent_id: UUID,
-    _: UserDTO = Depends(get_admin_user),
+    _: AuthUserDTO = Depends(get_admin_user),
     handler: AgentCommandHandler = Depends(get_agent_command_handler),
 ):
     return await handler.handle_delete(agent_id)
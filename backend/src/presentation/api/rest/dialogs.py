@@ -2,7 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException
 
 from src.application.dialogs.commands import StartDialogCommand
 from src.application.dialogs.handlers import DialogHandler
-from src.application.users.dto import UserDTO
+from src.application.users.dto import AuthUserDTO
 from src.domain.common.exceptions import ValidationError
 from src.presentation.api.auth import get_current_user
 from src.presentation.api.dependencies import get_dialog_handler
@@ -14,7 +14,7 @@ router = APIRouter(prefix="/dialogs", tags=["dialogs"])
 @router.post("", response_model=DialogSchema, status_code=201)
 async def create_dialog(
     data: CreateDialogSchema,
-    user: UserDTO = Depends(get_current_user),
+    user: AuthUserDTO = Depends(get_current_user),
     handler: DialogHandler = Depends(get_dialog_handler),
 ):
     try:
@@ -0,0 +1,93 @@
+from fastapi import APIRouter, Depends
+
+from src.application.services import llm_usage_totals
+from src.application.users.dto import AuthUserDTO
+from src.infrastructure.db.base import db_manager
+from src.infrastructure.db.repositories.cached import (
+    agent_cache,
+    pipeline_cache,
+    pipeline_version_cache,
+    user_claims_cache,
+)
+from src.infrastructure.llm.resilience import ResilientLLMClient
+from src.infrastructure.pipelines.plan import plan_cache
+
+from ..auth import get_admin_user
+from ..dependencies import (
+    get_context_builder,
+    get_hasher,
+    get_llm,
+    get_llm_http_transport,
+    get_llm_response_cache,
+    get_llm_router,
+)
+
+router = APIRouter(prefix="/metrics", tags=["metrics"])
+
+
+@router.get("/cache")
+async def cache_metrics(_: AuthUserDTO = Depends(get_admin_user)):
+    """Статистика процесс-локальных кэшей (попадания, промахи, размер)."""
+    caches = (pipeline_cache, pipeline_version_cache, agent_cache, user_claims_cache)
+    return {
+        **{cache.name: cache.info() for cache in caches},
+        "plans": plan_cache.info(),
+        "agent_prompt_tokens": get_context_builder().prompt_tokens.info(),
+    }
+
+
+@router.get("/password-hasher")
+async def password_hasher_metrics(_: AuthUserDTO = Depends(get_admin_user)):
+    """Очередь и время работы пула bcrypt."""
+    return get_hasher().info()
+
+
+@router.get("/db-pool")
+async def db_pool_metrics(_: AuthUserDTO = Depends(get_admin_user)):
+    """Пулы соединений с БД: занятые соединения и время ожидания соединения."""
+    return db_manager.pool_info()
+
+
+@router.get("/llm-http")
+async def llm_http_metrics(_: AuthUserDTO = Depends(get_admin_user)):
+    """Пул HTTP соединений к LLM: открытые соединения и время ожидания соединения."""
+    return get_llm_http_transport().info()
+
+
+@router.get("/llm-cache")
+async def llm_cache_metrics(_: AuthUserDTO = Depends(get_admin_user)):
+    """Кэш ответов LLM: попадания, промахи, размер."""
+    response_cache = get_llm_response_cache()
+    return await response_cache.info() if response_cache is not None else {"backend": "none"}
+
+
+@router.get("/llm-scheduler")
+async def llm_scheduler_metrics(_: AuthUserDTO = Depends(get_admin_user)):
+    """Очереди вызовов LLM по endpoint'ам: ожидание, лимит конкурентности, ответы 429."""
+    return {
+        endpoint.name: endpoint.scheduler.info()
+        for endpoints in get_llm_router().groups.values()
+        for endpoint in endpoints
+        if endpoint.scheduler is not None
+    }
+
+
+@router.get("/llm-endpoints")
+async def llm_endpoints_metrics(_: AuthUserDTO = Depends(get_admin_user)):
+    """Endpoint'ы LLM по группам: нагрузка, ошибки, переключения, состояние."""
+    return get_llm_router().info()
+
+
+@router.get("/llm-calls")
+async def llm_calls_metrics(_: AuthUserDTO = Depends(get_admin_user)):
+    """Вызовы LLM: перцентили длительности, повторы, таймауты, выигрыши дублей."""
+    llm = get_llm()
+    return llm.info() if isinstance(llm, ResilientLLMClient) else {}
+
+
+@router.get("/llm-usage")
+async def llm_usage_metrics(_: AuthUserDTO = Depends(get_admin_user)):
+    """Расход токенов LLM с начала работы процесса и доля промпта из кэша провайдера."""
+    usage = llm_usage_totals.to_dict()
+    cached_ratio = usage["cached_tokens"] / usage["prompt_tokens"] if usage["prompt_tokens"] else 0.0
+    return {**usage, "cached_ratio": round(cached_ratio, 4)}
@@ -5,7 +5,7 @@ from pydantic import ValidationError as PydanticValidationError
 
 from src.application.pipelines.dto import PatchPipelineCommand
 from src.application.pipelines.handlers import PipelineHandler
-from src.application.users.dto import UserDTO
+from src.application.users.dto import AuthUserDTO
 from src.domain.common.exceptions import (
     ObjectNotFoundError,
     ValidationError,
@@ -26,7 +26,7 @@ router = APIRouter(prefix="/pipelines", tags=["pipelines"])
 @router.post("", response_model=PipelineReadSchema, status_code=201)
 async def create_pipeline(
     data: PipelineCreateUpdateSchema,
-    _: UserDTO = Depends(get_admin_user),
+    _: AuthUserDTO = Depends(get_admin_user),
     pipeline_handler: PipelineHandler = Depends(get_pipeline_handler),
 ):
     try:
@@ -53,7 +53,7 @@ async def get_pipeline(
 async def update_pipeline(
     pipeline_id: UUID,
     data: PipelineCreateUpdateSchema,
-    _: UserDTO = Depends(get_admin_user),
+    _: AuthUserDTO = Depends(get_admin_user),
     pipeline_handler: PipelineHandler = Depends(get_pipeline_handler),
 ):
     try:
@@ -69,7 +69,7 @@ async def update_pipeline(
 async def patch_pipeline(
     pipeline_id: UUID,
     data: PipelinePatchSchema,
-    _: UserDTO = Depends(get_admin_user),
+    _: AuthUserDTO = Depends(get_admin_user),
     pipeline_handler: PipelineHandler = Depends(get_pipeline_handler),
 ):
     try:
@@ -86,7 +86,7 @@ async def patch_pipeline(
 @router.delete("/{pipeline_id}", status_code=204)
 async def delete_pipeline(
     pipeline_id: UUID,
-    _: UserDTO = Depends(get_admin_user),
+    _: AuthUserDTO = Depends(get_admin_user),
     pipeline_handler: PipelineHandler = Depends(get_pipeline_handler),
 ):
     await pipeline_handler.handle_delete(pipeline_id)
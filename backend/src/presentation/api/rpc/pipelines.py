@@ -1,13 +1,20 @@
+import traceback
+from typing import AsyncIterator
+
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 
 from src.application.pipelines.commands import RunPipelineCommand
+from src.application.pipelines.dto import PipelineEventDTO, PipelineEventType
 from src.application.pipelines.handlers import PipelineHandler
-from src.application.users.dto import UserDTO
+from src.application.services import AgentLLMClient
+from src.application.users.dto import AuthUserDTO
+from src.domain.common.exceptions import DomainError, RepositoryError
 
 from ..auth import get_current_user
-from ..dependencies import get_pipeline_handler
+from ..dependencies import get_llm, get_pipeline_handler, open_pipeline_handler
 from ..schemas.message import MessageSchema, MessagesResponseSchema
-from ..schemas.pipelines import RunPipelineSchema
+from ..schemas.pipelines import PipelineEventSchema, RunPipelineSchema
 
 router = APIRouter(prefix="", tags=["rpc"])
 
@@ -15,7 +22,7 @@ router = APIRouter(prefix="", tags=["rpc"])
 @router.post("/run-pipeline", response_model=MessagesResponseSchema)
 async def run_pipeline(
     data: RunPipelineSchema,
-    user: UserDTO = Depends(get_current_user),
+    user: AuthUserDTO = Depends(get_current_user),
     pipeline_handler: PipelineHandler = Depends(get_pipeline_handler),
 ):
     try:
@@ -30,3 +37,48 @@ async def run_pipeline(
         return MessagesResponseSchema(result=[MessageSchema.model_validate(msg) for msg in messages])
     except ValueError as exc:
         raise HTTPException(status_code=404, detail=str(exc))
+
+
+@router.post("/run-pipeline/stream", response_class=StreamingResponse)
+async def run_pipeline_stream(
+    data: RunPipelineSchema,
+    user: AuthUserDTO = Depends(get_current_user),
+    llm: AgentLLMClient = Depends(get_llm),
+):
+    """
+    Потоковый запуск пайплайна (Server-Sent Events).
+
+    Отдаёт события `node_start`, `node_finish`, `delta` (фрагменты ответа агента)
+    по мере выполнения, в конце — `done` с итоговыми сообщениями или `error`.
+    """
+    cmd = RunPipelineCommand(
+        pipeline_id=data.pipeline_id,
+        dialog_id=data.dialog_id,
+        user_id=user.id,
+        user_message=data.message,
+    )
+
+    async def event_stream() -> AsyncIterator[str]:
+        async with open_pipeline_handler(llm) as pipeline_handler:
+            try:
+                async for event in pipeline_handler.handle_run_pipeline_stream(cmd):
+                    yield _to_sse(event)
+            except (ValueError, DomainError, RepositoryError) as exc:
+                yield _to_sse(PipelineEventDTO(type=PipelineEventType.ERROR, detail=str(exc)))
+            except Exception as exc:
+                # Ошибки LLM провайдера и транспорта: ответ уже начат, поэтому не 500, а событие error
+                print(f"Pipeline {cmd.pipeline_id} stream failed: {exc!r}")
+                traceback.print_exc()
+                detail = f"Pipeline execution failed: {type(exc).__name__}"
+                yield _to_sse(PipelineEventDTO(type=PipelineEventType.ERROR, detail=detail))
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def _to_sse(event: PipelineEventDTO) -> str:
+    data = PipelineEventSchema.model_validate(event).model_dump_json()
+    return f"event: {event.type.value}\ndata: {data}\n\n"
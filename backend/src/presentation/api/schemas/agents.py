@@ -1,13 +1,22 @@
+from typing import Literal
 from uuid import UUID
 
 from pydantic import BaseModel, Field
 
+from src.domain.agents.entities import MAX_STOP_SEQUENCES, ReasoningEffort
+
 
 class UpdateAgentSchema(BaseModel):
     name: str = Field(..., min_length=2, max_length=150)
     description: str
     prompt: str = Field(..., min_length=2, max_length=1500)
     temperature: float = Field(default=0.7, ge=0.0, le=1.0)
+    cache_responses: bool = False
+    model: str | None = Field(default=None, max_length=100)
+    endpoint: str | None = Field(default=None, max_length=100)
+    max_tokens: int | None = Field(default=None, ge=1)
+    stop: list[str] | None = Field(default=None, max_length=MAX_STOP_SEQUENCES)
+    reasoning_effort: ReasoningEffort | None = None
 
     class Config:
         from_attributes = True
@@ -25,3 +34,10 @@ class PatchAgentSchema(BaseModel):
     description: str | None = Field(default=None)
     prompt: str | None = Field(default=None, min_length=2, max_length=1500)
     temperature: float | None = Field(default=None, ge=0.0, le=1.0)
+    cache_responses: bool | None = Field(default=None)
+    model: str | None = Field(default=None, max_length=100)
+    endpoint: str | None = Field(default=None, max_length=100)
+    # 0, [] и "" сбрасывают ограничение
+    max_tokens: int | None = Field(default=None, ge=0)
+    stop: list[str] | None = Field(default=None, max_length=MAX_STOP_SEQUENCES)
+    reasoning_effort: ReasoningEffort | Literal[""] | None = None
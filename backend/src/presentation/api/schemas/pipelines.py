@@ -3,6 +3,10 @@ from uuid import UUID
 
 from pydantic import BaseModel, Field
 
+from src.application.pipelines.dto import PipelineEventType
+
+from .message import MessageSchema
+
 
 class PipelineCreateUpdateSchema(BaseModel):
     name: str = Field(..., max_length=150, title="Название пайплайна")
@@ -24,3 +28,16 @@ class RunPipelineSchema(BaseModel):
     pipeline_id: UUID
     dialog_id: UUID
     message: str
+
+
+class PipelineEventSchema(BaseModel):
+    type: PipelineEventType
+    node_id: UUID | None = None
+    node_type: str | None = None
+    agent_id: UUID | None = None
+    delta: str = ""
+    messages: list[MessageSchema] = []
+    detail: str = ""
+
+    class Config:
+        from_attributes = True
@@ -1,11 +1,11 @@
 import asyncio
-from typing import Any
+import sys
 from uuid import uuid4
 
 from src.application.services import AgentLLMClient
 from src.domain.agents.entities import Agent
-from src.domain.messages.entities import Message
 from src.domain.pipelines.entities import Pipeline
+from src.infrastructure.llm.fake import FakeLLMClient, FakeLLMProfile
 from src.infrastructure.llm.openai_client import OpenAIChatClient
 from src.infrastructure.pipelines.executor import PipelineExecutor
 from src.infrastructure.settings import settings
@@ -84,22 +84,21 @@ print(pm)
 print(PipelineReadSchema.model_validate(pm.model_dump()))
 
 
-class TestAgentLLMClient(AgentLLMClient):
+def create_llm_client(live: bool) -> AgentLLMClient:
+    """Фейковый LLM без сети; `--live` — настоящий провайдер из настроек (нужен API ключ)."""
+    if live:
+        return OpenAIChatClient(
+            settings.openai_api_key, settings.openai_model, base_url=settings.openai_base_url
+        )
+    return FakeLLMClient(FakeLLMProfile(latency=0.05, tokens_per_second=0, answer_tokens=16, seed=0))
 
-    async def generate(self, system_prompt: str, messages: list[Message], **kwargs: Any) -> str:
-        return system_prompt + "New message"
 
-
-async def test_pipeline():
-    openai_llm_client = OpenAIChatClient(
-        settings.openai_api_key, settings.openai_model, base_url=settings.openai_base_url
-    )
-    test_agent_llm_client = TestAgentLLMClient()
+async def test_pipeline(live: bool = False):
     executor = PipelineExecutor(
         dialog_id=uuid4(),
         pipeline=Pipeline.model_validate(pipeline_mixed),
         agents=agents,
-        llm_client=test_agent_llm_client,
+        llm_client=create_llm_client(live),
     )
     messages = await executor.run(
         user_id=uuid4(),
@@ -121,4 +120,4 @@ async def test_pipeline():
 
 
 if __name__ == "__main__":
-    asyncio.run(test_pipeline())
+    asyncio.run(test_pipeline(live="--live" in sys.argv))
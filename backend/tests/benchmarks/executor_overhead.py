@@ -0,0 +1,350 @@
+"""
+Накладные расходы PipelineExecutor без задержек LLM.
+
+Синтетические пайплайны — последовательность из `depth` этапов, каждый этап —
+параллельный узел из `width` агентов (при width=1 — один агент) — выполняются
+с `FakeLLMClient` без задержек поверх истории из `history` прошлых ходов.
+Для каждой формы измеряются:
+
+- us_per_node — время хода (создание executor, сборка контекста, `_run_node`)
+  на один шаг плана, лучший из запусков (меньше всего зависит от фоновой нагрузки);
+- previous_us, merge_us — один вызов `_get_previous_node_messages` для последнего
+  этапа и `_merge` ответов одного параллельного узла;
+- peak_kib — пик памяти за ход (tracemalloc), retained_kib — память, оставшаяся
+  занятой после хода и сборки мусора (новые сообщения и метаданные);
+- alloc_blocks — число блоков памяти, выделенных за ход и не освобожденных подсчетом
+  ссылок: результат хода и циклический мусор (задачи, корутины, замыкания). Сборщик
+  мусора на время хода отключен, поэтому число не зависит от момента сборки.
+
+Форма задается как DEPTHxWIDTHxHISTORY, например 4x8x100.
+
+Запуск из каталога backend:
+    python -m tests.benchmarks.executor_overhead
+    python -m tests.benchmarks.executor_overhead --cases 1x1x0 8x8x50 --repeat 50 --runs 5
+    python -m tests.benchmarks.executor_overhead --save   # записать baseline
+    python -m tests.benchmarks.executor_overhead --check  # сравнить с baseline
+
+Время зависит от машины и ее загрузки, поэтому перед каждой формой замеряется
+эталонный цикл на чистом Python (calibration_us), и при проверке время из baseline
+масштабируется на отношение эталонов. Все формы прогоняются `--runs` раз вперемешку,
+в таблицу, baseline и проверку идет медиана каждой метрики: одиночный всплеск фоновой
+нагрузки ее не сдвигает. Baseline сохраняется на той же машине с текущего коммита.
+`--check` завершается с кодом 1, если метрика хуже baseline больше чем на допуск
+из файла baseline.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import gc
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass, fields
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+from typing import Any
+from uuid import uuid4
+
+from src.application.agents.context import ContextBuilder
+from src.domain.agents.entities import Agent
+from src.domain.messages.entities import Message
+from src.domain.pipelines.entities import Pipeline
+from src.infrastructure.llm.fake import FakeLLMClient, FakeLLMProfile
+from src.infrastructure.llm.tokenizer import HeuristicTokenizer
+from src.infrastructure.pipelines.executor import PipelineExecutor
+from src.infrastructure.pipelines.history import HistoryIndex
+from src.infrastructure.pipelines.plan import ExecutionPlan
+
+BASELINE_PATH = Path(__file__).with_name("executor_overhead_baseline.json")
+DEFAULT_CASES = ["1x1x0", "1x1x200", "4x1x50", "16x1x50", "1x4x50", "1x16x50", "4x4x50", "8x8x20", "4x4x200"]
+# Допуск по умолчанию: время шумит сильнее памяти
+DEFAULT_TOLERANCE = {"time": 0.5, "memory": 0.1, "allocations": 0.1}
+TIME_METRICS = ("us_per_node", "previous_us", "merge_us")
+MEMORY_METRICS = ("peak_kib", "retained_kib")
+ALLOCATION_METRICS = ("alloc_blocks",)
+# Абсолютный запас для метрик около нуля, где относительный шум велик
+ABSOLUTE_SLACK = {"time": 5.0, "memory": 4.0, "allocations": 20.0}
+
+AGENT_PROMPT = "Ты — эксперт. Ответь кратко и по делу, учитывая ответы других участников. " * 4
+USER_TEXT = "Как выбрать концепцию кафе в центре города, чтобы выделиться среди конкурентов? " * 2
+
+
+@dataclass(slots=True, kw_only=True)
+class CaseResult:
+    steps: int
+    agent_calls: int
+    run_ms: float
+    us_per_node: float
+    previous_us: float
+    merge_us: float
+    peak_kib: float
+    retained_kib: float
+    alloc_blocks: float
+    calibration_us: float
+
+
+@dataclass(frozen=True, slots=True, kw_only=True)
+class Shape:
+    depth: int
+    width: int
+    history: int
+
+    @classmethod
+    def parse(cls, value: str) -> "Shape":
+        depth, width, history = (int(part) for part in value.lower().split("x"))
+        return cls(depth=depth, width=width, history=history)
+
+    def __str__(self) -> str:
+        return f"{self.depth}x{self.width}x{self.history}"
+
+
+def make_pipeline(shape: Shape) -> tuple[Pipeline, list[Agent]]:
+    agents = [
+        Agent.create(f"agent-{i}", "benchmark agent", AGENT_PROMPT) for i in range(shape.depth * shape.width)
+    ]
+    stages: list[dict[str, Any]] = []
+    for stage in range(shape.depth):
+        nodes = [
+            {"type": "agent", "agent_id": agent.id}
+            for agent in agents[stage * shape.width : (stage + 1) * shape.width]
+        ]
+        if shape.width == 1:
+            stages.extend(nodes)
+        else:
+            stages.append({"type": "parallel", "merge_strategy": "concat_numbered", "nodes": nodes})
+    pipeline = Pipeline.model_validate(
+        {"name": f"bench-{shape}", "root": {"type": "sequence", "nodes": stages}}
+    )
+    return pipeline, agents
+
+
+def make_history(shape: Shape, agents: list[Agent], dialog_id: Any, user_id: Any) -> list[Message]:
+    """Прошлые ходы в том виде, в каком их сохраняет executor: вопрос и ответы всех агентов."""
+    started_at = datetime.now(UTC) - timedelta(days=1)
+    history: list[Message] = []
+    for turn in range(shape.history):
+        turn_messages = [Message.from_user(dialog_id=dialog_id, user_id=user_id, text=f"{turn}. {USER_TEXT}")]
+        turn_messages.extend(
+            Message.from_agent(dialog_id=dialog_id, agent_id=agent.id, text=f"{turn}. {AGENT_PROMPT}")
+            for agent in agents
+        )
+        for msg in turn_messages:
+            msg.created_at = msg.updated_at = started_at + timedelta(milliseconds=len(history))
+            history.append(msg)
+    return history
+
+
+class Case:
+    def __init__(self, shape: Shape) -> None:
+        self.shape = shape
+        self.dialog_id, self.user_id = uuid4(), uuid4()
+        pipeline, self.agents = make_pipeline(shape)
+        self.plan = ExecutionPlan.compile(pipeline)
+        self.history = make_history(shape, self.agents, self.dialog_id, self.user_id)
+        self.llm_client = FakeLLMClient(FakeLLMProfile(latency=0, tokens_per_second=0, answer_tokens=32))
+        self.context_builder = ContextBuilder(HeuristicTokenizer(), max_tokens=8000)
+
+    def executor(self) -> PipelineExecutor:
+        return PipelineExecutor(
+            self.plan,
+            dialog_id=self.dialog_id,
+            agents=self.agents,
+            llm_client=self.llm_client,
+            context_builder=self.context_builder,
+        )
+
+    async def run_once(self) -> list[Message]:
+        executor = self.executor()
+        await executor.run(user_id=self.user_id, user_input=USER_TEXT, history=list(self.history))
+        return executor.generated_messages
+
+    async def measure(self, repeat: int) -> CaseResult:
+        await self.run_once()  # Прогрев кэшей токенов
+        calibration = calibrate()
+        durations = []
+        for _ in range(repeat):
+            started_at = time.perf_counter()
+            await self.run_once()
+            durations.append(time.perf_counter() - started_at)
+        run_seconds = min(durations)
+        steps = len(self.plan.steps)
+
+        gc.collect()
+        tracemalloc.start()
+        gc.disable()
+        try:
+            snapshot = tracemalloc.take_snapshot()
+            before, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            generated = await self.run_once()
+            _, peak = tracemalloc.get_traced_memory()  # Снимки памяти в пик и остаток не попадают
+            alloc_blocks = _new_blocks(snapshot, tracemalloc.take_snapshot())
+            # Циклический мусор (задачи, корутины) иначе попадает в замер в зависимости от момента сборки
+            gc.collect()
+            after, _ = tracemalloc.get_traced_memory()
+        finally:
+            gc.enable()
+            tracemalloc.stop()
+        del generated, snapshot
+
+        return CaseResult(
+            steps=steps,
+            agent_calls=len(self.agents),
+            run_ms=run_seconds * 1000,
+            us_per_node=run_seconds / steps * 1e6,
+            previous_us=self.measure_previous(repeat),
+            merge_us=self.measure_merge(repeat),
+            peak_kib=(peak - before) / 1024,
+            retained_kib=(after - before) / 1024,
+            alloc_blocks=alloc_blocks,
+            calibration_us=calibration,
+        )
+
+    def measure_previous(self, repeat: int) -> float:
+        executor = self.executor()
+        last_stage = self.plan.steps[self.plan.root_step.children[-1]]
+        if last_stage.previous is None:
+            return 0.0
+        previous, history = last_stage.previous, HistoryIndex(self.history)
+
+        def call() -> None:
+            executor._previous_messages.clear()  # Без кэша за ход: замеряем саму сборку
+            executor._get_previous_node_messages(previous, history)
+
+        return _per_call_us(call, repeat)
+
+    def measure_merge(self, repeat: int) -> float:
+        if self.shape.width == 1:
+            return 0.0
+        answers = [
+            Message.from_agent(dialog_id=self.dialog_id, agent_id=agent.id, text=AGENT_PROMPT)
+            for agent in self.agents[: self.shape.width]
+        ]
+        return _per_call_us(lambda: PipelineExecutor._merge(answers, "concat_numbered"), repeat * 50)
+
+
+def _new_blocks(before: tracemalloc.Snapshot, after: tracemalloc.Snapshot) -> int:
+    """Прирост числа занятых блоков между снимками без памяти самих снимков."""
+    exclude = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, "<unknown>")]
+    diff = after.filter_traces(exclude).compare_to(before.filter_traces(exclude), "filename")
+    return sum(stat.count_diff for stat in diff)
+
+
+def calibrate() -> float:
+    """Время эталонного цикла в мкс: мера скорости машины в момент замера."""
+    return _per_call_us(lambda: sorted(str(i) for i in range(10_000)), repeat=5, rounds=7)
+
+
+def _per_call_us(call: Any, repeat: int, rounds: int = 5) -> float:
+    call()
+    best = float("inf")
+    for _ in range(rounds):
+        started_at = time.perf_counter()
+        for _ in range(repeat):
+            call()
+        best = min(best, time.perf_counter() - started_at)
+    return best / repeat * 1e6
+
+
+async def run(shapes: list[Shape], repeat: int, runs: int) -> dict[str, CaseResult]:
+    cases = [Case(shape) for shape in shapes]
+    measured: dict[str, list[CaseResult]] = {str(shape): [] for shape in shapes}
+    # Executor и агенты печатают каждый шаг — в замер попадает форматирование, но не вывод в терминал
+    with open(os.devnull, "w") as devnull:
+        for _ in range(runs):
+            for case in cases:  # Вперемешку: долгая фоновая нагрузка задевает один прогон каждой формы
+                with contextlib.redirect_stdout(devnull):
+                    measured[str(case.shape)].append(await case.measure(repeat))
+    results = {name: median_result(values) for name, values in measured.items()}
+    for name, result in results.items():
+        print_row(name, result)
+    return results
+
+
+def median_result(results: list[CaseResult]) -> CaseResult:
+    """Медиана каждой метрики по прогонам; число шагов и вызовов у прогонов одинаковое."""
+    values = {
+        field.name: statistics.median(getattr(r, field.name) for r in results) for field in fields(CaseResult)
+    }
+    return CaseResult(**{**values, "steps": results[0].steps, "agent_calls": results[0].agent_calls})
+
+
+def print_header() -> None:
+    print(
+        f"{'shape':<12}{'steps':>6}{'run ms':>10}{'us/node':>10}{'prev us':>10}"
+        f"{'merge us':>10}{'peak KiB':>10}{'kept KiB':>10}{'blocks':>10}"
+    )
+
+
+def print_row(name: str, result: CaseResult) -> None:
+    print(
+        f"{name:<12}{result.steps:>6}{result.run_ms:>10.2f}{result.us_per_node:>10.1f}"
+        f"{result.previous_us:>10.1f}{result.merge_us:>10.1f}"
+        f"{result.peak_kib:>10.1f}{result.retained_kib:>10.1f}{result.alloc_blocks:>10.0f}"
+    )
+
+
+def check(results: dict[str, CaseResult], baseline: dict[str, Any]) -> list[str]:
+    """Метрики, вышедшие за допуск baseline."""
+    tolerance = {**DEFAULT_TOLERANCE, **baseline.get("tolerance", {})}
+    regressions = []
+    for name, result in results.items():
+        expected = baseline["cases"].get(name)
+        if expected is None:
+            continue
+        # Во сколько раз машина сейчас медленнее, чем при записи baseline
+        speed = result.calibration_us / expected["calibration_us"]
+        for metric in (*TIME_METRICS, *MEMORY_METRICS, *ALLOCATION_METRICS):
+            kind = _metric_kind(metric)
+            reference = expected[metric] * speed if kind == "time" else expected[metric]
+            allowed = max(reference * (1 + tolerance[kind]), reference + ABSOLUTE_SLACK[kind])
+            value = getattr(result, metric)
+            if value > allowed:
+                regressions.append(f"{name} {metric}: {value:.1f} > {allowed:.1f} (baseline {reference:.1f})")
+    return regressions
+
+
+def _metric_kind(metric: str) -> str:
+    if metric in TIME_METRICS:
+        return "time"
+    return "memory" if metric in MEMORY_METRICS else "allocations"
+
+
+def save(results: dict[str, CaseResult], path: Path) -> None:
+    baseline = {
+        "tolerance": DEFAULT_TOLERANCE,
+        "cases": {
+            name: {key: round(value, 2) for key, value in asdict(result).items()}
+            for name, result in results.items()
+        },
+    }
+    path.write_text(json.dumps(baseline, indent=2) + "\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--cases", nargs="+", default=DEFAULT_CASES, help="DEPTHxWIDTHxHISTORY")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--runs", type=int, default=5, help="прогонов всех форм, берется медиана")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--save", action="store_true", help="записать результаты как baseline")
+    mode.add_argument("--check", action="store_true", help="сравнить результаты с baseline")
+    args = parser.parse_args()
+
+    print_header()
+    results = asyncio.run(run([Shape.parse(case) for case in args.cases], args.repeat, args.runs))
+    if args.save:
+        save(results, args.baseline)
+        print(f"Baseline saved to {args.baseline}")
+    elif args.check:
+        regressions = check(results, json.loads(args.baseline.read_text()))
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        sys.exit(1 if regressions else 0)
@@ -0,0 +1,164 @@
+"""
+Общие фикстуры тестов.
+
+Приложение запускается на временной sqlite базе с `FakeLLMClient` без задержек,
+поэтому тесты не требуют сети и внешних сервисов. Переменные окружения
+задаются до импорта `src`: настройки читаются при импорте.
+"""
+
+import os
+import tempfile
+from pathlib import Path
+from typing import Any, AsyncGenerator, Iterator
+from uuid import UUID, uuid4
+
+_tmp_dir = Path(tempfile.mkdtemp(prefix="brain-storm-tests-"))
+os.environ.update(
+    {
+        "JWT_SECRET": "test-secret",
+        "DB_URL": f"sqlite+aiosqlite:///{_tmp_dir / 'test.sqlite3'}",
+        "LLM_BACKEND": "fake",
+        "FAKE_LLM_LATENCY": "0",
+        "FAKE_LLM_TOKENS_PER_SECOND": "0",
+        "FAKE_LLM_ANSWER_TOKENS": "16",
+        "LLM_CACHE_BACKEND": "memory",
+        "PASSWORD_HASH_ROUNDS": "4",
+    }
+)
+
+import pytest  # noqa: E402
+from advanced_alchemy.base import orm_registry  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import update  # noqa: E402
+
+from src.application.dialogs.commands import StartDialogCommand  # noqa: E402
+from src.application.dialogs.handlers import DialogHandler  # noqa: E402
+from src.domain.messages.entities import Message  # noqa: E402
+from src.infrastructure.db.base import db_manager  # noqa: E402
+from src.infrastructure.db.models import UserModel  # noqa: E402
+from src.infrastructure.db.unit_of_work import SqlAlchemyUnitOfWork  # noqa: E402
+from src.infrastructure.llm.fake import FakeLLMClient, FakeLLMProfile  # noqa: E402
+
+
+class Api:
+    """Клиент REST API с токеном администратора и короткими методами для подготовки данных."""
+
+    def __init__(self, client: TestClient, user_id: UUID, headers: dict[str, str]) -> None:
+        self.client = client
+        self.user_id = user_id
+        self.headers = headers
+
+    def post(self, url: str, **kwargs: Any) -> Any:
+        return self.client.post(url, headers=self.headers, **kwargs)
+
+    def patch(self, url: str, **kwargs: Any) -> Any:
+        return self.client.patch(url, headers=self.headers, **kwargs)
+
+    def get(self, url: str, **kwargs: Any) -> Any:
+        return self.client.get(url, headers=self.headers, **kwargs)
+
+    def delete(self, url: str, **kwargs: Any) -> Any:
+        return self.client.delete(url, headers=self.headers, **kwargs)
+
+    def create_agent(self, **fields: Any) -> UUID:
+        agent_id = uuid4()
+        body = {
+            "id": str(agent_id),
+            "name": f"agent-{agent_id.hex[:8]}",
+            "description": "агент",
+            "prompt": "Ты эксперт.",
+        }
+        response = self.post("/api/v1/agents", json={**body, **fields})
+        assert response.status_code == 201, response.text
+        return agent_id
+
+    def create_pipeline(self, root: dict[str, Any]) -> UUID:
+        response = self.post("/api/v1/pipelines", json={"name": f"pipeline-{uuid4().hex[:8]}", "root": root})
+        assert response.status_code == 201, response.text
+        return UUID(response.json()["id"])
+
+    def create_dialog(self, pipeline_id: UUID) -> UUID:
+        # Через обработчик: схема ответа POST /dialogs требует поле agents, которого нет в DialogDTO
+        async def start() -> UUID:
+            async with db_manager.session() as session:
+                handler = DialogHandler(uow=SqlAlchemyUnitOfWork(session), llm=FakeLLMClient())
+                cmd = StartDialogCommand(user_id=self.user_id, name="dialog", pipeline_id=pipeline_id)
+                return (await handler.handle_start_dialog(cmd)).id
+
+        return self.client.portal.call(start)
+
+    def run_pipeline(self, pipeline_id: UUID, dialog_id: UUID, message: str) -> Any:
+        body = {"pipeline_id": str(pipeline_id), "dialog_id": str(dialog_id), "message": message}
+        return self.post("/api/v1/rpc/run-pipeline", json=body)
+
+
+class CountingLLM(FakeLLMClient):
+    """`FakeLLMClient` без задержек, считающий обращения к провайдеру."""
+
+    def __init__(self, profile: FakeLLMProfile | None = None, **kwargs: Any) -> None:
+        super().__init__(profile or FakeLLMProfile(latency=0, tokens_per_second=0, answer_tokens=8), **kwargs)
+        self.calls = 0
+        self.kwargs: list[dict[str, Any]] = []
+
+    def maybe_fail(self) -> None:
+        self.calls += 1
+        super().maybe_fail()
+
+    async def generate_stream(
+        self, system_prompt: str, messages: list[Message], **kwargs: Any
+    ) -> AsyncGenerator[str, None]:
+        self.kwargs.append(kwargs)
+        async for chunk in super().generate_stream(system_prompt, messages, **kwargs):
+            yield chunk
+
+    async def generate_choices(
+        self, system_prompt: str, messages: list[Message], n: int, **kwargs: Any
+    ) -> list[str]:
+        self.kwargs.append({**kwargs, "n": n})
+        return await super().generate_choices(system_prompt, messages, n, **kwargs)
+
+
+def agent_node(agent_id: UUID) -> dict[str, Any]:
+    return {"type": "agent", "agent_id": str(agent_id)}
+
+
+@pytest.fixture(scope="session")
+def client() -> Iterator[TestClient]:
+    import main
+
+    with TestClient(main.app) as test_client:
+
+        async def create_tables() -> None:
+            async with db_manager.connect() as conn:
+                await conn.run_sync(orm_registry.metadata.create_all)
+
+        test_client.portal.call(create_tables)
+        yield test_client
+
+
+def register(client: TestClient, *, superuser: bool = False) -> tuple[UUID, dict[str, str]]:
+    """Регистрирует пользователя и возвращает его id и заголовки с access-токеном."""
+    username = f"user-{uuid4().hex[:8]}"
+    response = client.post(
+        "/api/v1/auth/register", json={"username": username, "email": f"{username}@test", "password": "pass"}
+    )
+    assert response.status_code == 200, response.text
+    user_id = UUID(response.json()["id"])
+    if superuser:
+
+        async def make_superuser() -> None:
+            async with db_manager.session() as session:
+                await session.execute(
+                    update(UserModel).where(UserModel.id == user_id).values(is_superuser=True)
+                )
+                await session.commit()
+
+        client.portal.call(make_superuser)
+    tokens = client.post("/api/v1/auth/token", json={"username": username, "password": "pass"}).json()
+    return user_id, {"Authorization": f"Bearer {tokens['access']}"}
+
+
+@pytest.fixture(scope="session")
+def api(client: TestClient) -> Api:
+    user_id, headers = register(client, superuser=True)
+    return Api(client, user_id, headers)
@@ -0,0 +1,32 @@
+from uuid import uuid4
+
+import pytest
+
+from src.domain.agents.entities import Agent
+from src.domain.common.exceptions import ValidationError
+
+
+def make_agent() -> Agent:
+    return Agent(id=uuid4(), name="agent", description="агент", prompt="Ты эксперт.", max_tokens=100)
+
+
+def test_patch_updates_given_fields_only() -> None:
+    agent = make_agent().patch(prompt="Новый промпт.", temperature=0.2, model="gpt-4o-mini")
+
+    assert (agent.prompt, agent.temperature, agent.model) == ("Новый промпт.", 0.2, "gpt-4o-mini")
+    assert (agent.name, agent.max_tokens) == ("agent", 100)
+
+
+def test_patch_resets_limits_with_empty_values() -> None:
+    agent = make_agent().patch(max_tokens=0, stop=[], model="")
+
+    assert agent.max_tokens is None and agent.stop is None and agent.model is None
+
+
+@pytest.mark.parametrize(
+    "fields",
+    [{"temperature": 2}, {"prompt": "  "}, {"max_tokens": -1}, {"stop": [""]}, {"reasoning_effort": "max"}],
+)
+def test_patch_rejects_invalid_values(fields: dict) -> None:
+    with pytest.raises(ValidationError):
+        make_agent().patch(**fields)
@@ -0,0 +1,53 @@
+from uuid import uuid4
+
+import pytest
+
+from src.application.agents.commands import CreateAgentCommand
+from src.application.agents.handlers import AgentCommandHandler
+from src.domain.common.exceptions import ValidationError
+from src.infrastructure.db.base import db_manager
+from src.infrastructure.db.unit_of_work import SqlAlchemyUnitOfWork
+from tests.conftest import Api
+
+
+def agent_body(**fields: object) -> dict[str, object]:
+    agent_id = uuid4()
+    return {
+        "id": str(agent_id),
+        "name": f"agent-{agent_id.hex[:8]}",
+        "description": "агент",
+        "prompt": "Ты эксперт.",
+        **fields,
+    }
+
+
+def test_unknown_endpoint_group_is_rejected(api: Api) -> None:
+    response = api.post("/api/v1/agents", json=agent_body(endpoint="missing"))
+
+    assert response.status_code == 422
+    assert "Unknown LLM endpoint: missing" in response.json()["detail"]
+
+
+def test_endpoint_group_is_checked_on_patch(api: Api) -> None:
+    agent_id = api.create_agent(endpoint="default")
+
+    assert api.patch(f"/api/v1/agents/{agent_id}", json={"endpoint": "missing"}).status_code == 422
+    response = api.patch(f"/api/v1/agents/{agent_id}", json={"endpoint": ""})
+    assert response.status_code == 200, response.text
+    assert response.json()["endpoint"] is None
+
+
+@pytest.mark.parametrize(
+    "fields", [{"max_tokens": -1}, {"stop": ["a", "b", "c", "d", "e"]}, {"temperature": 3}]
+)
+def test_handler_validates_generation_limits(api: Api, fields: dict[str, object]) -> None:
+    cmd = CreateAgentCommand(
+        agent_id=uuid4(), name="agent", description="агент", prompt="Ты эксперт.", **fields
+    )
+
+    async def create() -> None:
+        async with db_manager.session() as session:
+            await AgentCommandHandler(uow=SqlAlchemyUnitOfWork(session)).handle_create(cmd)
+
+    with pytest.raises(ValidationError):
+        api.client.portal.call(create)
@@ -0,0 +1,71 @@
+from dataclasses import replace
+from uuid import UUID, uuid4
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src.infrastructure.db.base import db_manager
+from src.infrastructure.db.repositories.cached import user_claims_cache
+from src.infrastructure.db.unit_of_work import SqlAlchemyUnitOfWork
+from tests.conftest import register
+
+# Ручка только для администраторов: 403 для обычного пользователя, 404 для администратора
+ADMIN_URL = "/api/v1/agents/00000000-0000-0000-0000-000000000000"
+
+
+def set_superuser(client: TestClient, user_id: UUID, *, fail: bool = False) -> None:
+    async def update() -> None:
+        async with db_manager.session() as session:
+            uow = SqlAlchemyUnitOfWork(session)
+            async with uow:
+                user = await uow.users.get_by_id(user_id)
+                await uow.users.update(replace(user, is_superuser=True))
+                if fail:
+                    raise RuntimeError("rollback")
+
+    if fail:
+        with pytest.raises(RuntimeError):
+            client.portal.call(update)
+    else:
+        client.portal.call(update)
+
+
+def test_claims_are_cached_and_dropped_after_commit(client: TestClient) -> None:
+    user_id, headers = register(client)
+
+    assert client.get(ADMIN_URL, headers=headers).status_code == 403
+    cached = user_claims_cache.get(user_id)
+    assert cached is not None and not cached.is_superuser
+
+    set_superuser(client, user_id)
+
+    assert user_claims_cache.get(user_id) is None
+    assert client.get(ADMIN_URL, headers=headers).status_code == 404
+
+
+def test_rolled_back_update_keeps_cached_claims(client: TestClient) -> None:
+    user_id, headers = register(client)
+    assert client.get(ADMIN_URL, headers=headers).status_code == 403
+
+    set_superuser(client, user_id, fail=True)
+
+    assert user_claims_cache.get(user_id) is not None
+    assert client.get(ADMIN_URL, headers=headers).status_code == 403
+
+
+def test_invalid_token_is_unauthorized(client: TestClient) -> None:
+    response = client.get(ADMIN_URL, headers={"Authorization": "Bearer broken"})
+    assert response.status_code == 401
+
+
+def test_refresh_token_issues_new_pair(client: TestClient) -> None:
+    username = f"user-{uuid4().hex[:8]}"
+    body = {"username": username, "email": f"{username}@test", "password": "pass"}
+    assert client.post("/api/v1/auth/register", json=body).status_code == 200
+    tokens = client.post("/api/v1/auth/token", json={"username": username, "password": "pass"}).json()
+
+    response = client.post("/api/v1/auth/token/refresh", json={"token": tokens["refresh"]})
+
+    assert response.status_code == 200, response.text
+    assert set(response.json()) == {"access", "refresh"}
+    assert client.post("/api/v1/auth/token/refresh", json={"token": tokens["access"]}).status_code != 200
@@ -0,0 +1,68 @@
+from datetime import UTC, datetime, timedelta
+from uuid import uuid4
+
+from src.application.agents.context import MESSAGE_OVERHEAD_TOKENS, ContextBuilder
+from src.domain.agents.entities import Agent
+from src.domain.messages.entities import Message
+from src.infrastructure.llm.tokenizer import HeuristicTokenizer
+
+DIALOG_ID, USER_ID = uuid4(), uuid4()
+AGENT = Agent.create("agent", "агент", "Ты эксперт.")
+
+
+def at(message: Message, seconds: int) -> Message:
+    message.created_at = datetime(2025, 1, 1, tzinfo=UTC) + timedelta(seconds=seconds)
+    return message
+
+
+def user(text: str, seconds: int) -> Message:
+    return at(Message.from_user(dialog_id=DIALOG_ID, user_id=USER_ID, text=text), seconds)
+
+
+def agent(text: str, seconds: int) -> Message:
+    return at(Message.from_agent(dialog_id=DIALOG_ID, agent_id=AGENT.id, text=text), seconds)
+
+
+def builder(max_tokens: int | None) -> ContextBuilder:
+    return ContextBuilder(HeuristicTokenizer(), max_tokens=max_tokens, min_truncated_tokens=4)
+
+
+def test_without_budget_keeps_all_messages() -> None:
+    messages = [user("вопрос " * 50, 0), agent("ответ " * 50, 1)]
+    context = builder(None).build(AGENT, messages)
+    assert context.messages == messages
+    assert context.dropped == 0
+
+
+def test_keeps_user_question_even_if_newer_agent_answers_fill_budget() -> None:
+    question = user("вопрос пользователя", 0)
+    answers = [agent("ответ " * 40, i) for i in range(1, 4)]
+    small = builder(None).count_prompt(AGENT) + builder(None).count_message(question) + 20
+
+    context = builder(small).build(AGENT, [question, *answers])
+
+    assert question in context.messages
+    assert context.dropped >= 2
+    assert context.prompt_tokens <= small
+
+
+def test_truncates_question_that_does_not_fit_and_keeps_its_end() -> None:
+    question = user("начало " + "слово " * 200 + "конец", 0)
+    budget = builder(None).count_prompt(AGENT) + MESSAGE_OVERHEAD_TOKENS + 10
+
+    context = builder(budget).build(AGENT, [question])
+
+    [kept] = context.messages
+    assert kept.id == question.id
+    assert kept.text.endswith("конец")
+    assert len(kept.text) < len(question.text)
+    assert context.truncated == 1
+
+
+def test_does_not_mutate_input_messages() -> None:
+    messages = [user("вопрос " * 100, 0), agent("ответ " * 100, 1), user("еще вопрос " * 100, 2)]
+    before = [(message.text, dict(message.metadata)) for message in messages]
+
+    builder(builder(None).count_prompt(AGENT) + 60).build(AGENT, messages)
+
+    assert [(message.text, message.metadata) for message in messages] == before
@@ -0,0 +1,61 @@
+from pathlib import Path
+from uuid import uuid4
+
+import pytest
+
+from src.domain.messages.entities import Message
+from src.infrastructure.llm.cache import (
+    CachingLLMClient,
+    LLMResponseCache,
+    MemoryResponseCache,
+    SQLiteResponseCache,
+)
+from tests.conftest import CountingLLM
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def response_cache(request: pytest.FixtureRequest, tmp_path: Path) -> LLMResponseCache:
+    if request.param == "memory":
+        return MemoryResponseCache(maxsize=10, ttl=60)
+    return SQLiteResponseCache(str(tmp_path / "cache.sqlite3"), maxsize=10, ttl=60)
+
+
+def question(text: str) -> list[Message]:
+    return [Message.from_user(uuid4(), uuid4(), text)]
+
+
+async def test_repeated_request_is_served_from_cache(response_cache: LLMResponseCache) -> None:
+    llm = CountingLLM()
+    client = CachingLLMClient(llm, response_cache)
+
+    first = await client.generate("Ты эксперт.", question("Вопрос"))
+    second = await client.generate("Ты эксперт.", question("Вопрос"))
+    other = await client.generate("Ты эксперт.", question("Другой вопрос"))
+
+    assert first == second and other != first
+    assert llm.calls == 2
+    info = await response_cache.info()
+    assert (info["hits"], info["misses"], info["size"]) == (1, 2, 2)
+
+
+async def test_stream_is_cached_after_full_answer(response_cache: LLMResponseCache) -> None:
+    llm = CountingLLM()
+    client = CachingLLMClient(llm, response_cache)
+
+    streamed = "".join([chunk async for chunk in client.generate_stream("Ты эксперт.", question("Вопрос"))])
+    cached = [chunk async for chunk in client.generate_stream("Ты эксперт.", question("Вопрос"))]
+
+    assert cached == [streamed]
+    assert llm.calls == 1
+
+
+async def test_sqlite_cache_evicts_least_recently_read(tmp_path: Path) -> None:
+    response_cache = SQLiteResponseCache(str(tmp_path / "cache.sqlite3"), maxsize=2, ttl=60)
+    for key in ("a", "b"):
+        await response_cache.set(key, key)
+    await response_cache.get("a")
+    await response_cache.set("c", "c")
+
+    assert await response_cache.get("b") is None
+    assert await response_cache.get("a") == "a"
+    assert (await response_cache.info())["evictions"] == 1
@@ -0,0 +1,70 @@
+import socket
+import threading
+import time
+from typing import Iterator
+
+import httpx
+import pytest
+import uvicorn
+
+from src.infrastructure.llm.fake import FakeLLMProfile
+from src.infrastructure.llm.http import (
+    TimedTransport,
+    create_http_client,
+    create_http_transport,
+    warm_up,
+)
+from src.infrastructure.llm.openai_client import OpenAIChatClient
+from src.infrastructure.llm.stub_server import create_stub_app
+
+
+@pytest.fixture(scope="module")
+def stub_url() -> Iterator[str]:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    app = create_stub_app(FakeLLMProfile(latency=0, tokens_per_second=0))
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    yield f"http://127.0.0.1:{port}/v1"
+    server.should_exit = True
+    thread.join()
+
+
+def make_client() -> tuple[TimedTransport, httpx.AsyncClient]:
+    transport = create_http_transport(
+        max_connections=4, max_keepalive_connections=4, keepalive_expiry=60, http2=False
+    )
+    return transport, create_http_client(transport, timeout=10, connect_timeout=5)
+
+
+async def test_warm_up_opens_connections_with_get_models(stub_url: str) -> None:
+    transport, client = make_client()
+    async with client:
+        opened = await warm_up(client, stub_url, 3)
+    info = transport.info()
+
+    assert opened == 3
+    assert info["connects"] == 3 and info["requests"] == 3 and info["in_flight"] == 0
+
+
+async def test_transport_counts_request_until_response_is_closed(stub_url: str) -> None:
+    transport, client = make_client()
+    async with client:
+        async with client.stream("GET", f"{stub_url}/models") as response:
+            assert response.status_code == 200
+            assert transport.info()["in_flight"] == 1
+        assert transport.info()["in_flight"] == 0
+
+
+def test_pool_wait_is_printed_only_above_threshold(capsys: pytest.CaptureFixture[str]) -> None:
+    client = OpenAIChatClient("sk-test", "gpt-4o-mini", pool_wait_log_threshold=0.05)
+
+    client._report_pool_wait("gpt-4o-mini", [0.001])
+    assert capsys.readouterr().out == ""
+
+    client._report_pool_wait("gpt-4o-mini", [0.001, 0.2])
+    assert "pool wait 1.0, 200.0 ms" in capsys.readouterr().out
@@ -0,0 +1,103 @@
+from uuid import uuid4
+
+import pytest
+
+from src.domain.messages.entities import Message
+from src.infrastructure.llm.fake import FakeLLMError, FakeLLMProfile
+from src.infrastructure.llm.resilience import ResilientLLMClient
+from src.infrastructure.llm.router import LLMEndpoint, LLMRouter
+from tests.conftest import CountingLLM
+
+QUESTION = [Message.from_user(uuid4(), uuid4(), "Вопрос")]
+
+
+class FlakyLLM(CountingLLM):
+    """Первые `failures` вызовов завершаются ошибкой `status_code`."""
+
+    def __init__(self, failures: int, status_code: int = 503) -> None:
+        super().__init__()
+        self.failures = failures
+        self.status_code = status_code
+
+    def maybe_fail(self) -> None:
+        super().maybe_fail()
+        if self.calls <= self.failures:
+            raise FakeLLMError(self.status_code)
+
+
+def failing(status_code: int) -> CountingLLM:
+    return CountingLLM(
+        FakeLLMProfile(latency=0, tokens_per_second=0, error_rate=1.0, error_status=status_code)
+    )
+
+
+async def test_transient_error_is_retried() -> None:
+    llm = FlakyLLM(failures=2)
+    client = ResilientLLMClient(llm, max_retries=2, backoff=0)
+
+    answer = await client.generate("Ты эксперт.", QUESTION)
+
+    assert answer == await CountingLLM().generate("Ты эксперт.", QUESTION)
+    assert llm.calls == 3 and client.stats.retries == 2
+
+
+async def test_retries_are_bounded() -> None:
+    llm = failing(503)
+    client = ResilientLLMClient(llm, max_retries=2, backoff=0)
+
+    with pytest.raises(FakeLLMError):
+        await client.generate("Ты эксперт.", QUESTION)
+
+    assert llm.calls == 3 and client.stats.failed == 1
+
+
+async def test_client_errors_are_not_retried() -> None:
+    llm = failing(400)
+
+    with pytest.raises(FakeLLMError):
+        await ResilientLLMClient(llm, max_retries=2, backoff=0).generate("Ты эксперт.", QUESTION)
+
+    assert llm.calls == 1
+
+
+async def test_slow_attempt_times_out() -> None:
+    llm = CountingLLM(FakeLLMProfile(latency=1.0, latency_sigma=0, tokens_per_second=0))
+    client = ResilientLLMClient(llm, timeout=0.02, max_retries=1, backoff=0)
+
+    with pytest.raises(TimeoutError):
+        await client.generate("Ты эксперт.", QUESTION)
+
+    assert client.stats.timeouts == 2
+
+
+async def test_stream_is_retried_before_first_chunk() -> None:
+    llm = FlakyLLM(failures=1)
+    client = ResilientLLMClient(llm, max_retries=1, backoff=0)
+
+    chunks = [chunk async for chunk in client.generate_stream("Ты эксперт.", QUESTION)]
+
+    assert "".join(chunks) == await CountingLLM().generate("Ты эксперт.", QUESTION)
+    assert llm.calls == 2
+
+
+async def test_retries_do_not_multiply_across_router_endpoints() -> None:
+    first, second = failing(503), failing(503)
+    router = LLMRouter({"default": [LLMEndpoint("a", first), LLMEndpoint("b", second)]})
+    client = ResilientLLMClient(router, max_retries=1, backoff=0)
+
+    with pytest.raises(FakeLLMError):
+        await client.generate("Ты эксперт.", QUESTION)
+
+    # Одна попытка и один повтор, причем повтор ушел на другой endpoint
+    assert (first.calls, second.calls) == (1, 1)
+
+
+async def test_rate_limit_fails_over_without_outer_retry() -> None:
+    first, second = failing(429), failing(429)
+    router = LLMRouter({"default": [LLMEndpoint("a", first), LLMEndpoint("b", second)]})
+    client = ResilientLLMClient(router, max_retries=2, backoff=0)
+
+    with pytest.raises(FakeLLMError):
+        await client.generate("Ты эксперт.", QUESTION)
+
+    assert (first.calls, second.calls) == (1, 1)
@@ -0,0 +1,76 @@
+from uuid import uuid4
+
+import pytest
+
+from src.domain.common.exceptions import ValidationError
+from src.domain.messages.entities import Message
+from src.infrastructure.llm.fake import FakeLLMError, FakeLLMProfile
+from src.infrastructure.llm.resilience import ResilientLLMClient
+from src.infrastructure.llm.router import LLMEndpoint, LLMRouter
+from tests.conftest import CountingLLM
+
+QUESTION = [Message.from_user(uuid4(), uuid4(), "Вопрос")]
+
+
+def failing(status_code: int) -> CountingLLM:
+    return CountingLLM(
+        FakeLLMProfile(latency=0, tokens_per_second=0, error_rate=1.0, error_status=status_code)
+    )
+
+
+async def test_agent_endpoint_selects_group() -> None:
+    default, cheap = CountingLLM(), CountingLLM()
+    router = LLMRouter(
+        {"default": [LLMEndpoint("default-0", default)], "cheap": [LLMEndpoint("cheap-0", cheap)]}
+    )
+
+    await router.generate("Ты эксперт.", QUESTION, endpoint="cheap")
+    await router.generate("Ты эксперт.", QUESTION)
+
+    assert (default.calls, cheap.calls) == (1, 1)
+    with pytest.raises(ValidationError):
+        await router.generate("Ты эксперт.", QUESTION, endpoint="missing")
+
+
+async def test_rate_limited_endpoint_fails_over() -> None:
+    limited, spare = failing(429), CountingLLM()
+    router = LLMRouter({"default": [LLMEndpoint("a", limited), LLMEndpoint("b", spare)]})
+
+    chunks = [chunk async for chunk in router.generate_stream("Ты эксперт.", QUESTION)]
+
+    assert chunks and (limited.calls, spare.calls) == (1, 1)
+    assert router.groups["default"][0].stats.failovers == 1
+
+
+async def test_degraded_endpoint_is_used_last() -> None:
+    broken, healthy = failing(503), CountingLLM()
+    endpoints = [LLMEndpoint("a", broken, failure_threshold=1), LLMEndpoint("b", healthy)]
+    router = LLMRouter({"default": endpoints})
+
+    with pytest.raises(FakeLLMError):
+        await router.generate("Ты эксперт.", QUESTION)
+    for _ in range(3):
+        await router.generate("Ты эксперт.", QUESTION)
+
+    assert not endpoints[0].healthy
+    assert (broken.calls, healthy.calls) == (1, 3)
+
+
+@pytest.mark.parametrize("stream", [False, True])
+async def test_stalled_endpoint_times_out_and_next_call_goes_to_healthy(stream: bool) -> None:
+    stalled = CountingLLM(FakeLLMProfile(latency=10, latency_sigma=0, tokens_per_second=0))
+    endpoints = [LLMEndpoint("a", stalled, timeout=0.05), LLMEndpoint("b", CountingLLM(), timeout=0.05)]
+    # Дедлайн выше роутера длиннее: его таймаут отменил бы роутер, не показав, какой endpoint завис
+    client = ResilientLLMClient(LLMRouter({"default": endpoints}), timeout=5, max_retries=1, backoff=0)
+
+    async def call() -> str:
+        if stream:
+            return "".join([chunk async for chunk in client.generate_stream("Ты эксперт.", QUESTION)])
+        return await client.generate("Ты эксперт.", QUESTION)
+
+    assert await call()  # Повтор после таймаута ушел на здоровый endpoint
+    assert endpoints[0].consecutive_failures == 1 and endpoints[0].stats.failures == 1
+    assert client.stats.timeouts == 1
+
+    assert await call()
+    assert [endpoint.stats.requests for endpoint in endpoints] == [1, 2]
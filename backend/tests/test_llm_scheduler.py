@@ -0,0 +1,87 @@
+import asyncio
+from typing import Any
+from uuid import uuid4
+
+import pytest
+
+from src.domain.messages.entities import Message
+from src.infrastructure.llm.fake import FakeLLMError, FakeLLMProfile
+from src.infrastructure.llm.scheduler import (
+    LLMScheduler,
+    SchedulingLLMClient,
+    TokenBucket,
+)
+from tests.conftest import CountingLLM
+
+QUESTION = [Message.from_user(uuid4(), uuid4(), "Вопрос")]
+
+
+class PeakLLM(CountingLLM):
+    """Запоминает наибольшее число одновременных вызовов."""
+
+    def __init__(self) -> None:
+        super().__init__(FakeLLMProfile(latency=0.02, latency_sigma=0, tokens_per_second=0, answer_tokens=4))
+        self.active = 0
+        self.peak = 0
+
+    async def generate(self, system_prompt: str, messages: list[Message], **kwargs: Any) -> str:
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            return await super().generate(system_prompt, messages, **kwargs)
+        finally:
+            self.active -= 1
+
+
+async def test_scheduler_limits_concurrency() -> None:
+    llm = PeakLLM()
+    scheduler = LLMScheduler(rpm=0, tpm=0, max_concurrency=2)
+    client = SchedulingLLMClient(llm, scheduler)
+
+    await asyncio.gather(*(client.generate("Ты эксперт.", QUESTION) for _ in range(6)))
+
+    assert llm.peak == 2
+    assert scheduler.stats.completed == 6 and scheduler.concurrency.in_flight == 0
+
+
+async def test_rate_limited_call_is_retried_and_concurrency_halved() -> None:
+    llm = CountingLLM(FakeLLMProfile(latency=0, tokens_per_second=0, error_rate=1.0, error_status=429))
+    scheduler = LLMScheduler(rpm=0, tpm=0, max_concurrency=8, max_retries=2, retry_delay=0)
+    client = SchedulingLLMClient(llm, scheduler)
+
+    with pytest.raises(FakeLLMError):
+        await client.generate("Ты эксперт.", QUESTION)
+
+    assert llm.calls == 3
+    assert (scheduler.stats.throttled, scheduler.stats.failed) == (2, 1)
+    assert scheduler.concurrency.limit == 1  # 8, уполовиненный каждым из трех ответов 429
+
+
+async def test_other_errors_are_not_retried() -> None:
+    llm = CountingLLM(FakeLLMProfile(latency=0, tokens_per_second=0, error_rate=1.0, error_status=500))
+    scheduler = LLMScheduler(rpm=0, tpm=0, max_concurrency=8, retry_delay=0)
+
+    with pytest.raises(FakeLLMError):
+        await SchedulingLLMClient(llm, scheduler).generate("Ты эксперт.", QUESTION)
+
+    assert llm.calls == 1 and scheduler.concurrency.limit == 8
+
+
+async def test_choices_reserve_tokens_for_every_choice() -> None:
+    client = SchedulingLLMClient(CountingLLM(), LLMScheduler(rpm=0, tpm=0, max_concurrency=1))
+
+    one = client._estimate_tokens("Ты эксперт.", QUESTION, {"max_tokens": 100})
+    three = client._estimate_tokens("Ты эксперт.", QUESTION, {"max_tokens": 100}, n=3)
+
+    assert three - one == 200
+
+
+async def test_token_bucket_waits_for_refill() -> None:
+    bucket = TokenBucket(per_minute=600)  # 10 в секунду
+    await bucket.acquire(600)
+
+    loop = asyncio.get_running_loop()
+    started_at = loop.time()
+    await bucket.acquire(1)
+
+    assert loop.time() - started_at >= 0.09
@@ -0,0 +1,79 @@
+from datetime import UTC, datetime, timedelta
+from uuid import UUID
+
+import pytest
+
+from src.domain.messages.entities import Message
+from src.infrastructure.db.base import db_manager
+from src.infrastructure.db.unit_of_work import SqlAlchemyUnitOfWork
+from tests.conftest import Api, agent_node
+
+
+@pytest.fixture
+def dialog_id(api: Api) -> UUID:
+    return api.create_dialog(api.create_pipeline(agent_node(api.create_agent())))
+
+
+def make_messages(api: Api, dialog_id: UUID, count: int, tokens: int = 10) -> list[Message]:
+    start = datetime(2024, 1, 1, tzinfo=UTC)
+    messages = []
+    for i in range(count):
+        message = Message.from_user(dialog_id, api.user_id, f"сообщение {i}", metadata={"tokens": tokens})
+        message.created_at = message.updated_at = start + timedelta(seconds=i)
+        messages.append(message)
+
+    async def save() -> None:
+        async with db_manager.session() as session, SqlAlchemyUnitOfWork(session) as uow:
+            await uow.messages.add_many(messages)
+
+    api.client.portal.call(save)
+    return messages
+
+
+def get_history(api: Api, dialog_id: UUID, **kwargs) -> list[Message]:
+    async def load() -> list[Message]:
+        async with db_manager.session() as session:
+            return await SqlAlchemyUnitOfWork(session).messages.get_history(dialog_id, **kwargs)
+
+    return api.client.portal.call(load)
+
+
+def test_history_returns_latest_messages_in_order(api: Api, dialog_id: UUID) -> None:
+    messages = make_messages(api, dialog_id, 5)
+
+    history = get_history(api, dialog_id, limit=3)
+
+    assert [m.id for m in history] == [m.id for m in messages[2:]]
+
+
+def test_history_pages_with_keyset_cursor(api: Api, dialog_id: UUID) -> None:
+    messages = make_messages(api, dialog_id, 5)
+    cursor = messages[2]
+
+    history = get_history(api, dialog_id, limit=10, before=(cursor.created_at, cursor.id))
+
+    assert [m.id for m in history] == [m.id for m in messages[:2]]
+
+
+def test_history_stops_at_token_budget(api: Api, dialog_id: UUID) -> None:
+    messages = make_messages(api, dialog_id, 5, tokens=10)
+
+    history = get_history(api, dialog_id, limit=10, max_tokens=25)
+
+    assert [m.id for m in history] == [m.id for m in messages[3:]]
+
+
+def test_add_many_returns_stored_rows(api: Api, dialog_id: UUID) -> None:
+    messages = [
+        Message.from_user(dialog_id, api.user_id, f"сообщение {i}", metadata={"i": i}) for i in range(3)
+    ]
+
+    async def save() -> list[Message]:
+        async with db_manager.session() as session, SqlAlchemyUnitOfWork(session) as uow:
+            return await uow.messages.add_many(messages, returning=True)
+
+    saved = api.client.portal.call(save)
+
+    assert [(m.id, m.text, m.metadata) for m in saved] == [(m.id, m.text, m.metadata) for m in messages]
+    history = get_history(api, dialog_id, limit=10)
+    assert {m.id for m in history} == {m.id for m in messages}
@@ -0,0 +1,290 @@
+import asyncio
+from typing import Any
+from uuid import uuid4
+
+import pytest
+
+from src.application.pipelines.dto import PipelineEventType
+from src.domain.agents.entities import Agent
+from src.domain.messages.entities import Message
+from src.domain.pipelines.entities import Pipeline
+from src.infrastructure.llm.fake import FakeLLMError
+from src.infrastructure.pipelines.executor import (
+    ChoiceBatch,
+    ParallelNodeError,
+    PipelineExecutor,
+)
+
+from .conftest import CountingLLM
+
+DIALOG_ID, USER_ID = uuid4(), uuid4()
+
+
+class RecordingLLM(CountingLLM):
+    """
+    Запоминает контекст каждого вызова по системному промпту агента.
+
+    Сообщение сравнивается по роли и тексту, как его видит провайдер: объединенный
+    ответ параллельного узла собирается заново на каждом ходу с новым id.
+    """
+
+    def __init__(self, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self.contexts: dict[str, list[list[tuple[str, str]]]] = {}
+
+    async def generate(self, system_prompt: str, messages: list[Message], **kwargs: Any) -> str:
+        context = [(msg.author_type.value, msg.text) for msg in messages]
+        self.contexts.setdefault(system_prompt, []).append(context)
+        return await super().generate(system_prompt, messages, **kwargs)
+
+
+class ScriptedLLM(RecordingLLM):
+    """Задержка и ошибка ответа задаются для каждого агента (по системному промпту)."""
+
+    def __init__(self, *, delays: dict[str, float] | None = None, failing: set[str] | None = None) -> None:
+        super().__init__()
+        self.delays = delays or {}
+        self.failing = failing or set()
+        self.cancelled: list[str] = []
+        self.running = self.peak = 0
+
+    async def generate(self, system_prompt: str, messages: list[Message], **kwargs: Any) -> str:
+        self.running += 1
+        self.peak = max(self.peak, self.running)
+        try:
+            await asyncio.sleep(self.delays.get(system_prompt, 0))
+        except asyncio.CancelledError:
+            self.cancelled.append(system_prompt)
+            raise
+        finally:
+            self.running -= 1
+        if system_prompt in self.failing:
+            raise FakeLLMError(500)
+        return await super().generate(system_prompt, messages, **kwargs)
+
+
+def make_agents(count: int) -> list[Agent]:
+    return [Agent.create(f"agent-{i}", "агент", f"Ты эксперт {i}.") for i in range(count)]
+
+
+def node(agent: Agent) -> dict[str, Any]:
+    return {"type": "agent", "agent_id": str(agent.id)}
+
+
+def make_executor(
+    root: dict[str, Any], agents: list[Agent], llm: CountingLLM, **kwargs: Any
+) -> PipelineExecutor:
+    pipeline = Pipeline.model_validate({"name": "pipeline", "root": root})
+    return PipelineExecutor(pipeline, dialog_id=DIALOG_ID, agents=agents, llm_client=llm, **kwargs)
+
+
+async def test_agent_context_is_prefix_of_next_turn_context() -> None:
+    agents = make_agents(3)
+    root = {
+        "type": "sequence",
+        "nodes": [
+            {"type": "parallel", "merge_strategy": "concat", "nodes": [node(agents[0]), node(agents[1])]},
+            node(agents[2]),
+        ],
+    }
+    llm = RecordingLLM()
+    history: list[Message] = []
+    for turn in range(3):
+        executor = make_executor(root, agents, llm)
+        await executor.run(USER_ID, f"вопрос {turn}", history)
+        # Сообщение пользователя run уже добавил в историю, ответы агентов сохраняются после хода
+        history.extend(executor.generated_messages[1:])
+
+    for agent in agents:
+        contexts = llm.contexts[agent.prompt]
+        assert len(contexts) == 3
+        for current, following in zip(contexts, contexts[1:]):
+            assert following[: len(current)] == current
+            assert len(following) > len(current)
+
+
+async def test_duplicate_context_messages_are_removed_and_reported() -> None:
+    # Второй узел видит прошлые ответы агента и из своей истории, и как ответы предыдущего узла
+    [agent] = make_agents(1)
+    root = {"type": "sequence", "nodes": [node(agent), node(agent)]}
+    llm = RecordingLLM()
+    history: list[Message] = []
+    for turn in range(2):
+        executor = make_executor(root, [agent], llm)
+        [answer] = await executor.run(USER_ID, f"вопрос {turn}", history)
+        history.extend(executor.generated_messages[1:])
+
+    assert answer.metadata["deduplicated"]["messages"] == 2
+    assert answer.metadata["deduplicated"]["tokens"] > 0
+    last_context = llm.contexts[agent.prompt][-1]
+    assert len(last_context) == len(set(last_context))
+
+
+def parallel(agents: list[Agent], **fields: Any) -> dict[str, Any]:
+    return {"type": "parallel", "merge_strategy": "concat", "nodes": [node(a) for a in agents], **fields}
+
+
+async def run_turn(root: dict[str, Any], agents: list[Agent], llm: CountingLLM) -> list[Message]:
+    # Ограничение сверху: отмененная медленная ветка не должна задерживать ход
+    async with asyncio.timeout(2):
+        return await make_executor(root, agents, llm).run(USER_ID, "вопрос", [])
+
+
+async def test_fail_fast_cancels_sibling_branches() -> None:
+    agents = make_agents(3)
+    llm = ScriptedLLM(delays={agents[1].prompt: 10, agents[2].prompt: 10}, failing={agents[0].prompt})
+
+    with pytest.raises(FakeLLMError):
+        await run_turn(parallel(agents), agents, llm)
+
+    assert sorted(llm.cancelled) == sorted([agents[1].prompt, agents[2].prompt])
+
+
+async def test_branch_timeout_leaves_partial_result() -> None:
+    agents = make_agents(2)
+    llm = ScriptedLLM(delays={agents[1].prompt: 10})
+    root = parallel(agents, timeout=0.05, failure_policy="best_effort")
+
+    [merged] = await run_turn(root, agents, llm)
+
+    assert llm.cancelled == [agents[1].prompt]
+    assert merged.author_id == agents[0].id  # Одна успешная ветка возвращается без объединения
+
+
+@pytest.mark.parametrize(
+    ("policy", "failing"),
+    [({"failure_policy": "best_effort"}, 2), ({"failure_policy": "at_least", "min_successes": 2}, 1)],
+)
+async def test_too_many_failed_branches_fail_node(policy: dict[str, Any], failing: int) -> None:
+    agents = make_agents(2)
+    llm = ScriptedLLM(failing={agent.prompt for agent in agents[:failing]})
+
+    with pytest.raises(ParallelNodeError, match=f"{failing} of 2 branches failed"):
+        await run_turn(parallel(agents, **policy), agents, llm)
+
+
+async def test_max_concurrency_limits_running_branches() -> None:
+    agents = make_agents(4)
+    llm = ScriptedLLM(delays={agent.prompt: 0.01 for agent in agents})
+
+    [merged] = await run_turn(parallel(agents, max_concurrency=2), agents, llm)
+
+    assert llm.peak == 2
+    assert len(merged.metadata["merged_from"]) == 4
+
+
+def branch_answer(executor: PipelineExecutor, agent: Agent) -> Message:
+    [answer] = [msg for msg in executor.generated_messages if msg.author_id == agent.id]
+    return answer
+
+
+async def test_first_k_merges_answers_in_completion_order() -> None:
+    agents = make_agents(3)
+    llm = ScriptedLLM(delays={agents[0].prompt: 10, agents[1].prompt: 0.1, agents[2].prompt: 0})
+    executor = make_executor(parallel(agents, merge_strategy="first_k", k=2), agents, llm)
+
+    [merged] = await executor.run(USER_ID, "вопрос", [])
+
+    first, second = branch_answer(executor, agents[2]), branch_answer(executor, agents[1])
+    assert merged.metadata["merged_from"] == [first.id, second.id]
+    assert merged.text == f"## Вариант 1.\n{first.text}\n\n## Вариант 2.\n{second.text}"
+    assert llm.cancelled == [agents[0].prompt]
+    assert [first.metadata["merge"]["rank"], second.metadata["merge"]["rank"]] == [0, 1]
+    assert first.metadata["merge"]["cancelled"] == 1
+
+
+async def test_quorum_fails_when_failed_branches_make_it_unreachable() -> None:
+    agents = make_agents(3)
+    llm = ScriptedLLM(delays={agents[2].prompt: 10}, failing={agents[0].prompt, agents[1].prompt})
+    root = parallel(agents, merge_strategy="quorum", failure_policy="best_effort")
+
+    with pytest.raises(ParallelNodeError, match="quorum needs 2 successful branches, 2 of 3 branches failed"):
+        await run_turn(root, agents, llm)
+
+    assert llm.cancelled == [agents[2].prompt]  # Третью ветку не ждут
+
+
+@pytest.mark.parametrize("failing", [2, 3])
+async def test_first_k_needs_k_successful_branches(failing: int) -> None:
+    agents = make_agents(5)
+    llm = ScriptedLLM(failing={agent.prompt for agent in agents[:failing]})
+    executor = make_executor(
+        parallel(agents, merge_strategy="first_k", k=3, failure_policy="best_effort"), agents, llm
+    )
+
+    if failing == 3:  # Успешных веток меньше k: узел не отдает неполное объединение
+        with pytest.raises(ParallelNodeError, match="first_k needs 3 successful branches, 3 of 5"):
+            await executor.run(USER_ID, "вопрос", [])
+        return
+
+    [merged] = await executor.run(USER_ID, "вопрос", [])
+
+    assert merged.metadata["merged_from"] == [branch_answer(executor, agent).id for agent in agents[2:]]
+
+
+async def test_deadline_without_finished_branches_takes_first_answer() -> None:
+    agents = make_agents(3)
+    delays = {agents[0].prompt: 0.3, agents[1].prompt: 0.1, agents[2].prompt: 10}
+    llm = ScriptedLLM(delays=delays)
+    executor = make_executor(parallel(agents, merge_strategy="deadline", deadline=0.01), agents, llm)
+
+    [merged] = await executor.run(USER_ID, "вопрос", [])
+
+    assert merged.id == branch_answer(executor, agents[1]).id
+    assert sorted(llm.cancelled) == sorted([agents[0].prompt, agents[2].prompt])
+    assert merged.metadata["merge"] == {
+        "node_id": str(executor.plan.root_step.node_id),
+        "strategy": "deadline",
+        "selected": True,
+        "rank": 0,
+        "branches": 3,
+        "cancelled": 2,
+    }
+
+
+async def test_identical_branches_share_one_request_with_choices() -> None:
+    [agent] = make_agents(1)
+    llm = RecordingLLM()
+    executor = make_executor(parallel([agent] * 3), [agent], llm)
+
+    [merged] = await executor.run(USER_ID, "вопрос", [])
+
+    assert llm.calls == 1
+    assert llm.kwargs[-1]["n"] == 3
+    answers = executor.generated_messages[1:]
+    assert sorted(msg.metadata["choice"] for msg in answers) == [0, 1, 2]
+    assert len({msg.text for msg in answers}) == 3
+    assert merged.metadata["merged_from"] == [msg.id for msg in answers]
+
+
+async def test_first_k_asks_for_at_most_k_choices() -> None:
+    [agent] = make_agents(1)
+    llm = RecordingLLM()
+    executor = make_executor(parallel([agent] * 3, merge_strategy="first_k", k=2), [agent], llm)
+
+    [merged] = await executor.run(USER_ID, "вопрос", [])
+
+    assert llm.kwargs[-1]["n"] == 2
+    assert len(merged.metadata["merged_from"]) == 2
+    # Ветка сверх `k` не запускается и не считается отмененной
+    answers = executor.generated_messages[1:]
+    assert [msg.metadata["merge"]["branches"] for msg in answers] == [2, 2]
+    assert all(msg.metadata["merge"]["cancelled"] == 0 for msg in answers)
+
+
+async def test_batched_answers_are_streamed_as_single_delta() -> None:
+    [agent] = make_agents(1)
+    executor = make_executor(parallel([agent] * 2), [agent], RecordingLLM())
+
+    events = [event async for event in executor.stream(USER_ID, "вопрос", [])]
+
+    deltas = {event.node_id: event.delta for event in events if event.type == PipelineEventType.DELTA}
+    answers = executor.generated_messages[1:]
+    assert sorted(deltas.values()) == sorted(msg.text for msg in answers)
+    assert len(deltas) == 2
+
+
+async def test_choice_batch_take_requires_started_request() -> None:
+    node_id = uuid4()
+    with pytest.raises(RuntimeError, match="has not been started"):
+        await ChoiceBatch([node_id, uuid4()]).take(node_id)
@@ -0,0 +1,70 @@
+from datetime import UTC, datetime, timedelta
+from uuid import UUID, uuid4
+
+from src.domain.messages.entities import Message
+from src.infrastructure.pipelines.history import MERGED_FROM, HistoryIndex, deduplicate
+
+DIALOG_ID, USER_ID = uuid4(), uuid4()
+AGENT_A, AGENT_B = uuid4(), uuid4()
+
+
+def at(message: Message, seconds: int) -> Message:
+    message.created_at = datetime(2025, 1, 1, tzinfo=UTC) + timedelta(seconds=seconds)
+    return message
+
+
+def user(text: str, seconds: int) -> Message:
+    return at(Message.from_user(dialog_id=DIALOG_ID, user_id=USER_ID, text=text), seconds)
+
+
+def agent(agent_id: UUID, text: str, seconds: int) -> Message:
+    return at(Message.from_agent(dialog_id=DIALOG_ID, agent_id=agent_id, text=text), seconds)
+
+
+def test_history_index_groups_messages_in_chronological_order() -> None:
+    q1, a1, b1 = user("вопрос 1", 0), agent(AGENT_A, "a1", 1), agent(AGENT_B, "b1", 1)
+    q2, a2 = user("вопрос 2", 2), agent(AGENT_A, "a2", 3)
+
+    index = HistoryIndex([a2, q2, b1, a1, q1])
+
+    assert len(index) == 5
+    assert index.messages == (q1, b1, a1, q2, a2)  # При равном времени — исходный порядок
+    assert index.user == (q1, q2)
+    assert index.by_agent(AGENT_A) == (a1, a2)
+    assert index.by_agent(uuid4()) == ()
+    assert index.visible_to(AGENT_A) == (q1, a1, q2, a2)
+    assert index.visible_to(AGENT_B) == (q1, b1, q2)
+    assert index.visible_to(AGENT_A) is index.visible_to(AGENT_A)
+
+
+def test_turn_of_is_index_of_latest_user_message() -> None:
+    q1, q2 = user("вопрос 1", 10), user("вопрос 2", 20)
+    index = HistoryIndex([q1, q2])
+
+    assert index.turn_of(agent(AGENT_A, "раньше вопросов", 5)) == -1
+    assert index.turn_of(q1) == 0
+    assert index.turn_of(agent(AGENT_A, "ответ", 15)) == 0
+    assert index.turn_of(agent(AGENT_A, "ответ", 25)) == 1
+
+
+def test_deduplicate_keeps_order_and_reports_removed_messages() -> None:
+    question, answer = user("вопрос", 0), agent(AGENT_A, "ответ", 1)
+    repeated_question = user("вопрос", 2)
+    old_same_text, new_same_text = agent(AGENT_B, "одинаковый", 3), agent(AGENT_A, " одинаковый ", 4)
+
+    kept, removed = deduplicate([question, answer, answer, repeated_question, old_same_text, new_same_text])
+
+    # Повтор по id и ранний из одинаковых ответов агентов убраны, повторенный вопрос — новый ход
+    assert kept == [question, answer, repeated_question, new_same_text]
+    assert removed == [answer, old_same_text]
+
+
+def test_deduplicate_drops_parts_of_merged_answer() -> None:
+    first, second = agent(AGENT_A, "первый", 1), agent(AGENT_B, "второй", 1)
+    merged = agent(AGENT_A, "первый\n\nвторой", 1)
+    merged.metadata[MERGED_FROM] = [first.id, second.id]
+
+    kept, removed = deduplicate([first, second, merged])
+
+    assert kept == [merged]
+    assert removed == [first, second]
@@ -0,0 +1,49 @@
+import json
+from typing import Any
+
+from src.infrastructure.llm.fake import FakeLLMClient, FakeLLMProfile
+from src.presentation.api.dependencies import get_llm
+
+from .conftest import Api, agent_node
+
+
+def read_events(api: Api, pipeline_id: Any, dialog_id: Any) -> list[tuple[str, dict[str, Any]]]:
+    body = {"pipeline_id": str(pipeline_id), "dialog_id": str(dialog_id), "message": "вопрос"}
+    events = []
+    with api.client.stream(
+        "POST", "/api/v1/rpc/run-pipeline/stream", json=body, headers=api.headers
+    ) as response:
+        assert response.status_code == 200
+        event_type = None
+        for line in response.iter_lines():
+            if line.startswith("event: "):
+                event_type = line.removeprefix("event: ")
+            elif line.startswith("data: "):
+                events.append((event_type, json.loads(line.removeprefix("data: "))))
+    return events
+
+
+def test_stream_ends_with_done(api: Api) -> None:
+    pipeline_id = api.create_pipeline(agent_node(api.create_agent()))
+    events = read_events(api, pipeline_id, api.create_dialog(pipeline_id))
+
+    types = [event_type for event_type, _ in events]
+    assert types[0] == "node_start"
+    assert "delta" in types
+    assert types[-1] == "done"
+    assert len(events[-1][1]["messages"]) == 1
+
+
+def test_stream_reports_llm_failure_as_error_event(api: Api) -> None:
+    pipeline_id = api.create_pipeline(agent_node(api.create_agent()))
+    dialog_id = api.create_dialog(pipeline_id)
+    failing = FakeLLMClient(FakeLLMProfile(latency=0, error_rate=1.0, error_status=400))
+    api.client.app.dependency_overrides[get_llm] = lambda: failing
+    try:
+        events = read_events(api, pipeline_id, dialog_id)
+    finally:
+        api.client.app.dependency_overrides.pop(get_llm)
+
+    event_type, data = events[-1]
+    assert event_type == "error"
+    assert "FakeLLMError" in data["detail"]
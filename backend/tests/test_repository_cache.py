@@ -0,0 +1,51 @@
+import pytest
+
+from src.domain.agents.entities import Agent
+from src.infrastructure.db.base import db_manager
+from src.infrastructure.db.repositories.cached import agent_cache, pipeline_cache
+from src.infrastructure.db.unit_of_work import SqlAlchemyUnitOfWork
+from tests.conftest import Api, agent_node
+
+
+def test_patch_invalidates_cached_agent_and_pipeline(api: Api) -> None:
+    agent_id = api.create_agent()
+    pipeline_id = api.create_pipeline(agent_node(agent_id))
+    dialog_id = api.create_dialog(pipeline_id)
+    assert api.run_pipeline(pipeline_id, dialog_id, "первый вопрос").status_code == 200
+    assert agent_cache.get(agent_id) is not None
+    assert pipeline_cache.get(pipeline_id) is not None
+
+    response = api.patch(f"/api/v1/agents/{agent_id}", json={"prompt": "Ты новый эксперт."})
+    assert response.status_code == 200, response.text
+    assert agent_cache.get(agent_id) is None
+
+    response = api.patch(f"/api/v1/pipelines/{pipeline_id}", json={"name": "renamed"})
+    assert response.status_code == 200, response.text
+    assert pipeline_cache.get(pipeline_id) is None
+
+    assert api.run_pipeline(pipeline_id, dialog_id, "второй вопрос").status_code == 200
+    cached = agent_cache.get(agent_id)
+    assert cached is not None and cached.prompt == "Ты новый эксперт."
+
+
+def test_rolled_back_update_keeps_cache_consistent(api: Api) -> None:
+    agent_id = api.create_agent()
+
+    async def update_and_fail() -> None:
+        async with db_manager.session() as session:
+            uow = SqlAlchemyUnitOfWork(session)
+            agent = await uow.agents.get_by_id(agent_id)
+            with pytest.raises(RuntimeError):
+                async with uow:
+                    agent.prompt = "Незафиксированный промпт."
+                    await uow.agents.update(agent)
+                    raise RuntimeError("rollback")
+
+    async def load() -> Agent:
+        async with db_manager.session() as session:
+            return await SqlAlchemyUnitOfWork(session).agents.get_by_id(agent_id)
+
+    api.client.portal.call(update_and_fail)
+    cached = agent_cache.get(agent_id)
+    assert cached is not None and cached.prompt == "Ты эксперт."
+    assert api.client.portal.call(load).prompt == "Ты эксперт."
@@ -0,0 +1,39 @@
+import json
+
+from fastapi.testclient import TestClient
+
+from src.infrastructure.llm.fake import FakeLLMProfile
+from src.infrastructure.llm.stub_server import create_stub_app
+
+BODY = {
+    "model": "stub",
+    "messages": [{"role": "system", "content": "Ты эксперт."}, {"role": "user", "content": "Вопрос"}],
+}
+
+
+def stub_client() -> TestClient:
+    return TestClient(create_stub_app(FakeLLMProfile(latency=0, tokens_per_second=0, answer_tokens=8)))
+
+
+def test_completion_returns_n_choices_with_usage() -> None:
+    response = stub_client().post("/v1/chat/completions", json={**BODY, "n": 3})
+
+    data = response.json()
+    assert response.status_code == 200
+    assert [choice["index"] for choice in data["choices"]] == [0, 1, 2]
+    assert (
+        data["usage"]["total_tokens"] == data["usage"]["prompt_tokens"] + data["usage"]["completion_tokens"]
+    )
+
+
+def test_stream_ends_with_finish_reason_usage_and_done() -> None:
+    body = {**BODY, "stream": True, "stream_options": {"include_usage": True}}
+    response = stub_client().post("/v1/chat/completions", json=body)
+
+    lines = [line.removeprefix("data: ") for line in response.text.splitlines() if line]
+    chunks = [json.loads(line) for line in lines[:-1]]
+    assert lines[-1] == "[DONE]"
+    assert chunks[-2]["choices"][0]["finish_reason"] == "stop"
+    assert chunks[-1]["choices"] == [] and "usage" in chunks[-1]
+    text = "".join(chunk["choices"][0]["delta"].get("content", "") for chunk in chunks[:-2])
+    assert len(text.split()) == 8